@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import json
+from pathlib import Path
+
+from spatial import load_polygon_layer
+
+ASSOCIATIONS_FILE = "data/associations.json"
+# Resolved from this file so outlines are found whatever directory a script runs from
+STATES_DIR = Path(__file__).resolve().parents[2] / "geojson" / "states"
+BASE_URL = "https://raw.githubusercontent.com/wallyatkins/vhsl/main/geojson/vhsl_regions/schools_by_region/"
+BUILD_DIR = "build"
+# The derived school files every build writes, relative to an association's output root
+OUTPUT_FILES = {
+    'all_schools': "dist/data/geojson/all_schools.geojson",
+    'school_lookup': "dist/data/geojson/school_lookup.json",
+    'compiled_schools': "data/compiled_schools.json",
+    'school_mapping': "data/school_mapping.json",
+}
+DEFAULT_ASSOCIATION = 'vhsl'
+
+
+class Association:
+    """One state athletic association and where its data lives
+
+    An association has a state outline (a file in geojson/states named by the
+    state's postal code), a classification scheme (class count and region
+    letters, giving "Region 1A" ... "Region NX") and two roots: data_root
+    holds its inputs (geojson/schools_by_region/...) and output_root receives
+    the same data/ and dist/ tree the Virginia build writes at the top level.
+    """
+
+    def __init__(self, key, name, state, state_name, classes=6, region_letters='ABCD',
+                 data_root=None, output_root=None, base_url=None):
+        self.key = key
+        self.name = name
+        self.state = state.upper()
+        self.state_name = state_name
+        self.classes = int(classes)
+        self.region_letters = region_letters
+        self.data_root = Path(data_root or Path(BUILD_DIR) / key / "data")
+        self.output_root = Path(output_root or Path(BUILD_DIR) / key)
+        self.base_url = base_url
+
+    @classmethod
+    def from_json(cls, key, data):
+        return cls(key, **data)
+
+    def to_json(self):
+        return {
+            'name': self.name,
+            'state': self.state,
+            'state_name': self.state_name,
+            'classes': self.classes,
+            'region_letters': self.region_letters,
+            'data_root': str(self.data_root),
+            'output_root': str(self.output_root),
+            'base_url': self.base_url,
+        }
+
+    def __repr__(self):
+        return f"Association({self.key!r}, {self.state}, {self.classes} classes x {self.region_letters})"
+
+    @property
+    def regions_dir(self):
+        return self.data_root / "geojson" / "schools_by_region"
+
+    @property
+    def region_names(self):
+        """Every region name of the classification scheme ("Region 1A" ... "Region NX")"""
+        return [f"Region {class_num}{letter}" for class_num in range(1, self.classes + 1)
+                for letter in self.region_letters]
+
+    def output_paths(self):
+        """Where this association's derived school files go, keyed like OUTPUT_FILES"""
+        return {key: self.output_root / path for key, path in OUTPUT_FILES.items()}
+
+    def state_outline(self, states_dir=STATES_DIR):
+        """Return the state's outline from geojson/states as {name: geometry}"""
+        path = Path(states_dir) / f"{self.state}.geojson"
+        if not path.exists():
+            raise FileNotFoundError(f"No outline for {self.state} in {states_dir}")
+        return load_polygon_layer(path)
+
+
+VHSL = Association('vhsl', "Virginia High School League", 'VA', "Virginia",
+                   data_root="data", output_root=".", base_url=BASE_URL)
+
+
+def load_associations(path=ASSOCIATIONS_FILE):
+    """Load {key: Association} from the associations file, falling back to the VHSL alone"""
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {VHSL.key: VHSL}
+    return {key: Association.from_json(key, config) for key, config in data.get('associations', {}).items()}
+
+
+def available_states(states_dir=STATES_DIR):
+    """Return the postal codes of every outline in geojson/states"""
+    return sorted(path.stem for path in Path(states_dir).glob("*.geojson"))
+
+
+if __name__ == "__main__":
+    associations = load_associations()
+    states = set(available_states())
+    print(f"=== {len(associations)} Associations ({len(states)} state outlines) ===")
+    for key, association in associations.items():
+        regions = Path(association.regions_dir)
+        present = sum(1 for name in association.region_names if (regions / f"{name}.geojson").exists())
+        outline = "outline" if association.state in states else "NO OUTLINE"
+        print(f"{key:<8} {association.state} {association.name}: {association.classes} classes x "
+              f"{len(association.region_letters)} regions, {present}/{len(association.region_names)} "
+              f"region files, {outline} -> {association.output_root}")
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+import contextlib
+import json
+import os
+import platform
+import resource
+import shutil
+import string
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from associations import Association
+from geojson_stream import stream_combine, write_atomic
+from pipeline import pipeline
+from schema import dump, dumps
+from validation import validate
+
+BENCHMARK_FILE = "data/benchmark_results.json"
+RESULTS_VERSION = 1
+# Virginia's bounding box, so synthetic schools land where the real ones do
+BOUNDS = (-83.68, 36.54, -75.24, 39.47)
+SCHOOLS_PER_DISTRICT = 8
+# Stages left out of every run: the distance matrix is quadratic in memory by design
+SKIPPED_STAGES = ('school_distances',)
+TOLERANCE = 0.25
+MIN_REGRESSION_SECONDS = 0.01
+
+PREFIXES = ['North', 'South', 'East', 'West', 'Lake', 'Mount', 'Glen', 'Fort', 'Port', 'New', 'Old', 'Upper']
+ROOTS = ['wood', 'field', 'brook', 'ridge', 'view', 'dale', 'haven', 'ford', 'mont', 'land', 'ville', 'side']
+SUFFIXES = ['High', 'County', 'Central', 'Academy', 'Senior', 'Regional', 'Memorial', 'Valley']
+
+
+def region_letters(count):
+    """Return count region codes: A ... Z, then AA, AB, ... like spreadsheet columns"""
+    letters = []
+    for i in range(count):
+        code = ''
+        i += 1
+        while i:
+            i, remainder = divmod(i - 1, 26)
+            code = string.ascii_uppercase[remainder] + code
+        letters.append(code)
+    return letters
+
+
+def generate_regions(schools, regions=24, classes=6, duplicates=0.01, seed=0):
+    """Generate synthetic region FeatureCollections shaped like the files in schools_by_region
+
+    Schools are spread at random over classes x letters regions (regions is
+    rounded up to a multiple of classes) and grouped into districts of about
+    SCHOOLS_PER_DISTRICT schools. Features carry a bare "Region X" and the
+    class as size, as the downloaded files do, and a fraction of them repeat
+    an earlier name in another region to exercise deduplication.
+    """
+    rng = np.random.default_rng(seed)
+    letters = region_letters(max(1, -(-regions // classes)))
+    region_names = [f"Region {c}{letter}" for c in range(1, classes + 1) for letter in letters]
+    district_count = max(1, schools // SCHOOLS_PER_DISTRICT)
+
+    region_ids = rng.integers(len(region_names), size=schools)
+    district_ids = rng.integers(district_count, size=schools)
+    lons = np.round(rng.uniform(BOUNDS[0], BOUNDS[2], size=schools), 8).tolist()
+    lats = np.round(rng.uniform(BOUNDS[1], BOUNDS[3], size=schools), 8).tolist()
+    words = rng.integers(len(PREFIXES) * len(ROOTS) * len(SUFFIXES), size=schools).tolist()
+    repeats = rng.random(schools) < duplicates
+
+    collections = {name: {"type": "FeatureCollection", "features": []} for name in region_names}
+    names = []
+    for i in range(schools):
+        if repeats[i] and names:
+            name = names[int(rng.integers(len(names)))]
+        else:
+            word = words[i]
+            name = (f"{PREFIXES[word % len(PREFIXES)]}{ROOTS[word // len(PREFIXES) % len(ROOTS)]} "
+                    f"{SUFFIXES[word // (len(PREFIXES) * len(ROOTS))]} {i}")
+            names.append(name)
+        region_name = region_names[region_ids[i]]
+        features = collections[region_name]['features']
+        features.append({
+            "id": len(features) + 1,
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lons[i], lats[i]]},
+            "properties": {
+                "name": name,
+                "size": int(region_name.split(' ')[1][0]),
+                "region": f"Region {region_name.split(' ')[1][1:]}",
+                "district": f"District {district_ids[i] + 1}",
+            },
+        })
+    return collections, letters
+
+
+def write_regions(collections, directory):
+    """Write each region as "<directory>/Region NX.geojson" and return the total bytes written"""
+    total = 0
+    for region_name, data in collections.items():
+        content = dumps(data, indent=None)
+        write_atomic(Path(directory) / f"{region_name}.geojson", content)
+        total += len(content)
+    return total
+
+
+def _timed(timings, name, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    timings[name] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def run_stages(association, skip=SKIPPED_STAGES):
+    """Run every pipeline stage (except skip) for an association, returning (timings, results)"""
+    targets = [name for name in pipeline.stages if name not in skip]
+    values = {'association': association}
+    timings = {}
+    for name in pipeline.order(targets):
+        func, deps = pipeline.stages[name]
+        values[name] = _timed(timings, name, func, *(values[dep] for dep in deps))
+    return timings, values
+
+
+def benchmark(schools, regions=24, classes=6, duplicates=0.01, seed=0, workers=None, work_dir=None):
+    """Generate one synthetic dataset and time every stage over it; returns the run's result dict"""
+    work_dir = Path(work_dir or tempfile.mkdtemp(prefix='vhsl-bench-'))
+    timings = {}
+    try:
+        collections, letters = _timed(timings, 'generate', generate_regions, schools, regions, classes,
+                                      duplicates, seed)
+        association = Association('benchmark', "Synthetic association", 'VA', "Virginia", classes, letters,
+                                  data_root=work_dir / "data", output_root=work_dir)
+        input_bytes = _timed(timings, 'write_regions', write_regions, collections, association.regions_dir)
+        del collections
+        region_files = sorted(association.regions_dir.glob("Region *.geojson"))
+
+        # The scripts print per school; keep that cost in the timings but off the terminal
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            stage_timings, values = run_stages(association)
+            timings.update(stage_timings)
+            combined_file = work_dir / "dist" / "data" / "geojson" / "all_schools.geojson"
+            unique = _timed(timings, 'stream_combine', stream_combine, region_files, combined_file)
+
+            all_schools, lookup = values['class_region']
+            schools_data, classes_data, districts_data = values['application_data']
+            inputs = {
+                'all_schools': combined_file,
+                'school_lookup': work_dir / "dist" / "data" / "geojson" / "school_lookup.json",
+                'schools': work_dir / "data" / "schools.json",
+                'classes_regions': work_dir / "data" / "classes_regions.json",
+                'districts': work_dir / "data" / "districts.json",
+            }
+            start = time.perf_counter()
+            dump(combined_file, all_schools, indent=None)
+            dump(inputs['school_lookup'], lookup)
+            dump(inputs['schools'], schools_data)
+            dump(inputs['classes_regions'], classes_data)
+            dump(inputs['districts'], districts_data)
+            timings['write_outputs'] = round(time.perf_counter() - start, 6)
+            del values, all_schools, lookup, schools_data, classes_data, districts_data
+
+            report = _timed(timings, 'validation', validate, association,
+                            {k: str(v) for k, v in inputs.items()}, workers)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    measured = {name: seconds for name, seconds in timings.items() if name != 'generate'}
+    return {
+        'schools': schools,
+        'unique_schools': unique,
+        'regions': classes * len(letters),
+        'classes': classes,
+        'districts': max(1, schools // SCHOOLS_PER_DISTRICT),
+        'seed': seed,
+        'input_bytes': input_bytes,
+        'validation_errors': report['summary']['errors'],
+        'stages': timings,
+        'total_seconds': round(sum(measured.values()), 6),
+        'microseconds_per_school': round(sum(measured.values()) / schools * 1e6, 3),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance=TOLERANCE, min_seconds=MIN_REGRESSION_SECONDS):
+    """List stages that got slower than the baseline run of the same scale by more than tolerance"""
+    previous = {(run['schools'], run['regions']): run for run in baseline.get('runs', [])}
+    regressions = []
+    for run in results['runs']:
+        old = previous.get((run['schools'], run['regions']))
+        if not old:
+            continue
+        for stage, seconds in run['stages'].items():
+            before = old['stages'].get(stage)
+            if before is not None and seconds > before * (1 + tolerance) and seconds - before > min_seconds:
+                regressions.append({'schools': run['schools'], 'regions': run['regions'], 'stage': stage,
+                                    'baseline_seconds': before, 'seconds': seconds,
+                                    'change': round(seconds / before - 1, 3) if before else None})
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Time the data pipeline stages on synthetic datasets")
+    parser.add_argument('--schools', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="dataset sizes to run (default 1000 10000 100000)")
+    parser.add_argument('--regions', type=int, default=24, help="regions per dataset (default 24)")
+    parser.add_argument('--classes', type=int, default=6, choices=range(1, 10), metavar='1-9')
+    parser.add_argument('--duplicates', type=float, default=0.01, help="fraction of repeated school names")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help="runs per size; the fastest time per stage is kept")
+    parser.add_argument('--workers', type=int, help="processes used by validation (default: parse serially)")
+    parser.add_argument('--output', default=BENCHMARK_FILE)
+    parser.add_argument('--baseline', help="earlier results file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help=f"allowed slowdown per stage before it counts as a regression (default {TOLERANCE})")
+    args = parser.parse_args()
+
+    results = {
+        'version': RESULTS_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'cpus': os.cpu_count(),
+        'runs': [],
+    }
+    print("=== Pipeline Benchmark ===")
+    for schools in args.schools:
+        runs = [benchmark(schools, args.regions, args.classes, args.duplicates, args.seed, args.workers)
+                for _ in range(args.repeat)]
+        run = runs[0]
+        run['stages'] = {name: min(r['stages'][name] for r in runs) for name in run['stages']}
+        run['total_seconds'] = round(sum(s for name, s in run['stages'].items() if name != 'generate'), 6)
+        run['microseconds_per_school'] = round(run['total_seconds'] / schools * 1e6, 3)
+        results['runs'].append(run)
+
+        print(f"\n{schools} schools, {run['regions']} regions, {run['input_bytes'] / 1e6:.1f} MB of input, "
+              f"{run['validation_errors']} validation errors")
+        for name, seconds in sorted(run['stages'].items(), key=lambda item: -item[1]):
+            print(f"  {name:<18} {seconds * 1000:10.1f} ms")
+        print(f"  {'total':<18} {run['total_seconds'] * 1000:10.1f} ms "
+              f"({run['microseconds_per_school']:.1f} us/school, peak RSS {run['peak_rss_mb']} MB)")
+
+    failed = False
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            results['regressions'] = compare(results, json.load(f), args.tolerance)
+        for regression in results['regressions']:
+            print(f"REGRESSION {regression['stage']} at {regression['schools']} schools: "
+                  f"{regression['baseline_seconds']:.3f}s -> {regression['seconds']:.3f}s")
+        failed = bool(results['regressions'])
+        if not failed:
+            print(f"\nNo regressions against {args.baseline}")
+
+    write_atomic(args.output, json.dumps(results, indent=2).encode('utf-8'))
+    print(f"\nResults saved to {args.output}")
+    raise SystemExit(1 if failed else 0)
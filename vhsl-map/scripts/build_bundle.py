@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+import json
+import struct
+
+import numpy as np
+
+from geojson_stream import write_atomic
+from school_index import REGION_FILES_DIR, load_region_collections
+
+LOOKUP_FILE = "data/geojson/school_lookup.json"
+BUNDLE_FILE = "data/geojson/schools.bin"
+
+MAGIC = b'VHSB'
+VERSION = 1
+# magic, version, schools, classes, regions, districts, string table bytes, reserved
+HEADER = struct.Struct('<4s7I')
+IN_LOOKUP = 1
+
+
+def _dictionary(values):
+    """Map values to ids in first-seen order; id 0 is reserved for the empty string"""
+    ids = {'': 0}
+    for value in values:
+        ids.setdefault(value or '', len(ids))
+    return ids
+
+
+def join_schools(features, lookup):
+    """Join region features with their lookup entries the way the client's enrichSchoolsData does"""
+    rows = []
+    for feature in features:
+        props = feature.get('properties', {})
+        entry = lookup.get(props.get('name'))
+        coordinates = (feature.get('geometry') or {}).get('coordinates') or []
+        size = props.get('size')
+        if entry and entry.get('size'):
+            size = entry['size']
+        rows.append({
+            'name': props.get('name') or '',
+            'lon': coordinates[0] if len(coordinates) >= 2 else float('nan'),
+            'lat': coordinates[1] if len(coordinates) >= 2 else float('nan'),
+            'size': int(size) if str(size or '').isdigit() else 0,
+            'class': (entry or {}).get('class') or props.get('class') or '',
+            'region': props.get('region') or (entry or {}).get('region') or '',
+            'district': props.get('district') or (entry or {}).get('district') or '',
+            'in_lookup': entry is not None,
+        })
+    return rows
+
+
+def encode_bundle(rows):
+    """Pack joined school rows into the binary bundle
+
+    The layout is a fixed header followed by column arrays, each aligned for a
+    typed-array view: float32 lon and lat, uint16 class, region and district
+    ids, uint8 size and flags, then a UTF-8 string table holding the school
+    names and the three dictionaries, one string per line.
+    """
+    classes = _dictionary(row['class'] for row in rows)
+    regions = _dictionary(row['region'] for row in rows)
+    districts = _dictionary(row['district'] for row in rows)
+    for dictionary in (classes, regions, districts):
+        if len(dictionary) > 0xFFFF:
+            raise ValueError("Too many distinct values for a uint16 dictionary")
+
+    strings = [row['name'] for row in rows] + list(classes) + list(regions) + list(districts)
+    if any('\n' in value for value in strings):
+        raise ValueError("Bundle strings cannot contain newlines")
+    string_table = '\n'.join(strings).encode('utf-8')
+
+    columns = [
+        np.array([row['lon'] for row in rows], dtype='<f4'),
+        np.array([row['lat'] for row in rows], dtype='<f4'),
+        np.array([classes[row['class']] for row in rows], dtype='<u2'),
+        np.array([regions[row['region']] for row in rows], dtype='<u2'),
+        np.array([districts[row['district']] for row in rows], dtype='<u2'),
+        np.array([row['size'] for row in rows], dtype='u1'),
+        np.array([IN_LOOKUP if row['in_lookup'] else 0 for row in rows], dtype='u1'),
+    ]
+    header = HEADER.pack(MAGIC, VERSION, len(rows), len(classes), len(regions), len(districts),
+                         len(string_table), 0)
+    return header + b''.join(column.tobytes() for column in columns) + string_table
+
+
+def decode_bundle(content):
+    """Decode a bundle back into NumPy columns and string lists (the Python twin of bundle.js)"""
+    magic, version, count, class_count, region_count, district_count, string_bytes, _ = \
+        HEADER.unpack_from(content)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a version {VERSION} school bundle")
+
+    bundle = {'count': count}
+    offset = HEADER.size
+    for name, dtype in (('lon', '<f4'), ('lat', '<f4'), ('class_ids', '<u2'), ('region_ids', '<u2'),
+                        ('district_ids', '<u2'), ('size', 'u1'), ('flags', 'u1')):
+        bundle[name] = np.frombuffer(content, dtype=dtype, count=count, offset=offset)
+        offset += bundle[name].nbytes
+
+    strings = content[offset:offset + string_bytes].decode('utf-8').split('\n')
+    bundle['names'] = strings[:count]
+    bundle['classes'] = strings[count:count + class_count]
+    bundle['regions'] = strings[count + class_count:count + class_count + region_count]
+    bundle['districts'] = strings[count + class_count + region_count:]
+    if len(bundle['districts']) != district_count:
+        raise ValueError("Bundle string table does not match its header")
+    return bundle
+
+
+def build_bundle(regions_dir=REGION_FILES_DIR, lookup_file=LOOKUP_FILE, output_file=BUNDLE_FILE):
+    """Join the region files with the school lookup and write the binary bundle"""
+    regions = load_region_collections(regions_dir)
+    with open(lookup_file, 'r') as f:
+        lookup = json.load(f)
+
+    features = [feature for data in regions.values() for feature in data.get('features', [])]
+    rows = join_schools(features, lookup)
+    content = encode_bundle(rows)
+    write_atomic(output_file, content)
+    print(f"Bundled {len(rows)} schools ({sum(row['in_lookup'] for row in rows)} with lookup entries) "
+          f"into {output_file}: {len(content) / 1024:.1f} KB")
+    return content
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the binary school bundle the app loads at startup")
+    parser.add_argument('--regions-dir', default=REGION_FILES_DIR)
+    parser.add_argument('--lookup', default=LOOKUP_FILE)
+    parser.add_argument('--output', default=BUNDLE_FILE)
+    args = parser.parse_args()
+
+    print("=== Building School Bundle ===")
+    build_bundle(args.regions_dir, args.lookup, args.output)
@@ -1,40 +1,66 @@
 #!/usr/bin/env python3
 
-import json
-import os
-import glob
+from reconcile import reconcile, records_from_features, records_from_schools
+from schema import ClassesFile, CompiledSchools, DistrictsFile, SchoolMapping, SchoolsFile, dump, load
+from school_index import load_region_collections
 
-def load_json_file(file_path):
+def load_json_file(file_path, schema=None):
+    """Load a JSON file, decoding and validating it through schema when one is given"""
     try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
-    except Exception as e:
+        return load(file_path, schema)
+    except (OSError, ValueError) as e:
         print(f"Error loading {file_path}: {str(e)}")
         return None
 
+def build_school_mapping(regions):
+    """Build the school mapping data from region FeatureCollections keyed by region name"""
+    mapping_data = {
+        "school_mapping": {},
+        "class_mapping": {},
+        "region_mapping": {},
+        "district_mapping": {}
+    }
+    
+    # Extract school information from GeoJSON files
+    for region_name, data in regions.items():
+        class_num = region_name.split(' ')[1][0]
+        
+        for feature in data['features']:
+            if 'properties' in feature and 'name' in feature['properties']:
+                school_name = feature['properties']['name']
+                district = feature['properties'].get('district', 'Unknown')
+                
+                # Store mapping information
+                mapping_data["school_mapping"][school_name] = {
+                    "class": class_num,
+                    "region": region_name,
+                    "district": district,
+                    "coordinates": feature.get('geometry', {}).get('coordinates', [])
+                }
+    
+    return mapping_data
+
 def main():
     # Load the compiled schools data from GeoJSON files
-    compiled_data = load_json_file('data/compiled_schools.json')
+    compiled_data = load_json_file('data/compiled_schools.json', CompiledSchools)
     if not compiled_data:
         print("Failed to load compiled schools data")
         return
     
     # Load the current application data
-    vhsl_classes_regions = load_json_file('data/vhsl_classes_regions.json')
-    vhsl_districts = load_json_file('data/vhsl_districts.json')
-    va_schools_geocodes = load_json_file('data/va_schools_geocodes.json')
+    vhsl_classes_regions = load_json_file('data/vhsl_classes_regions.json', ClassesFile)
+    vhsl_districts = load_json_file('data/vhsl_districts.json', DistrictsFile)
+    va_schools_geocodes = load_json_file('data/va_schools_geocodes.json', SchoolsFile)
     
     if not all([vhsl_classes_regions, vhsl_districts, va_schools_geocodes]):
         print("Failed to load one or more application data files")
         return
     
     # Check if all schools from GeoJSON are in the application data
-    geojson_schools = set(compiled_data['all_schools'])
-    app_schools = set()
+    geojson_schools = set(compiled_data.all_schools)
     
     # Extract schools from va_schools_geocodes.json
-    for school in va_schools_geocodes.get('schools', []):
-        app_schools.add(school.get('name', ''))
+    app_schools = {school.name for school in va_schools_geocodes.schools}
     
     # Find missing schools
     missing_in_app = geojson_schools - app_schools
@@ -55,22 +81,35 @@ def main():
         for school in list(missing_in_geojson)[:10]:  # Show first 10 examples
             print(f"  - {school}")
     
+    # Names on both sides of the difference may be the same school spelled differently
+    regions = load_region_collections('data/geojson/schools_by_region')
+    if missing_in_app and missing_in_geojson:
+        app_records = [record for record in records_from_schools(va_schools_geocodes)
+                       if record.name in missing_in_geojson]
+        geojson_records = records_from_features(
+            feature for data in regions.values() for feature in data['features']
+            if feature.get('properties', {}).get('name') in missing_in_app)
+        reconciled = reconcile(app_records, geojson_records)
+        print(f"Probable renames: {len(reconciled['matches'])} matched, {len(reconciled['review'])} to review")
+        for match in reconciled['matches'] + reconciled['review']:
+            print(f"  {match['left']['name']} -> {match['right']['name']} ({match['method']}, score {match['score']})")
+    
     # Check class distribution
     print("\n=== CLASS DISTRIBUTION ===")
     print("In GeoJSON files:")
-    for class_num, schools in compiled_data['by_class'].items():
+    for class_num, schools in compiled_data.by_class.items():
         print(f"  Class {class_num}: {len(schools)} schools")
     
     # Check if the application has proper class filtering
     print("\n=== CLASS FILTERING CHECK ===")
     classes_in_app = {}
-    for class_info in vhsl_classes_regions.get('classes', []):
-        class_num = class_info.get('id', '').replace('class', '')
+    for class_info in vhsl_classes_regions.classes:
+        class_num = class_info.id.replace('class', '')
         classes_in_app[class_num] = []
         
         # Count schools in each region of this class
-        for region in class_info.get('regions', []):
-            region_id = region.get('id', '')
+        for region in class_info.regions:
+            region_id = region.id
             region_schools = []
             
             # We would need to check which schools are assigned to this region
@@ -83,37 +122,10 @@ def main():
         print(f"  Class {class_num}: {len(schools)} schools")
     
     # Create a mapping file to help with integration
-    mapping_data = {
-        "school_mapping": {},
-        "class_mapping": {},
-        "region_mapping": {},
-        "district_mapping": {}
-    }
+    mapping_data = build_school_mapping(regions)
     
-    # Extract school information from GeoJSON files
-    for file in glob.glob('data/geojson/schools_by_region/*.geojson'):
-        filename = os.path.basename(file)
-        region_name = filename.replace('.geojson', '')
-        class_num = region_name.split(' ')[1][0]
-        
-        with open(file) as f:
-            data = json.load(f)
-            for feature in data['features']:
-                if 'properties' in feature and 'name' in feature['properties']:
-                    school_name = feature['properties']['name']
-                    district = feature['properties'].get('district', 'Unknown')
-                    
-                    # Store mapping information
-                    mapping_data["school_mapping"][school_name] = {
-                        "class": class_num,
-                        "region": region_name,
-                        "district": district,
-                        "coordinates": feature.get('geometry', {}).get('coordinates', [])
-                    }
-    
-    # Save the mapping data
-    with open('data/school_mapping.json', 'w') as f:
-        json.dump(mapping_data, f, indent=2)
+    # Save the mapping data, validated against its schema on the way out
+    dump('data/school_mapping.json', SchoolMapping.decode(mapping_data))
     
     print("\nSchool mapping data saved to data/school_mapping.json")
     
@@ -121,7 +133,7 @@ def main():
     print("\n=== RECOMMENDATIONS ===")
     if missing_in_app:
         print("1. Update the application data to include all schools from the GeoJSON files")
-    if len(compiled_data['by_class']) > len(classes_in_app):
+    if len(compiled_data.by_class) > len(classes_in_app):
         print("2. Ensure all classes (1-6) are properly defined in the application")
     print("3. Verify that the class filtering functionality is correctly implemented")
     print("4. Use the generated school_mapping.json to update school classifications")
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import time
+from email.utils import formatdate
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from optimize_payloads import PRECISION, round_geometry
+from schema import dumps
+from school_index import REGION_FILES_DIR
+from school_table import SchoolRow, SchoolTable
+from simplify_boundaries import LEVELS, simplify_layer
+from spatial import REGION_POLYGONS_DIR, load_polygon_directory
+
+HOST = '127.0.0.1'
+PORT = 8765
+# The repository root, so /vhsl-map/data/... and /geojson/... resolve as on raw.githubusercontent.com
+STATIC_ROOT = ".."
+# Only the data directories the client fetches are served from it, never the rest of the checkout
+STATIC_PATHS = ('vhsl-map/data/geojson/', 'geojson/')
+KEEP_ALIVE_TIMEOUT = 15
+MAX_HEADERS = 100
+GZIP_MIN_BYTES = 1024
+RESPONSE_CACHE_SIZE = 256
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+COMPRESSIBLE = ('application/json', 'application/geo+json', 'text/', 'image/svg+xml')
+
+mimetypes.add_type('application/geo+json', '.geojson')
+mimetypes.add_type('application/json', '.topojson')
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class DataStore:
+    """The school table and every simplification level of the region polygons, held in memory
+
+    Polygons are simplified once per level at startup (as simplify_boundaries
+    writes them to disk) and rounded to PRECISION, so a region request is a
+    dictionary lookup.
+    """
+
+    def __init__(self, table, polygons, levels=LEVELS, precision=PRECISION):
+        self.table = table
+        self.levels = levels
+        self.regions = {}
+        for name, _, _, tolerance in levels:
+            simplified, _ = simplify_layer(polygons, tolerance)
+            self.regions[name] = {region: round_geometry(geometry, precision)
+                                  for region, geometry in simplified.items()}
+
+    @classmethod
+    def from_files(cls, regions_dir=REGION_FILES_DIR, polygons_dir=REGION_POLYGONS_DIR):
+        return cls(SchoolTable.from_region_files(regions_dir), load_polygon_directory(polygons_dir))
+
+    def level(self, simplify):
+        """Resolve a level name ("z6-7") or a zoom ("z8", "8") to a level name; default full detail"""
+        if not simplify:
+            return self.levels[-1][0]
+        if simplify in self.regions:
+            return simplify
+        zoom = simplify[1:] if simplify[:1] == 'z' else simplify
+        if not zoom.isdigit():
+            raise HTTPError(400, f"simplify must be a zoom like z8 or one of {', '.join(self.regions)}")
+        for name, min_zoom, max_zoom, _ in self.levels:
+            if min_zoom <= int(zoom) <= max_zoom:
+                return name
+        return self.levels[-1][0]
+
+    def region_name(self, region_id):
+        """Accept "3B" as well as "Region 3B\""""
+        for name in (region_id, f"Region {region_id}"):
+            if name in self.regions[self.levels[-1][0]]:
+                return name
+        raise HTTPError(404, f"Unknown region: {region_id}")
+
+    def region(self, region_id, simplify=None):
+        name = self.region_name(region_id)
+        level = self.level(simplify)
+        return {"type": "Feature", "id": name, "geometry": self.regions[level][name],
+                "properties": {"name": name, "level": level}}
+
+    def region_index(self):
+        return {"regions": sorted(self.regions[self.levels[-1][0]]),
+                "levels": [{"name": name, "min_zoom": min_zoom, "max_zoom": max_zoom}
+                           for name, min_zoom, max_zoom, _ in self.levels]}
+
+    def schools(self, class_num=None, region=None, district=None, bbox=None):
+        """Return the schools matching every given filter as a FeatureCollection"""
+        rows = self.table.rows_where(class_num, region, district)
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            lons, lats = self.table.lons[rows], self.table.lats[rows]
+            rows = rows[(lons >= min_lon) & (lons <= max_lon) & (lats >= min_lat) & (lats <= max_lat)]
+        features = []
+        for row in rows.tolist():
+            school = SchoolRow(self.table, row)
+            properties = school.lookup_entry()
+            properties['size'] = int(properties['size']) if properties['size'] else 0
+            coordinates = school.coordinates
+            features.append({"type": "Feature",
+                             "geometry": {"type": "Point", "coordinates": coordinates} if coordinates else None,
+                             "properties": properties})
+        return {"type": "FeatureCollection", "features": features}
+
+
+def parse_bbox(value):
+    try:
+        bbox = [float(part) for part in value.split(',')]
+    except ValueError:
+        bbox = []
+    if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+        raise HTTPError(400, "bbox must be min_lon,min_lat,max_lon,max_lat")
+    return bbox
+
+
+class Response:
+    """A response body with its ETag and, once asked for, its gzip encoding"""
+
+    def __init__(self, body, content_type='application/json', status=200):
+        self.body = body
+        self.content_type = content_type
+        self.status = status
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:20]}"'
+        self._gzipped = None
+
+    @property
+    def compressible(self):
+        return len(self.body) >= GZIP_MIN_BYTES and self.content_type.startswith(COMPRESSIBLE)
+
+    @property
+    def gzipped(self):
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzipped
+
+
+def json_response(data, status=200):
+    return Response(dumps(data, indent=None), 'application/json', status)
+
+
+class DataServer:
+    """A small HTTP/1.1 server over asyncio streams for the school and region query API
+
+    GET /schools?class=&region=&district=&bbox=  schools matching every filter, as GeoJSON
+    GET /regions                                 region names and simplification levels
+    GET /regions/{id}?simplify=z8                one region polygon at the level for a zoom
+    GET /<path>                                  a data file under the static root (STATIC_PATHS)
+
+    Connections stay open between requests (HTTP/1.1 keep-alive) until the
+    client closes them or sits idle for KEEP_ALIVE_TIMEOUT seconds. Bodies
+    are gzipped for clients that accept it and carry an ETag, so a repeated
+    request with If-None-Match costs a 304. The data never changes while the
+    server runs, so rendered query responses are cached by path and query.
+    """
+
+    def __init__(self, store, static_root=STATIC_ROOT, static_paths=STATIC_PATHS):
+        self.store = store
+        self.static_root = Path(static_root).resolve()
+        self.static_paths = static_paths
+        self.render = lru_cache(maxsize=RESPONSE_CACHE_SIZE)(self._render)
+        self.requests = 0
+
+    def _render(self, path, query):
+        params = dict(query)
+        if path == '/schools':
+            class_num = params.get('class') or None
+            if class_num is not None and not class_num.isdigit():
+                raise HTTPError(400, "class must be a class number")
+            bbox = parse_bbox(params['bbox']) if params.get('bbox') else None
+            return json_response(self.store.schools(class_num, params.get('region') or None,
+                                                    params.get('district') or None, bbox))
+        if path in ('/regions', '/regions/'):
+            return json_response(self.store.region_index())
+        if path.startswith('/regions/'):
+            return json_response(self.store.region(path[len('/regions/'):], params.get('simplify')))
+        return None
+
+    def static_file(self, path):
+        """Return (file path, ETag) for a data file under the static root; the ETag comes from size and mtime
+
+        Only paths under static_paths are served, and no path segment may
+        start with a dot, so .git and other hidden files stay private.
+        """
+        relative = path.lstrip('/')
+        if (not relative.startswith(self.static_paths)
+                or any(part.startswith('.') for part in relative.split('/'))):
+            raise HTTPError(404, f"Not found: {path}")
+        file_path = (self.static_root / relative).resolve()
+        allowed = [(self.static_root / prefix).resolve() for prefix in self.static_paths]
+        if not any(file_path.is_relative_to(root) for root in allowed) or not file_path.is_file():
+            raise HTTPError(404, f"Not found: {path}")
+        stat = file_path.stat()
+        return file_path, f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+    def respond(self, method, target, headers):
+        """Return (status, headers, body) for one request"""
+        if method not in ('GET', 'HEAD'):
+            raise HTTPError(405, f"Method not allowed: {method}")
+        parts = urlsplit(target)
+        path = unquote(parts.path)
+        query = tuple(sorted(parse_qsl(parts.query)))
+        response = self.render(path, query)
+        if response is None:
+            file_path, etag = self.static_file(path)
+            if etag in headers.get('if-none-match', ''):
+                return 304, {'ETag': etag}, b''
+            content_type = mimetypes.guess_type(file_path.name)[0] or 'application/octet-stream'
+            response = Response(file_path.read_bytes(), content_type)
+            response.etag = etag
+        return self.encode(response, headers)
+
+    def encode(self, response, headers):
+        extra = {'ETag': response.etag, 'Content-Type': response.content_type}
+        if response.compressible:
+            extra['Vary'] = 'Accept-Encoding'
+        if response.status == 200 and response.etag in headers.get('if-none-match', ''):
+            return 304, {'ETag': response.etag}, b''
+        body = response.body
+        if response.compressible and 'gzip' in headers.get('accept-encoding', ''):
+            body = response.gzipped
+            extra['Content-Encoding'] = 'gzip'
+        return response.status, extra, body
+
+    async def read_request(self, reader):
+        """Read a request line and headers; returns None when the client has gone"""
+        line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        for _ in range(MAX_HEADERS):
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+        else:
+            raise HTTPError(400, "Too many headers")
+        if headers.get('content-length', '0').isdigit() and int(headers.get('content-length', '0')):
+            await reader.readexactly(int(headers['content-length']))
+        return method, target, version, headers
+
+    async def handle(self, reader, writer):
+        """Serve requests on one connection until it closes or idles out"""
+        try:
+            while True:
+                method, keep_alive = 'GET', False
+                try:
+                    request = await self.read_request(reader)
+                    if request is None:
+                        break
+                    method, target, version, headers = request
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+                    status, extra, body = self.respond(method, target, headers)
+                except HTTPError as e:
+                    status, extra, body = self.encode(json_response({'error': e.message}, e.status), {})
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    break
+                except Exception as e:
+                    print(f"Error serving request: {type(e).__name__}: {e}")
+                    status, extra, body = self.encode(json_response({'error': 'internal error'}, 500), {})
+
+                self.requests += 1
+                head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                        f"Date: {formatdate(usegmt=True)}",
+                        f"Content-Length: {len(body)}",
+                        "Access-Control-Allow-Origin: *",
+                        "Cache-Control: no-cache",
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                if keep_alive:
+                    head.append(f"Keep-Alive: timeout={KEEP_ALIVE_TIMEOUT}")
+                head += [f"{key}: {value}" for key, value in extra.items()]
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+                if method != 'HEAD':
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving school data on http://{host}:{port}/ (static files from {self.static_root})")
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve school and region queries over HTTP from memory")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--regions-dir', default=REGION_FILES_DIR, help="school region files")
+    parser.add_argument('--polygons-dir', default=REGION_POLYGONS_DIR, help="region boundary polygons")
+    parser.add_argument('--static-root', default=STATIC_ROOT,
+                        help="directory whose data paths are served (default: the repository root, like the raw GitHub URLs)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = DataStore.from_files(args.regions_dir, args.polygons_dir)
+    print(f"Loaded {len(store.table)} schools and {len(store.region_index()['regions'])} regions at "
+          f"{len(store.levels)} levels in {time.perf_counter() - start:.1f}s")
+    try:
+        asyncio.run(DataServer(store, args.static_root).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+
+import csv
+import json
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from geojson_stream import write_atomic
+from spatial import PolygonIndex, STRtree, load_polygon_layer, polygon_parts, ray_crossings, ring_area
+
+OUTPUT_DIR = "dist/data/dissolved"
+EPSILON = 1e-12  # tolerance on segment parameters when noding
+OFFSET = 1e-9  # degrees to step off an edge when testing which side is inside
+
+
+def load_assignments(path, county_column='county', region_column='region'):
+    """Load a county-to-region assignment table as {region: [county names]}
+
+    CSV files need county and region columns; a county may appear once per
+    region it belongs to (one row per class, for example). JSON files map
+    either region -> [counties] or county -> region.
+    """
+    groups = defaultdict(list)
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        with open(path, 'r', newline='') as f:
+            for row in csv.DictReader(f):
+                groups[row[region_column].strip()].append(row[county_column].strip())
+        return dict(groups)
+
+    with open(path, 'r') as f:
+        data = json.load(f)
+    for key, value in data.items():
+        if isinstance(value, list):
+            groups[key].extend(value)
+        else:
+            groups[value].append(key)
+    return dict(groups)
+
+
+def _segments(geometries):
+    """Return every ring edge of the geometries as rows of (x1, y1, x2, y2), zero-length edges dropped"""
+    rows = []
+    for geometry in geometries:
+        for polygon in polygon_parts(geometry):
+            for ring in polygon:
+                points = np.asarray(ring, dtype=np.float64)[:, :2]
+                if len(points) < 2:
+                    continue
+                if not np.array_equal(points[0], points[-1]):
+                    points = np.vstack([points, points[:1]])
+                rows.append(np.hstack([points[:-1], points[1:]]))
+    segments = np.vstack(rows) if rows else np.empty((0, 4))
+    return segments[np.any(segments[:, :2] != segments[:, 2:], axis=1)]
+
+
+def _split_points(segments):
+    """Find, for every segment, the points where other segments cross or touch it
+
+    Segments are swept in order of their left edge, so each one is only
+    tested against the segments whose boxes overlap it. Where an end point
+    of one segment lies on another, the exact end point is used so both
+    sides of the split agree bit for bit.
+    """
+    splits = defaultdict(list)
+    min_x = np.minimum(segments[:, 0], segments[:, 2])
+    max_x = np.maximum(segments[:, 0], segments[:, 2])
+    min_y = np.minimum(segments[:, 1], segments[:, 3])
+    max_y = np.maximum(segments[:, 1], segments[:, 3])
+    order = np.argsort(min_x, kind='stable')
+    sorted_min_x = min_x[order]
+
+    for position, i in enumerate(order):
+        end = np.searchsorted(sorted_min_x, max_x[i], side='right')
+        candidates = order[position + 1:end]
+        candidates = candidates[(min_y[candidates] <= max_y[i]) & (max_y[candidates] >= min_y[i])]
+        if not len(candidates):
+            continue
+
+        p = segments[i, :2]
+        r = segments[i, 2:] - p
+        q = segments[candidates, :2]
+        s = segments[candidates, 2:] - q
+        qp = q - p
+        denom = r[0] * s[:, 1] - r[1] * s[:, 0]
+        t_num = qp[:, 0] * s[:, 1] - qp[:, 1] * s[:, 0]
+        u_num = qp[:, 0] * r[1] - qp[:, 1] * r[0]
+
+        for k, j in enumerate(candidates):
+            if denom[k] != 0:
+                t, u = t_num[k] / denom[k], u_num[k] / denom[k]
+                if not (-EPSILON <= t <= 1 + EPSILON and -EPSILON <= u <= 1 + EPSILON):
+                    continue
+                # Prefer an exact end point when the crossing lands on one
+                if abs(u) <= EPSILON or abs(u - 1) <= EPSILON:
+                    point = tuple(segments[j, :2] if abs(u) <= EPSILON else segments[j, 2:])
+                elif abs(t) <= EPSILON or abs(t - 1) <= EPSILON:
+                    point = tuple(p if abs(t) <= EPSILON else segments[i, 2:])
+                else:
+                    point = (p[0] + t * r[0], p[1] + t * r[1])
+                splits[i].append(point)
+                splits[j].append(point)
+            elif u_num[k] == 0:
+                # Collinear: split each segment at the other's end points that fall inside it
+                for a, b in ((i, j), (j, i)):
+                    start, direction = segments[a, :2], segments[a, 2:] - segments[a, :2]
+                    length = float(np.dot(direction, direction))
+                    for point in (segments[b, :2], segments[b, 2:]):
+                        t = float(np.dot(point - start, direction)) / length
+                        if EPSILON < t < 1 - EPSILON:
+                            splits[a].append(tuple(point))
+    return splits
+
+
+def _noded_edges(segments):
+    """Split segments at every intersection and return the distinct undirected edges"""
+    splits = _split_points(segments)
+    edges = set()
+    for i, (x1, y1, x2, y2) in enumerate(segments):
+        start, end = (float(x1), float(y1)), (float(x2), float(y2))
+        points = [start] + splits.get(i, []) + [end]
+        dx, dy = x2 - x1, y2 - y1
+        points.sort(key=lambda point: (point[0] - x1) * dx + (point[1] - y1) * dy)
+        for a, b in zip(points, points[1:]):
+            a, b = (float(a[0]), float(a[1])), (float(b[0]), float(b[1]))
+            if a != b:
+                edges.add((a, b) if a < b else (b, a))
+    return list(edges)
+
+
+def _union_edges(geometries, index):
+    """Return the noded edges that have the union on exactly one side, directed with it on the left"""
+    segments = _segments(geometries)
+    if not len(segments):
+        return []
+    edges = np.array(_noded_edges(segments), dtype=np.float64).reshape(-1, 4)
+
+    # Probe a tiny step to each side of every edge midpoint
+    middle = (edges[:, :2] + edges[:, 2:]) / 2
+    direction = edges[:, 2:] - edges[:, :2]
+    length = np.hypot(direction[:, 0], direction[:, 1])
+    normal = np.column_stack([-direction[:, 1], direction[:, 0]]) / length[:, None]
+    step = np.minimum(OFFSET, length / 4)[:, None]
+    left = middle + normal * step
+    right = middle - normal * step
+    inside_left = index.contains(left[:, 0], left[:, 1]).any(axis=1)
+    inside_right = index.contains(right[:, 0], right[:, 1]).any(axis=1)
+
+    directed = []
+    for edge, is_left, is_right in zip(edges.tolist(), inside_left, inside_right):
+        if is_left and not is_right:
+            directed.append([(edge[0], edge[1]), (edge[2], edge[3])])
+        elif is_right and not is_left:
+            directed.append([(edge[2], edge[3]), (edge[0], edge[1])])
+    return directed
+
+
+def _stitch(edges):
+    """Join directed edges end to start into closed rings"""
+    outgoing = defaultdict(list)
+    for edge in edges:
+        outgoing[edge[0]].append(edge)
+
+    rings = []
+    for start in list(outgoing):
+        while outgoing[start]:
+            ring = list(outgoing[start].pop())
+            while ring[-1] != ring[0] and outgoing.get(ring[-1]):
+                ring.extend(outgoing[ring[-1]].pop()[1:])
+            if ring[-1] == ring[0] and len(ring) >= 4:
+                rings.append(_drop_collinear(ring))
+    return rings
+
+
+def _drop_collinear(ring):
+    """Remove vertices that sit on the straight line between their neighbours (noding leaves many)"""
+    points = ring[:-1]
+    kept = []
+    for i, (x, y) in enumerate(points):
+        (px, py), (nx, ny) = points[i - 1], points[(i + 1) % len(points)]
+        if (x - px) * (ny - y) - (y - py) * (nx - x) != 0:
+            kept.append((x, y))
+    return kept + kept[:1] if len(kept) >= 3 else ring
+
+
+def _assemble(rings):
+    """Group stitched rings into polygons, attaching each hole to the smallest outer ring around it"""
+    outers = [ring for ring in rings if ring_area(ring) > 0]
+    holes = [ring for ring in rings if ring_area(ring) < 0]
+    polygons = [[[list(point) for point in ring]] for ring in outers]
+    if not holes or not outers:
+        return polygons
+
+    arrays = [np.asarray(ring, dtype=np.float64) for ring in outers]
+    areas = [ring_area(ring) for ring in outers]
+    tree = STRtree([(a[:, 0].min(), a[:, 1].min(), a[:, 0].max(), a[:, 1].max()) for a in arrays])
+    # A hole edge midpoint lies inside its outer ring even when the hole touches it at a vertex
+    probes = np.array([[(hole[0][0] + hole[1][0]) / 2, (hole[0][1] + hole[1][1]) / 2] for hole in holes])
+    hole_idx, outer_idx = tree.query_points(probes[:, 0], probes[:, 1])
+
+    owner = {}
+    for hole, outer in zip(hole_idx, outer_idx):
+        inside = ray_crossings(probes[hole:hole + 1, 0], probes[hole:hole + 1, 1], arrays[outer])[0] % 2
+        if inside and (hole not in owner or areas[outer] < areas[owner[hole]]):
+            owner[hole] = outer
+    for hole, outer in owner.items():
+        polygons[outer].append([list(point) for point in holes[hole]])
+    return polygons
+
+
+def union(geometries):
+    """Union Polygon/MultiPolygon geometries into one MultiPolygon
+
+    The rings are noded against each other (split wherever they cross or
+    touch), and every resulting edge is kept when the union lies on exactly
+    one side of it, which both removes shared borders and cuts away overlaps.
+    The kept edges, directed with the union on their left, are stitched into
+    counter-clockwise outer rings and clockwise holes.
+    """
+    geometries = [g for g in geometries if g and g.get('coordinates')]
+    if not geometries:
+        return {"type": "MultiPolygon", "coordinates": []}
+    index = PolygonIndex({i: geometry for i, geometry in enumerate(geometries)})
+    return {"type": "MultiPolygon", "coordinates": _assemble(_stitch(_union_edges(geometries, index)))}
+
+
+def dissolve(polygons, groups):
+    """Union named polygons into one MultiPolygon per group ({group: [member names]})"""
+    missing = sorted({name for members in groups.values() for name in members if name not in polygons})
+    if missing:
+        raise KeyError(f"Unknown polygons in assignment table: {', '.join(missing)}")
+    return {group: union([polygons[name] for name in dict.fromkeys(members)]) for group, members in groups.items()}
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Dissolve county polygons into region polygons")
+    parser.add_argument('counties', help="county polygons (FeatureCollection or directory of geometries)")
+    parser.add_argument('--assignments', help="county-to-region table (.csv or .json)")
+    parser.add_argument('--all', metavar='NAME', help="dissolve every polygon into one outline called NAME")
+    parser.add_argument('--name-property', default='name')
+    parser.add_argument('--county-column', default='county')
+    parser.add_argument('--region-column', default='region')
+    parser.add_argument('--pattern', default="*.geojson", help="file pattern when counties is a directory")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    if not args.assignments and not args.all:
+        parser.error("give --assignments or --all")
+
+    start = time.perf_counter()
+    source = Path(args.counties)
+    if source.is_dir():
+        polygons = {}
+        for file_path in sorted(source.glob(args.pattern)):
+            polygons.update(load_polygon_layer(file_path, args.name_property))
+    else:
+        polygons = load_polygon_layer(source, args.name_property)
+
+    if args.assignments:
+        groups = load_assignments(args.assignments, args.county_column, args.region_column)
+    else:
+        groups = {args.all: list(polygons)}
+
+    print("=== Dissolving Polygons ===")
+    dissolved = dissolve(polygons, groups)
+    for name, geometry in dissolved.items():
+        write_atomic(Path(args.output_dir) / f"{name}.geojson", json.dumps(geometry).encode('utf-8'))
+        parts = geometry['coordinates']
+        print(f"{name}: {len(groups[name])} members -> {len(parts)} parts, "
+              f"{sum(len(part) - 1 for part in parts)} holes")
+    elapsed = time.perf_counter() - start
+    print(f"Dissolved {len(polygons)} polygons into {len(dissolved)} groups in {elapsed:.2f}s "
+          f"-> {args.output_dir}")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from geojson_stream import write_atomic
+from nearest import SCHOOL_MAPPING_FILE, haversine_km
+from profiling import profiler
+
+DISTANCE_FILE = "data/school_distances.npy"
+BLOCK_ROWS = 1024
+
+
+def index_path(matrix_path):
+    """The school-ID index stored next to a matrix file (school_distances.npy -> school_distances.json)"""
+    return Path(matrix_path).with_suffix('.json')
+
+
+def load_schools(school_mapping):
+    """Return a list of {name, district, region, lon, lat} from a loaded school_mapping.json"""
+    schools = []
+    for name, school in school_mapping.get('school_mapping', {}).items():
+        coordinates = school.get('coordinates') or []
+        if len(coordinates) >= 2:
+            schools.append({'name': name, 'district': school.get('district', ''),
+                            'region': school.get('region', ''), 'lon': coordinates[0], 'lat': coordinates[1]})
+    return schools
+
+
+def pairwise_km(lons, lats, out=None, block_rows=BLOCK_ROWS):
+    """Fill an (n, n) float32 array with great-circle distances, a block of rows at a time"""
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    count = len(lons)
+    out = np.empty((count, count), dtype=np.float32) if out is None else out
+    for start in range(0, count, block_rows):
+        stop = min(count, start + block_rows)
+        out[start:stop] = haversine_km(lons[start:stop, None], lats[start:stop, None], lons[None, :], lats[None, :])
+    return out
+
+
+def save_distance_matrix(path, schools, block_rows=BLOCK_ROWS):
+    """Compute the matrix straight into a memory-mapped .npy file and write its school index beside it"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    count = len(schools)
+    matrix = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(count, count))
+    pairwise_km([s['lon'] for s in schools], [s['lat'] for s in schools], matrix, block_rows)
+    matrix.flush()
+    del matrix
+    os.replace(tmp_path, path)
+    profiler.record(bytes_written=path.stat().st_size, files_written=1)
+
+    index = {'schools': [{key: school[key] for key in ('name', 'district', 'region')} for school in schools]}
+    write_atomic(index_path(path), json.dumps(index, indent=2).encode('utf-8'))
+    return path
+
+
+class DistanceMatrix:
+    """All-pairs school distances (km) shared read-only through a memory map
+
+    The matrix is opened with mmap_mode='r', so every process that loads it
+    shares the same pages and nothing is copied until rows are touched.
+    """
+
+    def __init__(self, matrix, schools):
+        self.matrix = matrix
+        self.schools = schools
+        self.ids = {school['name']: i for i, school in enumerate(schools)}
+
+    @classmethod
+    def load(cls, path=DISTANCE_FILE):
+        with open(index_path(path), 'r') as f:
+            schools = json.load(f)['schools']
+        matrix = np.load(path, mmap_mode='r')
+        if matrix.shape != (len(schools), len(schools)):
+            raise ValueError(f"{path} does not match its school index")
+        return cls(matrix, schools)
+
+    def __len__(self):
+        return len(self.schools)
+
+    def distance(self, a, b):
+        return float(self.matrix[self.ids[a], self.ids[b]])
+
+    def submatrix(self, names):
+        ids = [self.ids[name] for name in names]
+        return self.matrix[np.ix_(ids, ids)]
+
+    def groups(self, key):
+        """Group school names by a school field such as 'district' or 'region'"""
+        grouped = defaultdict(list)
+        for school in self.schools:
+            if school.get(key):
+                grouped[school[key]].append(school['name'])
+        return dict(sorted(grouped.items()))
+
+    def travel_stats(self, key='district'):
+        """Return per-group travel statistics in km for every group of the given field"""
+        stats = {}
+        for group, names in self.groups(key).items():
+            distances = self.submatrix(names)
+            pairs = distances[np.triu_indices(len(names), k=1)]
+            average_trip = distances.sum(axis=1) / max(1, len(names) - 1)
+            farthest = int(np.argmax(average_trip)) if len(names) > 1 else 0
+            stats[group] = {
+                'schools': len(names),
+                'mean_km': round(float(pairs.mean()), 2) if len(pairs) else 0.0,
+                'median_km': round(float(np.median(pairs)), 2) if len(pairs) else 0.0,
+                'max_km': round(float(pairs.max()), 2) if len(pairs) else 0.0,
+                'most_remote_school': names[farthest],
+                'most_remote_mean_km': round(float(average_trip[farthest]), 2),
+            }
+        return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the school distance matrix or report travel statistics")
+    parser.add_argument('--schools', default=SCHOOL_MAPPING_FILE)
+    parser.add_argument('--matrix', default=DISTANCE_FILE)
+    parser.add_argument('--stats', choices=['district', 'region'], help="report travel statistics from the matrix")
+    parser.add_argument('--output', help="write the statistics to this JSON file")
+    args = parser.parse_args()
+
+    if args.stats:
+        stats = DistanceMatrix.load(args.matrix).travel_stats(args.stats)
+        for group, values in sorted(stats.items(), key=lambda item: -item[1]['mean_km']):
+            print(f"{group:<24} {values['schools']:>3} schools  mean {values['mean_km']:7.1f} km  "
+                  f"max {values['max_km']:7.1f} km  most remote: {values['most_remote_school']}")
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(stats, f, indent=2)
+            print(f"Statistics saved to {args.output}")
+    else:
+        print("=== Building School Distance Matrix ===")
+        with open(args.schools, 'r') as f:
+            schools = load_schools(json.load(f))
+        save_distance_matrix(args.matrix, schools)
+        print(f"Saved {len(schools)}x{len(schools)} distances to {args.matrix} (index {index_path(args.matrix)})")
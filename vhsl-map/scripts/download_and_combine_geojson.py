@@ -3,40 +3,25 @@
 import json
 import os
 import glob
-import requests
 from collections import defaultdict
 
-def download_geojson_files():
+from geojson_stream import iter_features, stream_combine
+from region_downloader import BASE_URL, download_regions, region_names
+
+def download_geojson_files(base_url=BASE_URL):
     """Download all GeoJSON files from GitHub repository"""
-    base_url = "https://raw.githubusercontent.com/wallyatkins/vhsl/main/geojson/vhsl_regions/schools_by_region/"
     output_dir = "data/geojson/schools_by_region"
     
     # Ensure output directory exists
     os.makedirs(output_dir, exist_ok=True)
     
-    # List of all region files to download
-    regions = []
-    for class_num in range(1, 7):  # Classes 1-6
-        for region_letter in ['A', 'B', 'C', 'D']:  # Regions A-D
-            regions.append(f"Region {class_num}{region_letter}")
+    # List of all region files to download (Classes 1-6, Regions A-D)
+    regions = region_names()
     
     print(f"Downloading {len(regions)} region files...")
     
-    # Download each file
-    for region in regions:
-        url = f"{base_url}{region.replace(' ', '%20')}.geojson"
-        output_file = f"{output_dir}/{region}.geojson"
-        
-        print(f"Downloading {region}...")
-        try:
-            response = requests.get(url)
-            response.raise_for_status()  # Raise exception for 4XX/5XX responses
-            
-            with open(output_file, 'w') as f:
-                f.write(response.text)
-            print(f"  Success: {output_file}")
-        except Exception as e:
-            print(f"  Error downloading {region}: {str(e)}")
+    # Download concurrently, reusing cached copies of unchanged files
+    download_regions(lambda region: [f"{output_dir}/{region}.geojson"], regions, base_url=base_url)
     
     return regions
 
@@ -48,65 +33,22 @@ def combine_geojson_files():
     # Ensure output directory exists
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
     
-    # Initialize combined GeoJSON
-    combined = {
-        "type": "FeatureCollection",
-        "features": []
-    }
-    
-    # Track unique schools to avoid duplicates
-    unique_schools = set()
-    
-    # Process all GeoJSON files
-    files = glob.glob(f"{input_dir}/*.geojson")
+    # Process all GeoJSON files, streaming features straight to the output
+    files = sorted(glob.glob(f"{input_dir}/*.geojson"))
     print(f"Combining {len(files)} GeoJSON files...")
     
-    feature_id = 1
-    for file_path in files:
-        region_name = os.path.basename(file_path).replace('.geojson', '')
-        print(f"Processing {region_name}...")
-        
-        try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-            
-            for feature in data.get('features', []):
-                # Extract school name
-                school_name = feature.get('properties', {}).get('name')
-                
-                if school_name and school_name not in unique_schools:
-                    # Add unique ID to feature
-                    feature['id'] = feature_id
-                    feature_id += 1
-                    
-                    # Add to combined features
-                    combined['features'].append(feature)
-                    unique_schools.add(school_name)
-        except Exception as e:
-            print(f"  Error processing {file_path}: {str(e)}")
-    
-    # Save combined GeoJSON
-    with open(output_file, 'w') as f:
-        json.dump(combined, f)
+    school_count = stream_combine(files, output_file)
     
     print(f"Combined GeoJSON saved to {output_file}")
-    print(f"Total unique schools: {len(unique_schools)}")
+    print(f"Total unique schools: {school_count}")
     
-    return combined
+    return school_count
 
-def create_school_lookup():
-    """Create a lookup file for school information"""
-    input_file = "dist/data/geojson/all_schools.geojson"
-    output_file = "dist/data/geojson/school_lookup.json"
-    
-    # Load combined GeoJSON
-    with open(input_file, 'r') as f:
-        data = json.load(f)
-    
-    # Create lookup dictionary
+def build_school_lookup(features):
+    """Build the school lookup dictionary from combined school features"""
     lookup = {}
     
-    for feature in data.get('features', []):
+    for feature in features:
         properties = feature.get('properties', {})
         school_name = properties.get('name')
         
@@ -123,6 +65,16 @@ def create_school_lookup():
                 'district': properties.get('district', '')
             }
     
+    return lookup
+
+def create_school_lookup():
+    """Create a lookup file for school information"""
+    input_file = "dist/data/geojson/all_schools.geojson"
+    output_file = "dist/data/geojson/school_lookup.json"
+    
+    # Create lookup dictionary, reading the combined GeoJSON one feature at a time
+    lookup = build_school_lookup(iter_features(input_file))
+    
     # Save lookup file
     with open(output_file, 'w') as f:
         json.dump(lookup, f, indent=2)
@@ -139,14 +91,14 @@ def main():
     regions = download_geojson_files()
     
     # Step 2: Combine all GeoJSON files
-    combined = combine_geojson_files()
+    school_count = combine_geojson_files()
     
     # Step 3: Create school lookup
     lookup = create_school_lookup()
     
     print("\n=== Summary ===")
     print(f"Downloaded {len(regions)} region files")
-    print(f"Combined {len(combined['features'])} unique schools")
+    print(f"Combined {school_count} unique schools")
     print(f"Created lookup with {len(lookup)} schools")
     print("\nProcessing complete!")
 
@@ -2,27 +2,14 @@
 
 import json
 import os
-from pathlib import Path
 
-def fix_class_region_assignment():
-    """Fix class and region assignments in the combined GeoJSON and lookup files"""
-    
-    dist_geojson_dir = Path("/home/ubuntu/vhsl-map-project/dist/data/geojson")
-    
-    # Load all_schools.geojson
-    all_schools_file = dist_geojson_dir / "all_schools.geojson"
-    with open(all_schools_file, 'r') as f:
-        all_schools_data = json.load(f)
-    
-    # Load school_lookup.json
-    lookup_file = dist_geojson_dir / "school_lookup.json"
-    with open(lookup_file, 'r') as f:
-        lookup_data = json.load(f)
-    
-    print(f"Fixing class and region assignments for {len(all_schools_data.get('features', []))} schools...")
-    
+from associations import VHSL
+from school_index import SchoolIndex
+
+def fix_source_file_regions(features, lookup_data, classes=VHSL.classes):
+    """Add class numbers to regions using each feature's source file and rebuild the lookup from the features"""
     # Fix region and class assignments in all_schools.geojson
-    for feature in all_schools_data.get('features', []):
+    for feature in features:
         properties = feature.get('properties', {})
         region = properties.get('region', '')
         
@@ -31,7 +18,7 @@ def fix_class_region_assignment():
             region_letter = region[7:]  # Extract "A", "B", "C", or "D"
             
             # Determine class number from filename
-            for class_num in range(1, 7):
+            for class_num in range(1, classes + 1):
                 if f"Region {class_num}{region_letter}" in properties.get('_source_file', ''):
                     # Update region to include class number
                     properties['region'] = f"Region {class_num}{region_letter}"
@@ -53,24 +40,13 @@ def fix_class_region_assignment():
                             properties['class'] = f"Class {class_num}"
                             properties['size'] = class_num
     
-    # Save updated all_schools.geojson
-    with open(all_schools_file, 'w') as f:
-        json.dump(all_schools_data, f)
-    
-    print(f"Updated all_schools.geojson with fixed class and region assignments")
-    
     # Fix lookup data
+    index = SchoolIndex.from_feature_collection({'features': features})
     updated_lookup = {}
     
     for school_name, school_data in lookup_data.items():
-        region = school_data.get('region', '')
-        
         # Find matching feature in all_schools_data
-        matching_feature = None
-        for feature in all_schools_data.get('features', []):
-            if feature.get('properties', {}).get('name') == school_name:
-                matching_feature = feature
-                break
+        matching_feature = index.feature(school_name)
         
         if matching_feature:
             properties = matching_feature.get('properties', {})
@@ -85,6 +61,34 @@ def fix_class_region_assignment():
             # Keep original data if no match found
             updated_lookup[school_name] = school_data
     
+    return updated_lookup
+
+def fix_class_region_assignment(association=VHSL):
+    """Fix class and region assignments in the combined GeoJSON and lookup files"""
+    
+    dist_geojson_dir = association.output_root / "dist" / "data" / "geojson"
+    
+    # Load all_schools.geojson
+    all_schools_file = dist_geojson_dir / "all_schools.geojson"
+    with open(all_schools_file, 'r') as f:
+        all_schools_data = json.load(f)
+    
+    # Load school_lookup.json
+    lookup_file = dist_geojson_dir / "school_lookup.json"
+    with open(lookup_file, 'r') as f:
+        lookup_data = json.load(f)
+    
+    print(f"Fixing class and region assignments for {len(all_schools_data.get('features', []))} schools...")
+    
+    updated_lookup = fix_source_file_regions(all_schools_data.get('features', []), lookup_data,
+                                             association.classes)
+    
+    # Save updated all_schools.geojson
+    with open(all_schools_file, 'w') as f:
+        json.dump(all_schools_data, f)
+    
+    print(f"Updated all_schools.geojson with fixed class and region assignments")
+    
     # Save updated lookup
     with open(lookup_file, 'w') as f:
         json.dump(updated_lookup, f, indent=2)
@@ -93,49 +97,52 @@ def fix_class_region_assignment():
     
     return len(updated_lookup)
 
-def extract_class_from_region_files():
-    """Extract class information from region filenames and update the combined dataset"""
+def apply_region_classes(features, lookup_data, school_mapping):
+    """Copy class, size and region from the region-file index onto matching features and lookup entries"""
+    for feature in features:
+        school_name = feature.get('properties', {}).get('name')
+        school = school_mapping.get(school_name)
+        if school:
+            feature['properties']['class'] = school['class']
+            feature['properties']['size'] = school['size']
+            feature['properties']['region'] = school['region']
     
-    dist_geojson_dir = Path("/home/ubuntu/vhsl-map-project/dist/data/geojson")
-    data_geojson_dir = Path("/home/ubuntu/vhsl-map-project/data/geojson/schools_by_region")
+    for school_name, school_data in lookup_data.items():
+        school = school_mapping.get(school_name)
+        if school:
+            school_data['class'] = school['class']
+            school_data['size'] = school['size']
+            school_data['region'] = school['region']
+
+def report_duplicates(school_mapping):
+    """Print the schools listed in more than one region file and the listing that was kept"""
+    for school_name in sorted(set(school_mapping.duplicates)):
+        print(f"  {school_name} is listed in more than one region file; using {school_mapping.get(school_name)['region']}")
+
+def extract_class_from_region_files(association=VHSL):
+    """Extract class information from region filenames and update the combined dataset"""
     
-    # Create a mapping of school names to their correct class and region
-    school_mapping = {}
+    dist_geojson_dir = association.output_root / "dist" / "data" / "geojson"
+    data_geojson_dir = association.regions_dir
     
-    # Process all region files to extract class information
-    for class_num in range(1, 7):
-        for region_letter in ['A', 'B', 'C', 'D']:
-            region_file = data_geojson_dir / f"Region {class_num}{region_letter}.geojson"
-            
-            if region_file.exists():
-                try:
-                    with open(region_file, 'r') as f:
-                        data = json.load(f)
-                    
-                    for feature in data.get('features', []):
-                        school_name = feature.get('properties', {}).get('name')
-                        if school_name:
-                            school_mapping[school_name] = {
-                                'class': f"Class {class_num}",
-                                'size': str(class_num),
-                                'region': f"Region {class_num}{region_letter}"
-                            }
-                except Exception as e:
-                    print(f"Error processing {region_file}: {str(e)}")
+    # Index every school by its correct class and region, taken from the region filenames;
+    # a school listed in several region files takes the last listing
+    school_mapping = SchoolIndex.from_region_files(data_geojson_dir, last_wins=True)
     
     print(f"Extracted class and region information for {len(school_mapping)} schools")
+    report_duplicates(school_mapping)
     
-    # Update all_schools.geojson with the correct class and region information
+    # Load all_schools.geojson and school_lookup.json
     all_schools_file = dist_geojson_dir / "all_schools.geojson"
     with open(all_schools_file, 'r') as f:
         all_schools_data = json.load(f)
     
-    for feature in all_schools_data.get('features', []):
-        school_name = feature.get('properties', {}).get('name')
-        if school_name and school_name in school_mapping:
-            feature['properties']['class'] = school_mapping[school_name]['class']
-            feature['properties']['size'] = school_mapping[school_name]['size']
-            feature['properties']['region'] = school_mapping[school_name]['region']
+    lookup_file = dist_geojson_dir / "school_lookup.json"
+    with open(lookup_file, 'r') as f:
+        lookup_data = json.load(f)
+    
+    # Update both with the correct class and region information
+    apply_region_classes(all_schools_data.get('features', []), lookup_data, school_mapping)
     
     # Save updated all_schools.geojson
     with open(all_schools_file, 'w') as f:
@@ -143,17 +150,6 @@ def extract_class_from_region_files():
     
     print(f"Updated all_schools.geojson with correct class and region information")
     
-    # Update school_lookup.json with the correct class and region information
-    lookup_file = dist_geojson_dir / "school_lookup.json"
-    with open(lookup_file, 'r') as f:
-        lookup_data = json.load(f)
-    
-    for school_name, school_data in lookup_data.items():
-        if school_name in school_mapping:
-            school_data['class'] = school_mapping[school_name]['class']
-            school_data['size'] = school_mapping[school_name]['size']
-            school_data['region'] = school_mapping[school_name]['region']
-    
     # Save updated lookup
     with open(lookup_file, 'w') as f:
         json.dump(lookup_data, f, indent=2)
@@ -4,29 +4,22 @@ import json
 import os
 import re
 
-def fix_region_naming():
-    """Fix region naming and classification issues in the combined GeoJSON dataset"""
-    
-    # Load the combined GeoJSON file
-    with open('dist/data/geojson/all_schools.geojson', 'r') as f:
-        all_schools_data = json.load(f)
-    
-    # Load the school lookup file
-    with open('dist/data/geojson/school_lookup.json', 'r') as f:
-        school_lookup = json.load(f)
-    
-    print(f"Processing {len(all_schools_data['features'])} schools...")
+from associations import VHSL
+
+def fix_region_names(features, school_lookup, region_letters=VHSL.region_letters):
+    """Rename "Region X" to "Region NX" in features and lookup entries that carry a class number"""
+    region_pattern = re.compile(f"^Region [{re.escape(region_letters)}]$")
     
     # Fix region naming in GeoJSON features
-    for feature in all_schools_data['features']:
+    for feature in features:
         props = feature['properties']
         school_name = props.get('name', 'Unknown')
         class_num = props.get('size')
         region = props.get('region', '')
         
         # Check if region is in format "Region X" instead of "Region NX"
-        if region and re.match(r'^Region [A-D]$', region):
-            # Extract the letter part (A, B, C, D)
+        if region and region_pattern.match(region):
+            # Extract the region letter
             region_letter = region.split(' ')[1]
             
             # Create the correct region name with class number
@@ -41,21 +34,37 @@ def fix_region_naming():
         class_num = school_data.get('size', '')
         
         # Check if region is in format "Region X" instead of "Region NX"
-        if region and re.match(r'^Region [A-D]$', region):
-            # Extract the letter part (A, B, C, D)
+        if region and region_pattern.match(region):
+            # Extract the region letter
             region_letter = region.split(' ')[1]
             
             # Create the correct region name with class number
             if class_num:
                 corrected_region = f"Region {class_num}{region_letter}"
                 school_data['region'] = corrected_region
+
+def fix_region_naming(association=VHSL):
+    """Fix region naming and classification issues in the combined GeoJSON dataset"""
+    output_paths = association.output_paths()
+    
+    # Load the combined GeoJSON file
+    with open(output_paths['all_schools'], 'r') as f:
+        all_schools_data = json.load(f)
+    
+    # Load the school lookup file
+    with open(output_paths['school_lookup'], 'r') as f:
+        school_lookup = json.load(f)
+    
+    print(f"Processing {len(all_schools_data['features'])} schools...")
+    
+    fix_region_names(all_schools_data['features'], school_lookup, association.region_letters)
     
     # Save the fixed GeoJSON file
-    with open('dist/data/geojson/all_schools.geojson', 'w') as f:
+    with open(output_paths['all_schools'], 'w') as f:
         json.dump(all_schools_data, f)
     
     # Save the fixed school lookup file
-    with open('dist/data/geojson/school_lookup.json', 'w') as f:
+    with open(output_paths['school_lookup'], 'w') as f:
         json.dump(school_lookup, f, indent=2)
     
     print("Fixed region naming in GeoJSON and lookup files")
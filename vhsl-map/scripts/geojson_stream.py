@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import threading
+from pathlib import Path
+
+from profiling import profiler
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+def write_atomic(path, content):
+    """Write bytes to path through a temporary file so readers never see a partial file"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    profiler.record(bytes_written=len(content), files_written=1)
+
+
+class _Reader:
+    """Buffered text reader that decodes one JSON value at a time"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        profiler.record(bytes_read=len(chunk))
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {self.peek()!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value, reading more input until it fits"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or not self._fill():
+                    raise
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_features(path, chunk_size=CHUNK_SIZE):
+    """Yield the features of a FeatureCollection one at a time without loading the document
+
+    Other top-level members are decoded and skipped, so only one feature (or
+    one skipped member) is held in memory at a time.
+    """
+    with open(path, 'r') as f:
+        reader = _Reader(f, chunk_size)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        while True:
+            key = reader.value()
+            reader.expect(':')
+            if key == 'features':
+                reader.expect('[')
+                if reader.peek() == ']':
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield reader.value()
+                        if reader.peek() == ',':
+                            reader.pos += 1
+                            continue
+                        reader.expect(']')
+                        break
+            else:
+                reader.value()
+            if reader.peek() == ',':
+                reader.pos += 1
+                continue
+            reader.expect('}')
+            return
+
+
+class FeatureCollectionWriter:
+    """Write a FeatureCollection one feature at a time
+
+    Output goes to a temporary file that replaces the target on a clean exit,
+    so a failed run never leaves a half-written collection behind. The bytes
+    written match json.dump of the equivalent in-memory collection. mark()
+    and rollback() drop whatever was written in between, such as the
+    features of an input file that turned out to be corrupt.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        self.count = 0
+        self.bytes_written = 0
+        self.f = None
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.f = open(self.tmp_path, 'w')
+        self._write('{"type": "FeatureCollection", "features": [')
+        return self
+
+    def write(self, feature):
+        if self.count:
+            self._write(', ')
+        self._write(json.dumps(feature))
+        self.count += 1
+
+    def mark(self):
+        """Remember the current end of the output for a later rollback()"""
+        return self.f.tell(), self.count, self.bytes_written
+
+    def rollback(self, mark):
+        """Truncate the output back to mark, forgetting the features written since"""
+        offset, self.count, self.bytes_written = mark
+        self.f.seek(offset)
+        self.f.truncate()
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._write(']}')
+        finally:
+            self.f.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+            profiler.record(bytes_written=self.bytes_written, files_written=1)
+        else:
+            os.remove(self.tmp_path)
+        return False
+
+    def _write(self, text):
+        self.f.write(text)
+        self.bytes_written += len(text)
+
+
+def dedupe_features(features, start_id=1, unique_schools=None):
+    """Yield features whose school name has not been seen yet, numbering them from start_id
+
+    unique_schools is the set of names already seen; pass one in to share it
+    across calls, and every yielded name is added to it.
+    """
+    unique_schools = set() if unique_schools is None else unique_schools
+    feature_id = start_id
+    for feature in features:
+        school_name = feature.get('properties', {}).get('name')
+        if school_name and school_name not in unique_schools:
+            feature['id'] = feature_id
+            feature_id += 1
+            unique_schools.add(school_name)
+            yield feature
+
+
+def stream_combine(input_files, output_file, chunk_size=CHUNK_SIZE):
+    """Stream features from input_files into output_file, dropping repeated school names
+
+    Features get sequential IDs starting at 1 in the order they are written.
+    Only the set of names seen so far and one feature are kept in memory. A
+    file that fails to parse part way through is skipped whole: the output
+    is truncated back to where the file started and its names are forgotten.
+    Returns the number of unique schools written.
+    """
+    unique_schools = set()
+    with FeatureCollectionWriter(output_file) as writer:
+        for file_path in input_files:
+            print(f"Processing {Path(file_path).stem}...")
+            mark = writer.mark()
+            file_names = []
+            try:
+                for feature in dedupe_features(iter_features(file_path, chunk_size), writer.count + 1, unique_schools):
+                    file_names.append(feature['properties']['name'])
+                    writer.write(feature)
+            except Exception as e:
+                print(f"  Error processing {file_path}, skipping the whole file: {str(e)}")
+                writer.rollback(mark)
+                unique_schools.difference_update(file_names)
+    return writer.count
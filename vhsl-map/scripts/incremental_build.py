@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import time
+from collections import Counter
+from pathlib import Path
+
+from associations import DEFAULT_ASSOCIATION, load_associations
+from geojson_stream import write_atomic
+from pipeline import derive_outputs, serialize_output
+
+MANIFEST_NAME = "build_manifest.json"
+MANIFEST_VERSION = 2
+COMPILED_BUCKETS = ('by_class', 'by_region', 'by_district')
+
+
+def manifest_path(association):
+    return association.data_root / MANIFEST_NAME
+
+
+def file_sha256(path):
+    """Hash a file in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def scan_inputs(association, previous_inputs):
+    """Stat and hash the association's region files, reusing the previous hash when size and mtime are unchanged"""
+    inputs = {}
+    for region_name in sorted(association.region_names):
+        file_path = association.regions_dir / f"{region_name}.geojson"
+        if not file_path.exists():
+            continue
+        stat = file_path.stat()
+        previous = previous_inputs.get(file_path.name)
+        if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+            sha256 = previous['sha256']
+        else:
+            sha256 = file_sha256(file_path)
+        inputs[file_path.name] = {'sha256': sha256, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    return inputs
+
+
+def school_names(data):
+    """Names of the schools a region file lists, in file order and without repeats"""
+    names = (feature['properties']['name'] for feature in data.get('features', [])
+             if 'name' in feature.get('properties', {}))
+    return list(dict.fromkeys(names))
+
+
+def merge_outputs(outputs, fragment, order, removed):
+    """Replace the schools of changed region files in the previous outputs
+
+    fragment holds the outputs derive_outputs built from the changed region
+    files alone; removed is every name those files (and deleted files) used
+    to contribute. order lists the school names of every current region
+    file, which fixes the order schools appear in, as in a full build.
+    """
+    lookup = {name: entry for name, entry in outputs['school_lookup'].items() if name not in removed}
+    lookup.update(fragment['school_lookup'])
+    mapping = {name: entry for name, entry in outputs['school_mapping']['school_mapping'].items()
+               if name not in removed}
+    mapping.update(fragment['school_mapping']['school_mapping'])
+    features = {feature['properties']['name']: feature for feature in outputs['all_schools']['features']
+                if feature['properties']['name'] not in removed}
+    features.update((feature['properties']['name'], feature) for feature in fragment['all_schools']['features'])
+
+    compiled = outputs['compiled_schools']
+    merged = {'all_schools': sorted(set(compiled['all_schools']).difference(removed)
+                                    .union(fragment['compiled_schools']['all_schools']))}
+    for bucket in COMPILED_BUCKETS:
+        keys = set(compiled[bucket]).union(fragment['compiled_schools'][bucket])
+        values = {key: set(compiled[bucket].get(key, [])).difference(removed)
+                  .union(fragment['compiled_schools'][bucket].get(key, [])) for key in keys}
+        merged[bucket] = {key: sorted(values[key]) for key in sorted(values) if values[key]}
+
+    outputs['compiled_schools'] = {**compiled, **merged}
+    outputs['school_lookup'] = {name: lookup[name] for name in order if name in lookup}
+    outputs['school_mapping']['school_mapping'] = {name: mapping[name] for name in order if name in mapping}
+    outputs['all_schools']['features'] = [features[name] for name in order if name in features]
+    for feature_id, feature in enumerate(outputs['all_schools']['features'], start=1):
+        feature['id'] = feature_id
+    return outputs
+
+
+def _outputs_intact(manifest, output_paths):
+    for key, path in output_paths.items():
+        recorded = manifest.get('outputs', {}).get(key)
+        if not recorded or not Path(path).exists() or file_sha256(path) != recorded:
+            return False
+    return True
+
+
+def _load_outputs(output_paths):
+    outputs = {}
+    for key, path in output_paths.items():
+        with open(path, 'r') as f:
+            outputs[key] = json.load(f)
+    return outputs
+
+
+def rebuild(association, manifest_file=None, output_paths=None, full=False):
+    """Bring the association's derived school files up to date with its region files
+
+    Only region files whose content hash changed since the last build are
+    parsed; the pipeline's builders turn them into fresh entries that are
+    merged into the existing outputs. A full build happens when there is no
+    usable manifest, an output was changed outside this script, or a school
+    is listed in more than one region file (the builders resolve such
+    repeats across files, so a patch could pick the wrong copy).
+    """
+    start = time.perf_counter()
+    manifest_file = manifest_file or manifest_path(association)
+    output_paths = output_paths or association.output_paths()
+    manifest = None if full else load_manifest(manifest_file)
+    previous_inputs = manifest['inputs'] if manifest else {}
+
+    current = scan_inputs(association, previous_inputs)
+    changed = [name for name, info in current.items()
+               if previous_inputs.get(name, {}).get('sha256') != info['sha256']]
+    deleted = [name for name in previous_inputs if name not in current]
+
+    incremental = manifest is not None and _outputs_intact(manifest, output_paths)
+    if incremental and not changed and not deleted:
+        print(f"All {len(current)} region files unchanged; outputs are up to date")
+        return {"mode": "noop", "changed": [], "written": []}
+
+    parse = changed if incremental else list(current)
+    regions = {}
+    for file_name in parse:
+        with open(association.regions_dir / file_name, 'r') as f:
+            regions[Path(file_name).stem] = json.load(f)
+
+    names = {file_name: info.get('schools', []) for file_name, info in previous_inputs.items()
+             if file_name in current and file_name not in parse}
+    names.update({f"{region_name}.geojson": school_names(data) for region_name, data in regions.items()})
+
+    counts = Counter(name for file_names in names.values() for name in file_names)
+    if incremental and any(count > 1 for count in counts.values()):
+        print("Schools listed in more than one region file; falling back to a full build")
+        return rebuild(association, manifest_file, output_paths, full=True)
+
+    fragment = derive_outputs(regions, association)
+    if incremental:
+        removed = {name for file_name in changed + deleted for name in previous_inputs.get(file_name, {}).get('schools', [])}
+        order = [name for file_name in current for name in names[file_name]]
+        outputs = merge_outputs(_load_outputs(output_paths), fragment, order, removed)
+    else:
+        outputs = fragment
+
+    written = []
+    output_hashes = {}
+    for key, path in output_paths.items():
+        content = serialize_output(key, outputs[key])
+        digest = hashlib.sha256(content).hexdigest()
+        output_hashes[key] = digest
+        if not Path(path).exists() or file_sha256(path) != digest:
+            write_atomic(path, content)
+            written.append(str(path))
+
+    new_manifest = {
+        "version": MANIFEST_VERSION,
+        "inputs": {name: dict(info, schools=names[name]) for name, info in current.items()},
+        "outputs": output_hashes,
+    }
+    write_atomic(manifest_file, json.dumps(new_manifest, indent=2).encode('utf-8'))
+
+    elapsed = (time.perf_counter() - start) * 1000
+    mode = "incremental" if incremental else "full"
+    print(f"{mode.capitalize()} build: parsed {len(parse)} of {len(current)} region files, "
+          f"wrote {len(written)} outputs in {elapsed:.1f} ms")
+    return {"mode": mode, "changed": parse, "written": written}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild derived school data from changed region files only")
+    parser.add_argument('--association', default=DEFAULT_ASSOCIATION, help="association key from data/associations.json")
+    parser.add_argument('--full', action='store_true', help="ignore the manifest and rebuild everything")
+    parser.add_argument('--manifest', help="manifest path (default: build_manifest.json in the association's data root)")
+    args = parser.parse_args()
+
+    print("=== Incremental Rebuild ===")
+    rebuild(load_associations()[args.association], args.manifest, full=args.full)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+
+import heapq
+import json
+
+import numpy as np
+
+SCHOOL_MAPPING_FILE = "data/school_mapping.json"
+EARTH_RADIUS_KM = 6371.0088
+LEAF_SIZE = 16
+
+
+def load_school_points(path=SCHOOL_MAPPING_FILE):
+    """Load (names, lons, lats) from school_mapping.json or va_schools_geocodes.json"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    names, lons, lats = [], [], []
+    if 'school_mapping' in data:
+        for name, school in data['school_mapping'].items():
+            coordinates = school.get('coordinates') or []
+            if len(coordinates) >= 2:
+                names.append(name)
+                lons.append(coordinates[0])
+                lats.append(coordinates[1])
+    else:
+        for school in data.get('schools', []):
+            coordinates = school.get('coordinates') or {}
+            if 'lng' in coordinates and 'lat' in coordinates:
+                names.append(school['name'])
+                lons.append(coordinates['lng'])
+                lats.append(coordinates['lat'])
+    return names, np.array(lons, dtype=np.float64), np.array(lats, dtype=np.float64)
+
+
+def unit_vectors(lons, lats):
+    """Convert longitudes/latitudes in degrees to points on the unit sphere"""
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+
+def km_to_chord(km):
+    return 2 * np.sin(np.minimum(np.asarray(km, dtype=np.float64) / (2 * EARTH_RADIUS_KM), np.pi / 2))
+
+
+def haversine_km(lon1, lat1, lon2, lat2):
+    """Great-circle distance in kilometres; arguments broadcast like NumPy arrays"""
+    lon1, lat1, lon2, lat2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class SchoolTree:
+    """KD-tree over school locations answering nearest-neighbour and radius queries
+
+    Schools are stored as 3-D points on the unit sphere, where straight-line
+    (chord) distance orders points exactly like great-circle distance, so an
+    ordinary Euclidean KD-tree gives exact haversine answers. Nodes keep
+    their bounding boxes; queries visit nodes best-first by box distance and
+    scan leaves with one vectorized distance computation each.
+    """
+
+    def __init__(self, names, lons, lats, leaf_size=LEAF_SIZE):
+        self.names = list(names)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.points = unit_vectors(self.lons, self.lats)
+        self.leaf_size = leaf_size
+        self._name_index = {name: i for i, name in enumerate(self.names)}
+
+        # Node arrays: [start, end) into self.order, children (-1 for leaves) and bounding boxes
+        self.order = np.arange(len(self.names))
+        self.starts, self.ends, self.lefts, self.rights, self.lows, self.highs = [], [], [], [], [], []
+        if len(self.names):
+            self._build(0, len(self.names))
+        self.lows = np.array(self.lows).reshape(-1, 3)
+        self.highs = np.array(self.highs).reshape(-1, 3)
+
+    @classmethod
+    def from_file(cls, path=SCHOOL_MAPPING_FILE, leaf_size=LEAF_SIZE):
+        return cls(*load_school_points(path), leaf_size=leaf_size)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _build(self, start, end):
+        node = len(self.starts)
+        points = self.points[self.order[start:end]]
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lefts.append(-1)
+        self.rights.append(-1)
+        self.lows.append(points.min(axis=0))
+        self.highs.append(points.max(axis=0))
+        if end - start > self.leaf_size:
+            # Split at the median of the widest dimension
+            axis = int(np.argmax(self.highs[node] - self.lows[node]))
+            middle = (start + end) // 2
+            part = np.argpartition(points[:, axis], middle - start)
+            self.order[start:end] = self.order[start:end][part]
+            self.lefts[node] = self._build(start, middle)
+            self.rights[node] = self._build(middle, end)
+        return node
+
+    def _box_distance(self, node, point):
+        gap = np.maximum(0, np.maximum(self.lows[node] - point, point - self.highs[node]))
+        return float(np.sqrt(np.dot(gap, gap)))
+
+    def _knn_point(self, point, k, exclude=None):
+        best = []  # max-heap of (-chord, index)
+        frontier = [(0.0, 0)]
+        while frontier:
+            bound, node = heapq.heappop(frontier)
+            if len(best) == k and bound > -best[0][0]:
+                break
+            if self.lefts[node] < 0:
+                members = self.order[self.starts[node]:self.ends[node]]
+                chords = np.sqrt(((self.points[members] - point) ** 2).sum(axis=1))
+                for chord, index in zip(chords.tolist(), members.tolist()):
+                    if index == exclude:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-chord, index))
+                    elif chord < -best[0][0]:
+                        heapq.heapreplace(best, (-chord, index))
+                continue
+            for child in (self.lefts[node], self.rights[node]):
+                heapq.heappush(frontier, (self._box_distance(child, point), child))
+        best.sort(key=lambda item: -item[0])
+        return [index for _, index in best], [-chord for chord, _ in best]
+
+    def knn_batch(self, lons, lats, k=5, exclude=None):
+        """Return (indices, distances in km) arrays of shape (queries, k); missing neighbours are -1/inf"""
+        points = unit_vectors(np.atleast_1d(lons), np.atleast_1d(lats))
+        indices = np.full((len(points), k), -1, dtype=np.intp)
+        distances = np.full((len(points), k), np.inf)
+        if not len(self.names) or k < 1:
+            return indices, distances
+        for row, point in enumerate(points):
+            skip = exclude[row] if exclude is not None else None
+            found, chords = self._knn_point(point, k, skip)
+            indices[row, :len(found)] = found
+            distances[row, :len(found)] = chord_to_km(chords)
+        return indices, distances
+
+    def knn(self, lon, lat, k=5):
+        """Return the k schools nearest to a point as (name, km) pairs, nearest first"""
+        indices, distances = self.knn_batch([lon], [lat], k)
+        return [(self.names[i], float(d)) for i, d in zip(indices[0], distances[0]) if i >= 0]
+
+    def nearest_schools(self, name, k=5):
+        """Return the k schools nearest to a school (excluding itself) as (name, km) pairs"""
+        index = self._name_index[name]
+        indices, distances = self.knn_batch([self.lons[index]], [self.lats[index]], k, exclude=[index])
+        return [(self.names[i], float(d)) for i, d in zip(indices[0], distances[0]) if i >= 0]
+
+    def _radius_point(self, point, limit):
+        found = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if self._box_distance(node, point) > limit:
+                continue
+            if self.lefts[node] < 0:
+                members = self.order[self.starts[node]:self.ends[node]]
+                chords = np.sqrt(((self.points[members] - point) ** 2).sum(axis=1))
+                found.extend(zip(chords[chords <= limit].tolist(), members[chords <= limit].tolist()))
+            else:
+                stack.extend((self.lefts[node], self.rights[node]))
+        found.sort()
+        return [index for _, index in found], [chord for chord, _ in found]
+
+    def radius_batch(self, lons, lats, km):
+        """Return, per query point, (indices, distances in km) of every school within km, nearest first"""
+        points = unit_vectors(np.atleast_1d(lons), np.atleast_1d(lats))
+        limit = float(km_to_chord(km))
+        results = []
+        for point in points:
+            found, chords = self._radius_point(point, limit) if len(self.names) else ([], [])
+            results.append((np.array(found, dtype=np.intp), chord_to_km(np.array(chords, dtype=np.float64))))
+        return results
+
+    def radius(self, lon, lat, km):
+        """Return every school within km of a point as (name, km) pairs, nearest first"""
+        indices, distances = self.radius_batch([lon], [lat], km)[0]
+        return [(self.names[i], float(d)) for i, d in zip(indices, distances)]
+
+
+def _read_points(path):
+    """Read query points from a JSON list of [lon, lat] pairs or a lon,lat CSV (header optional)"""
+    with open(path, 'r') as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        points = json.loads(text)
+    else:
+        points = []
+        for line in text.splitlines():
+            fields = [field.strip() for field in line.split(',')]
+            try:
+                points.append((float(fields[0]), float(fields[1])))
+            except (ValueError, IndexError):
+                continue
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return points[:, 0], points[:, 1]
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Find the schools nearest to a school or a point")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--school', help="school name to search around")
+    target.add_argument('--point', nargs=2, type=float, metavar=('LON', 'LAT'))
+    target.add_argument('--batch', help="JSON or CSV file of lon,lat query points")
+    parser.add_argument('-k', type=int, default=5, help="number of neighbours (default 5)")
+    parser.add_argument('--radius', type=float, metavar='KM', help="return every school within KM instead of k")
+    parser.add_argument('--schools', default=SCHOOL_MAPPING_FILE,
+                        help="school_mapping.json or va_schools_geocodes.json")
+    parser.add_argument('--output', help="write batch results to this JSON file")
+    args = parser.parse_args()
+
+    tree = SchoolTree.from_file(args.schools)
+
+    if args.batch:
+        lons, lats = _read_points(args.batch)
+        start = time.perf_counter()
+        if args.radius is not None:
+            found = tree.radius_batch(lons, lats, args.radius)
+        else:
+            indices, distances = tree.knn_batch(lons, lats, args.k)
+            found = [(row_indices[row_indices >= 0], row_distances[row_indices >= 0])
+                     for row_indices, row_distances in zip(indices, distances)]
+        elapsed = time.perf_counter() - start
+        results = [{'point': [float(lon), float(lat)],
+                    'schools': [{'name': tree.names[i], 'km': round(float(d), 3)} for i, d in zip(*row)]}
+                   for lon, lat, row in zip(lons, lats, found)]
+        print(f"Answered {len(results)} queries over {len(tree)} schools in {elapsed * 1000:.1f} ms")
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"Results saved to {args.output}")
+    else:
+        if args.school:
+            if args.school not in tree.names:
+                raise SystemExit(f"Unknown school: {args.school}")
+            index = tree.names.index(args.school)
+            lon, lat = tree.lons[index], tree.lats[index]
+        else:
+            lon, lat = args.point
+        if args.radius is not None:
+            matches = [(name, km) for name, km in tree.radius(lon, lat, args.radius) if name != args.school]
+        elif args.school:
+            matches = tree.nearest_schools(args.school, args.k)
+        else:
+            matches = tree.knn(lon, lat, args.k)
+        for name, km in matches:
+            print(f"{km:8.2f} km  {name}")
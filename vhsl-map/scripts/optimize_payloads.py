@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+
+import gzip
+import json
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # .br siblings are skipped; gzip alone still covers every browser
+    brotli = None
+
+from geojson_stream import write_atomic
+from schema import dumps, loads
+from spatial import ring_area
+
+# Decimal places kept in coordinates: 6 is about 11 cm, far below what a map can show
+PRECISION = 6
+BUDGET_FILE = "data/payload_budget.json"
+BUDGET_VERSION = 1
+# Growth a payload may show over its budgeted size before it counts as a regression
+BUDGET_TOLERANCE = 0.05
+JSON_SUFFIXES = ('.json', '.geojson', '.topojson')
+# Keys the client never reads: feature ids are ArcGIS object ids that repeat across
+# regions, and lookup coordinates duplicate the school's point geometry
+REDUNDANT_FEATURE_KEYS = ('id',)
+REDUNDANT_LOOKUP_KEYS = ('coordinates',)
+LOOKUP_NAMES = ('school_lookup.json',)
+
+
+def empty_report():
+    return {'positions': 0, 'rings': 0, 'collapsed_rings': 0, 'dropped_parts': 0, 'restored': 0,
+            'properties_removed': 0}
+
+
+def _round_positions(positions, precision):
+    return [[round(float(value), precision) for value in position] for position in positions]
+
+
+def round_ring(ring, precision):
+    """Round a ring's positions and drop the repeats rounding creates; None when the ring collapses
+
+    A ring collapses when fewer than three distinct positions are left or
+    they no longer enclose any area.
+    """
+    rounded = []
+    for position in _round_positions(ring, precision):
+        if not rounded or position != rounded[-1]:
+            rounded.append(position)
+    if len(rounded) > 1 and rounded[0] == rounded[-1]:
+        rounded.pop()
+    if len({tuple(position[:2]) for position in rounded}) < 3:
+        return None
+    rounded.append(rounded[0])
+    if ring_area([position[:2] for position in rounded]) == 0:
+        return None
+    return rounded
+
+
+def round_polygons(polygons, precision, report):
+    """Round a list of polygons (outer ring first, then holes) and repair the rings that collapse
+
+    A collapsed hole is dropped; a collapsed outer ring drops its polygon
+    with its holes. If every polygon would go, the largest is kept unrounded
+    so the geometry never disappears, as simplify_layer does.
+    """
+    kept = []
+    for polygon in polygons:
+        report['rings'] += len(polygon)
+        report['positions'] += sum(len(ring) for ring in polygon)
+        outer = round_ring(polygon[0], precision) if polygon else None
+        if outer is None:
+            report['collapsed_rings'] += len(polygon)
+            report['dropped_parts'] += 1
+            continue
+        holes = [round_ring(ring, precision) for ring in polygon[1:]]
+        report['collapsed_rings'] += sum(1 for hole in holes if hole is None)
+        kept.append([outer] + [hole for hole in holes if hole is not None])
+    if not kept and polygons:
+        report['restored'] += 1
+        kept = [max(polygons, key=lambda polygon: abs(ring_area([p[:2] for p in polygon[0]])) if polygon else 0)]
+    return kept
+
+
+def round_geometry(geometry, precision=PRECISION, report=None):
+    """Return a copy of a GeoJSON geometry with coordinates rounded to precision decimal places"""
+    report = empty_report() if report is None else report
+    kind = geometry.get('type')
+    coordinates = geometry.get('coordinates')
+    if kind == 'GeometryCollection':
+        geometries = [round_geometry(g, precision, report) for g in geometry.get('geometries', [])]
+        return {**geometry, 'geometries': geometries}
+    if coordinates is None:
+        return geometry
+    if kind == 'Point':
+        report['positions'] += 1
+        rounded = [round(float(value), precision) for value in coordinates]
+    elif kind in ('MultiPoint', 'LineString'):
+        report['positions'] += len(coordinates)
+        rounded = _round_positions(coordinates, precision)
+    elif kind == 'MultiLineString':
+        report['positions'] += sum(len(line) for line in coordinates)
+        rounded = [_round_positions(line, precision) for line in coordinates]
+    elif kind == 'Polygon':
+        polygons = round_polygons([coordinates], precision, report)
+        rounded = polygons[0] if polygons else []
+    elif kind == 'MultiPolygon':
+        rounded = round_polygons(coordinates, precision, report)
+    else:
+        raise ValueError(f"Unsupported geometry type: {kind}")
+    return {**geometry, 'coordinates': rounded}
+
+
+def _strip(mapping, keys, report):
+    """Copy a dict without keys and without null or empty-string values"""
+    stripped = {key: value for key, value in mapping.items()
+                if key not in keys and value is not None and value != ''}
+    report['properties_removed'] += len(mapping) - len(stripped)
+    return stripped
+
+
+def optimize_geojson(data, precision=PRECISION, report=None):
+    """Round every geometry of a GeoJSON document and strip redundant feature keys and empty properties"""
+    report = empty_report() if report is None else report
+    kind = data.get('type')
+    if kind == 'FeatureCollection':
+        return {**data, 'features': [optimize_geojson(feature, precision, report) for feature in data['features']]}
+    if kind == 'Feature':
+        feature = {key: value for key, value in data.items() if key not in REDUNDANT_FEATURE_KEYS}
+        report['properties_removed'] += len(data) - len(feature)
+        feature['geometry'] = round_geometry(data['geometry'], precision, report) if data.get('geometry') else None
+        feature['properties'] = _strip(data.get('properties') or {}, (), report)
+        return feature
+    return round_geometry(data, precision, report)
+
+
+def optimize_lookup(lookup, precision=PRECISION, report=None):
+    """Strip keys the client never reads from a school_lookup.json mapping"""
+    report = empty_report() if report is None else report
+    return {name: _strip(entry, REDUNDANT_LOOKUP_KEYS, report) for name, entry in lookup.items()}
+
+
+def optimize_payload(name, content, precision=PRECISION):
+    """Return (optimized bytes, report) for one published file
+
+    JSON payloads are minified; GeoJSON is also rounded and stripped, and
+    the school lookup loses the keys the client ignores. Other files (the
+    binary bundle) pass through unchanged.
+    """
+    report = empty_report()
+    if not name.endswith(JSON_SUFFIXES):
+        return content, report
+    data = loads(content)
+    if Path(name).name in LOOKUP_NAMES:
+        data = optimize_lookup(data, precision, report)
+    elif name.endswith('.geojson'):
+        data = optimize_geojson(data, precision, report)
+    return dumps(data, indent=None), report
+
+
+def compressed_variants(content):
+    """Return {'.gz': ..., '.br': ...} precompressed copies of content; .br only when brotli is installed"""
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content, quality=11)
+    return variants
+
+
+def payload_sizes(source_bytes, content, variants):
+    sizes = {'source_bytes': source_bytes, 'bytes': len(content)}
+    sizes.update({'gzip' if suffix == '.gz' else 'brotli': len(data) for suffix, data in variants.items()})
+    return sizes
+
+
+def load_budget(path=BUDGET_FILE):
+    try:
+        with open(path, 'r') as f:
+            budget = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if budget.get('version') != BUDGET_VERSION:
+        return None
+    return budget
+
+
+def save_budget(sizes, path=BUDGET_FILE, tolerance=BUDGET_TOLERANCE):
+    """Record the current sizes as the budget later builds are held to"""
+    budget = {
+        'version': BUDGET_VERSION,
+        'tolerance': tolerance,
+        'files': {name: {key: value[key] for key in ('bytes', 'gzip')} for name, value in sorted(sizes.items())},
+    }
+    write_atomic(path, json.dumps(budget, indent=2).encode('utf-8'))
+    return budget
+
+
+def check_budget(sizes, budget, tolerance=None):
+    """List the payloads whose minified or gzip size grew past their budget by more than tolerance"""
+    tolerance = budget.get('tolerance', BUDGET_TOLERANCE) if tolerance is None else tolerance
+    regressions = []
+    for name, limits in budget.get('files', {}).items():
+        current = sizes.get(name)
+        if current is None:
+            continue
+        for key, limit in limits.items():
+            if key in current and current[key] > limit * (1 + tolerance):
+                regressions.append({'file': name, 'measure': key, 'budget': limit, 'size': current[key],
+                                    'change': round(current[key] / limit - 1, 3) if limit else None})
+    return regressions
+
+
+def size_report(sizes, budget=None):
+    """Return one line per payload: source, minified, gzip and brotli sizes and the change against budget"""
+    limits = (budget or {}).get('files', {})
+    lines = [f"{'file':<32} {'source':>9} {'minified':>9} {'gzip':>8} {'brotli':>8}  budget"]
+    for name, size in sorted(sizes.items()):
+        limit = limits.get(name, {}).get('gzip')
+        change = f"{size['gzip'] / limit - 1:+.1%} gzip" if limit else 'none'
+        brotli_size = f"{size['brotli']:>8,}" if 'brotli' in size else f"{'-':>8}"
+        lines.append(f"{name:<32} {size['source_bytes']:>9,} {size['bytes']:>9,} {size['gzip']:>8,} "
+                     f"{brotli_size}  {change}")
+    total_source = sum(size['source_bytes'] for size in sizes.values())
+    total_gzip = sum(size['gzip'] for size in sizes.values())
+    lines.append(f"{'total':<32} {total_source:>9,} {sum(size['bytes'] for size in sizes.values()):>9,} "
+                 f"{total_gzip:>8,}")
+    return lines
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from publish import data_files
+
+    parser = argparse.ArgumentParser(description="Report what optimizing the published payloads saves, without writing")
+    parser.add_argument('paths', nargs='*', help="files to optimize (default: the files publish.py publishes)")
+    parser.add_argument('--precision', type=int, default=PRECISION, help=f"coordinate decimals (default {PRECISION})")
+    parser.add_argument('--budget', default=BUDGET_FILE)
+    args = parser.parse_args()
+
+    files = {Path(path).name: path for path in args.paths} if args.paths else data_files()
+    print(f"=== Payload Optimization (precision {args.precision}, brotli {'on' if brotli else 'off'}) ===")
+    sizes = {}
+    for name, source in files.items():
+        if not Path(source).exists():
+            continue
+        original = Path(source).read_bytes()
+        content, report = optimize_payload(name, original, args.precision)
+        sizes[name] = payload_sizes(len(original), content, compressed_variants(content))
+        if report['collapsed_rings'] or report['restored']:
+            print(f"{name}: {report['collapsed_rings']} of {report['rings']} rings collapsed, "
+                  f"{report['dropped_parts']} polygons dropped, {report['restored']} kept unrounded")
+    for line in size_report(sizes, load_budget(args.budget)):
+        print(line)
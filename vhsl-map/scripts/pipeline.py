@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+
+import contextlib
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from graphlib import TopologicalSorter
+from pathlib import Path
+
+import numpy as np
+
+from associations import DEFAULT_ASSOCIATION, OUTPUT_FILES, load_associations
+from compare_datasets import build_school_mapping
+from distance_matrix import DISTANCE_FILE, load_schools, save_distance_matrix
+from download_and_combine_geojson import build_school_lookup
+from fix_class_region_assignment import apply_region_classes, fix_source_file_regions, report_duplicates
+from fix_region_naming import fix_region_names
+from geojson_stream import dedupe_features, write_atomic
+from profiling import TRACE_FILE, feature_count, profiler, trace_document
+from schema import dumps
+from school_index import SchoolIndex, load_region_collections
+from spatial import PolygonIndex
+from update_application_data import build_application_data, decode_school_mapping
+from validate_schools import collect_schools, compile_schools
+
+
+class Pipeline:
+    """Run data stages as a DAG in one process, passing results between stages in memory
+
+    Stages are plain functions registered with @pipeline.stage(*deps); each is
+    called with the results of its dependencies in the order they are listed.
+    Inputs are named values supplied to run() (the association being built)
+    that stages can depend on like any other stage.
+    Every stage and artifact write runs in a profiler span, which costs
+    nothing unless profiling is enabled.
+    Artifacts map an output path to the stage that produces it and are only
+    written once every selected stage has finished, one atomic write each;
+    artifacts that are not JSON pass their own writer(path, data). Artifact
+    paths are relative to the output root given to run() and may name the
+    pipeline inputs as format fields, e.g. "{association.key}".
+    A stage's result may also be supplied in inputs, and the stage is then
+    not run; incremental builds pass the region files they parsed this way.
+    """
+
+    def __init__(self, inputs=()):
+        self.inputs = tuple(inputs)
+        self.stages = {}
+        self.artifacts = {}
+
+    def stage(self, *deps):
+        def register(func):
+            self.stages[func.__name__] = (func, deps)
+            return func
+        return register
+
+    def artifact(self, path, stage, select=None, indent=2, writer=None):
+        self.artifacts[path] = (stage, select, indent, writer)
+
+    def order(self, targets=None):
+        """Return the stages needed for targets (default: all) in dependency order"""
+        for name, (_, deps) in self.stages.items():
+            for dep in deps:
+                if dep not in self.stages and dep not in self.inputs:
+                    raise ValueError(f"Stage {name} depends on unknown stage {dep}")
+
+        wanted = set()
+        pending = list(targets) if targets else list(self.stages)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage: {name}")
+            if name not in wanted:
+                wanted.add(name)
+                pending.extend(dep for dep in self.stages[name][1] if dep in self.stages)
+
+        graph = TopologicalSorter({name: [dep for dep in self.stages[name][1] if dep in self.stages]
+                                   for name in self.stages if name in wanted})
+        return list(graph.static_order())
+
+    def run(self, targets=None, write=True, inputs=None, output_root=None, artifacts=True):
+        """Run the selected stages, then write the artifacts they produced under output_root"""
+        values = dict(inputs or {})
+        results = {}
+        for name in self.order(targets):
+            if name in values:
+                results[name] = values[name]
+                continue
+            func, deps = self.stages[name]
+            missing = [dep for dep in deps if dep not in self.stages and dep not in values]
+            if missing:
+                raise ValueError(f"Stage {name} needs input {', '.join(missing)}")
+            print(f"[{name}] running")
+            category = 'transform' if any(dep in self.stages for dep in deps) else 'load'
+            with profiler.span(name, category):
+                results[name] = values[name] = func(*(values[dep] for dep in deps))
+                profiler.record(features=feature_count(results[name]))
+
+        written = []
+        if not artifacts:
+            return results, written
+        for path, (stage, select, indent, writer) in self.artifacts.items():
+            if stage not in results:
+                continue
+            path = path.format(**{name: values[name] for name in self.inputs if name in values})
+            path = str(Path(output_root) / path) if output_root else path
+            data = results[stage] if select is None else select(results[stage])
+            with profiler.span(path, 'write'):
+                if write and writer is not None:
+                    writer(path, data)
+                elif write:
+                    write_atomic(path, dumps(data, indent))
+            written.append(path)
+            print(f"{'Wrote' if write else 'Would write'} {path}")
+        return results, written
+
+
+pipeline = Pipeline(inputs=('association',))
+
+
+@pipeline.stage('association')
+def regions(association):
+    names = set(association.region_names)
+    return {name: data for name, data in load_region_collections(association.regions_dir).items() if name in names}
+
+
+@pipeline.stage('regions')
+def compiled_schools(regions):
+    return compile_schools(*collect_schools(regions))
+
+
+@pipeline.stage('regions')
+def school_mapping(regions):
+    return build_school_mapping(regions)
+
+
+@pipeline.stage('school_mapping')
+def school_distances(school_mapping):
+    return load_schools(school_mapping)
+
+
+@pipeline.stage('school_mapping', 'association')
+def application_data(school_mapping, association):
+    return build_application_data(decode_school_mapping(school_mapping), association.state_name)
+
+
+@pipeline.stage('school_mapping', 'association')
+def outside_state(school_mapping, association):
+    """Names of schools whose coordinates fall outside the association's state outline"""
+    schools = [(name, info['coordinates']) for name, info in school_mapping['school_mapping'].items()
+               if len(info.get('coordinates') or []) >= 2]
+    if not schools:
+        return []
+    try:
+        outline = association.state_outline()
+    except FileNotFoundError as e:
+        print(f"Warning: {e}; skipping the state outline check")
+        return []
+    points = np.array([coordinates[:2] for _, coordinates in schools], dtype=np.float64)
+    inside = PolygonIndex(outline).contains(points[:, 0], points[:, 1]).any(axis=1)
+    return sorted(name for (name, _), is_inside in zip(schools, inside) if not is_inside)
+
+
+def _copy_features(features):
+    """Copy features deep enough to renumber them and change their properties without touching the originals"""
+    return [{**feature, 'properties': dict(feature.get('properties') or {})} for feature in features]
+
+
+def _copy_lookup(lookup):
+    return {name: dict(entry) for name, entry in lookup.items()}
+
+
+# Stages below never change the results they are given; each edits its own copy, so the
+# outcome does not depend on which stages have run before
+
+@pipeline.stage('regions')
+def combined(regions):
+    features = (feature for data in regions.values() for feature in data.get('features', []))
+    return {"type": "FeatureCollection", "features": list(dedupe_features(_copy_features(features)))}
+
+
+@pipeline.stage('combined')
+def school_lookup(combined):
+    return build_school_lookup(combined['features'])
+
+
+@pipeline.stage('combined', 'school_lookup', 'association')
+def region_naming(combined, school_lookup, association):
+    combined = {**combined, 'features': _copy_features(combined['features'])}
+    school_lookup = _copy_lookup(school_lookup)
+    fix_region_names(combined['features'], school_lookup, association.region_letters)
+    return combined, school_lookup
+
+
+@pipeline.stage('region_naming', 'regions', 'association')
+def class_region(region_naming, regions, association):
+    all_schools, lookup = region_naming
+    all_schools = {**all_schools, 'features': _copy_features(all_schools['features'])}
+    lookup = _copy_lookup(lookup)
+    region_index = SchoolIndex.from_region_collections(regions, last_wins=True)
+    report_duplicates(region_index)
+    apply_region_classes(all_schools['features'], lookup, region_index)
+    lookup = fix_source_file_regions(all_schools['features'], lookup, association.classes)
+    return all_schools, lookup
+
+
+pipeline.artifact(OUTPUT_FILES['compiled_schools'], 'compiled_schools')
+pipeline.artifact(OUTPUT_FILES['school_mapping'], 'school_mapping')
+pipeline.artifact('data/{association.key}_schools_geocodes_updated.json', 'application_data', lambda data: data[0])
+pipeline.artifact('data/{association.key}_classes_regions_updated.json', 'application_data', lambda data: data[1])
+pipeline.artifact('data/{association.key}_districts_updated.json', 'application_data', lambda data: data[2])
+pipeline.artifact(DISTANCE_FILE, 'school_distances', writer=save_distance_matrix)
+pipeline.artifact(OUTPUT_FILES['all_schools'], 'class_region', lambda data: data[0], indent=None)
+pipeline.artifact(OUTPUT_FILES['school_lookup'], 'class_region', lambda data: data[1])
+
+
+def derive_outputs(regions, association):
+    """Build the derived school files, keyed like OUTPUT_FILES, from region collections keyed by region name
+
+    This runs the same stages as a full build, so incremental builds that
+    pass only the region files that changed get entries identical to the
+    ones a full build would write for those schools.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        results, _ = pipeline.run(['compiled_schools', 'school_mapping', 'class_region'], False,
+                                  {'association': association, 'regions': regions}, artifacts=False)
+    all_schools, school_lookup = results['class_region']
+    return {
+        'all_schools': all_schools,
+        'school_lookup': school_lookup,
+        'compiled_schools': results['compiled_schools'],
+        'school_mapping': results['school_mapping'],
+    }
+
+
+def serialize_output(key, data):
+    """Serialize a derived school file byte for byte as its pipeline artifact is written"""
+    _, _, indent, _ = pipeline.artifacts[OUTPUT_FILES[key]]
+    return dumps(data, indent)
+
+
+def build_association(association, targets=None, write=True, capture=True, profile=False):
+    """Run the pipeline for one association into its output tree and return a summary of the build
+
+    With profile set, the summary also carries the build's trace events and
+    span timeline. The profiler is (re)enabled here, which clears the spans
+    of any earlier build a reused pool worker ran.
+    """
+    start = time.perf_counter()
+    if profile:
+        profiler.enable()
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log) if capture else contextlib.nullcontext():
+        with profiler.span(f"build {association.key}", 'pipeline'):
+            results, written = pipeline.run(targets, write, {'association': association}, association.output_root)
+        if profile:
+            print(f"\nSlowest stages of {association.key}:")
+            for line in profiler.summary(depth=1):
+                print(line)
+    mapping = results.get('school_mapping', {}).get('school_mapping')
+    summary = {
+        'association': association.key,
+        'stages': len(results),
+        'schools': len(mapping) if mapping is not None else None,
+        'outside_state': results.get('outside_state', []),
+        'written': written,
+        'seconds': round(time.perf_counter() - start, 2),
+        'log': log.getvalue(),
+    }
+    if profile:
+        summary['trace'] = profiler.chrome_trace()
+        summary['timeline'] = profiler.timeline()
+    return summary
+
+
+def build_associations(associations, targets=None, write=True, workers=None, profile=False):
+    """Build associations concurrently, one process each, yielding summaries as they finish
+
+    Every association writes to its own output tree, so the builds share
+    nothing and a failure in one is reported without stopping the others.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(build_association, association, targets, write, True, profile): association
+                   for association in associations}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                yield {'association': futures[future].key, 'error': f"{type(e).__name__}: {e}"}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the school data pipeline in a single process")
+    parser.add_argument('stages', nargs='*', help="stages to run with their dependencies (default: all)")
+    parser.add_argument('--dry-run', action='store_true', help="run the stages without writing artifacts")
+    parser.add_argument('--list', action='store_true', help="list the stages in run order and exit")
+    parser.add_argument('--association', action='append', metavar='KEY',
+                        help=f"association to build, repeatable (default {DEFAULT_ASSOCIATION})")
+    parser.add_argument('--all', action='store_true', help="build every association in the associations file")
+    parser.add_argument('--workers', type=int, help="processes used when building several associations")
+    parser.add_argument('--profile', nargs='?', const=TRACE_FILE, metavar='PATH',
+                        help=f"record stage timings, I/O, counts and peak memory to a Chrome trace (default {TRACE_FILE})")
+    args = parser.parse_args()
+
+    if args.list:
+        for name in pipeline.order():
+            print(f"{name} <- {', '.join(pipeline.stages[name][1]) or '(inputs)'}")
+        raise SystemExit(0)
+
+    associations = load_associations()
+    keys = list(associations) if args.all else args.association or [DEFAULT_ASSOCIATION]
+    unknown = [key for key in keys if key not in associations]
+    if unknown:
+        parser.error(f"unknown association: {', '.join(unknown)} (known: {', '.join(associations)})")
+    targets = args.stages or None
+    state = 'written' if not args.dry_run else 'pending'
+
+    print("=== Running Data Pipeline ===")
+    profile = args.profile is not None
+    if len(keys) == 1:
+        summaries = [build_association(associations[keys[0]], targets, not args.dry_run, False, profile)]
+    else:
+        print(f"Building {len(keys)} associations on {args.workers or 'all'} workers")
+        summaries = build_associations([associations[key] for key in keys], targets, not args.dry_run,
+                                       args.workers, profile)
+
+    failed = 0
+    trace_events, timeline = [], {}
+    for summary in summaries:
+        if profile and 'trace' in summary:
+            # One trace process per association, labelled with its key
+            pid = len(timeline) + 1
+            trace_events.append({'name': 'process_name', 'ph': 'M', 'pid': pid,
+                                 'args': {'name': summary['association']}})
+            trace_events += [dict(event, pid=pid) for event in summary.pop('trace')]
+            timeline[summary['association']] = summary.pop('timeline')
+        if 'error' in summary:
+            failed += 1
+            print(f"\n[{summary['association']}] failed: {summary['error']}")
+            continue
+        if len(keys) > 1:
+            print(f"\n--- {summary['association']} ---\n{summary['log']}", end='')
+        if summary['outside_state']:
+            print(f"Warning: {len(summary['outside_state'])} schools lie outside the state outline: "
+                  f"{', '.join(summary['outside_state'][:5])}")
+        print(f"\n[{summary['association']}] ran {summary['stages']} stages in {summary['seconds']}s, "
+              f"{len(summary['written'])} artifacts {state}")
+
+    if profile:
+        write_atomic(args.profile, trace_document(trace_events, timeline))
+        print(f"\nTrace of {len(trace_events)} events saved to {args.profile} (open in chrome://tracing or Perfetto)")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+TRACE_FILE = "data/pipeline_trace.json"
+# Keys under which stage results keep their schools or features
+CONTAINER_KEYS = ('features', 'school_mapping', 'schools', 'all_schools')
+# Counters that a closing span adds to its parent; the rest (like features) stay with the span
+ROLLUP_COUNTERS = ('bytes_read', 'bytes_written', 'files_read', 'files_written')
+
+
+class Span:
+    """One timed region of work and the counters recorded while it was open"""
+
+    __slots__ = ('name', 'category', 'start', 'duration', 'counters', 'peak_memory', 'depth', 'thread')
+
+    def __init__(self, name, category, depth):
+        self.name = name
+        self.category = category
+        self.start = time.perf_counter()
+        self.duration = None
+        self.counters = {}
+        self.peak_memory = 0
+        self.depth = depth
+        self.thread = threading.get_ident()
+
+    def count(self, **counters):
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def to_json(self, origin):
+        return {
+            'name': self.name,
+            'category': self.category,
+            'start_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round((self.duration or 0) * 1000, 3),
+            'depth': self.depth,
+            'peak_memory_bytes': self.peak_memory,
+            **self.counters,
+        }
+
+
+class Profiler:
+    """Collect nested timing spans, I/O and feature counters and peak memory
+
+    Disabled by default, when span() costs one attribute check and record()
+    nothing. Counters recorded with record() (bytes read and written by the
+    I/O helpers, for example) go to the innermost open span, and the I/O
+    counters are summed into its parents when they close. With memory tracing on, each span's
+    peak is the tracemalloc high-water mark while it was open; a child
+    resets the peak, so it folds the parent's peak so far in first.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.spans = []
+        self.origin = time.perf_counter()
+        self._local = threading.local()
+
+    def enable(self, memory=True):
+        self.enabled = True
+        self.memory = memory
+        self.spans = []
+        self.origin = time.perf_counter()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def disable(self):
+        self.enabled = False
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name, category='stage'):
+        if not self.enabled:
+            yield None
+            return
+        stack = self._stack()
+        if self.memory and stack:
+            stack[-1].peak_memory = max(stack[-1].peak_memory, tracemalloc.get_traced_memory()[1])
+        if self.memory:
+            tracemalloc.reset_peak()
+        span = Span(name, category, len(stack))
+        stack.append(span)
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - span.start
+            stack.pop()
+            if self.memory:
+                span.peak_memory = max(span.peak_memory, tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1].peak_memory = max(stack[-1].peak_memory, span.peak_memory)
+                stack[-1].count(**{key: value for key, value in span.counters.items() if key in ROLLUP_COUNTERS})
+            self.spans.append(span)
+
+    def record(self, **counters):
+        """Add counters (bytes_read=..., features=...) to the innermost open span"""
+        if self.enabled:
+            stack = self._stack()
+            if stack:
+                stack[-1].count(**counters)
+
+    def timeline(self):
+        """Return every closed span in start order as JSON-ready dicts"""
+        return [span.to_json(self.origin) for span in sorted(self.spans, key=lambda span: span.start)]
+
+    def chrome_trace(self, events=None, pid=None):
+        """Return the spans as Chrome trace "complete" events, viewable in chrome://tracing or Perfetto"""
+        pid = os.getpid() if pid is None else pid
+        trace_events = list(events or [])
+        for span in self.spans:
+            trace_events.append({
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': round((span.start - self.origin) * 1e6, 1),
+                'dur': round((span.duration or 0) * 1e6, 1),
+                'pid': pid,
+                'tid': span.thread,
+                'args': {'peak_memory_bytes': span.peak_memory, **span.counters},
+            })
+        return trace_events
+
+    def summary(self, limit=10, depth=0):
+        """Return lines describing the slowest spans at one nesting depth"""
+        spans = sorted((s for s in self.spans if s.depth == depth), key=lambda s: -(s.duration or 0))
+        lines = []
+        for span in spans[:limit]:
+            counters = ', '.join(f"{key} {value:,}" for key, value in sorted(span.counters.items()))
+            memory = f", peak {span.peak_memory / 1e6:.1f} MB" if self.memory else ''
+            lines.append(f"{span.duration * 1000:9.1f} ms  {span.category:<9} {span.name}"
+                         f"{' (' + counters + ')' if counters else ''}{memory}")
+        return lines
+
+
+def trace_document(trace_events, timeline=None):
+    """Return a Chrome trace file's bytes, with the plain span timeline alongside the events"""
+    document = {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+    if timeline is not None:
+        document['timeline'] = timeline
+    return json.dumps(document).encode('utf-8')
+
+
+def feature_count(value):
+    """Best-effort count of the schools or features in a stage result, for the features counter"""
+    if isinstance(value, tuple):
+        return feature_count(value[0]) if value else 0
+    for attribute in ('schools', 'features'):
+        if isinstance(getattr(value, attribute, None), (list, dict)):
+            return len(getattr(value, attribute))
+    if isinstance(value, dict):
+        for key in CONTAINER_KEYS:
+            if isinstance(value.get(key), (list, dict)):
+                return len(value[key])
+        if value and all(isinstance(v, dict) and v.get('type') == 'FeatureCollection' for v in value.values()):
+            return sum(len(v.get('features', [])) for v in value.values())
+        return len(value)
+    if isinstance(value, list):
+        return len(value)
+    return 0
+
+
+profiler = Profiler()
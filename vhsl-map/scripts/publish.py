@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+from pathlib import Path
+
+from build_bundle import BUNDLE_FILE, LOOKUP_FILE
+from geojson_stream import write_atomic
+from optimize_payloads import (BUDGET_FILE, PRECISION, check_budget, compressed_variants, load_budget,
+                               optimize_payload, payload_sizes, save_budget, size_report)
+from school_index import REGION_FILES_DIR
+from search_index import SEARCH_INDEX_FILE
+
+PUBLISH_DIR = "dist/data"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+HASH_LENGTH = 10
+# Logical name -> source file; the client asks the manifest for these names
+DATA_FILES = {
+    'schools.bin': BUNDLE_FILE,
+    'school_lookup.json': LOOKUP_FILE,
+    'search_index.json': SEARCH_INDEX_FILE,
+}
+
+
+def data_files(regions_dir=REGION_FILES_DIR):
+    """Return {logical name: source path} for every file the client can load, region files included"""
+    files = dict(DATA_FILES)
+    for path in sorted(Path(regions_dir).glob("Region *.geojson")):
+        files[f"regions/{path.name}"] = str(path)
+    return files
+
+
+def hashed_name(name, digest):
+    """'regions/Region 1A.geojson' -> 'regions/Region_1A.<hash>.geojson'"""
+    path = Path(name)
+    stem = path.stem.replace(' ', '_')
+    return str(path.with_name(f"{stem}.{digest[:HASH_LENGTH]}{path.suffix}"))
+
+
+def load_published(output_dir=PUBLISH_DIR):
+    try:
+        with open(Path(output_dir) / MANIFEST_NAME, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def publish(files, output_dir=PUBLISH_DIR, prune=True, precision=PRECISION):
+    """Optimize files into output_dir under content-hashed names and write the manifest that maps them
+
+    Each file goes through optimize_payload (rounded, stripped, minified)
+    and gets .gz/.br siblings for servers that send precompressed files.
+    A hashed file never changes once written, so an existing one is left
+    alone and the client may cache it for good; only the manifest has to be
+    fetched fresh. The manifest is written after every file it names, so a
+    reader never sees it point at a missing file. Files named by the
+    previous manifest but not by this one are removed afterwards.
+    Returns the manifest and the sizes of every published payload.
+    """
+    output_dir = Path(output_dir)
+    previous = load_published(output_dir)
+    published = {}
+    sizes = {}
+    copied = 0
+    for name, source in files.items():
+        if not Path(source).exists():
+            print(f"Skipping {name}: {source} not found")
+            continue
+        original = Path(source).read_bytes()
+        content, report = optimize_payload(name, original, precision)
+        if report['collapsed_rings'] or report['restored']:
+            print(f"{name}: {report['collapsed_rings']} of {report['rings']} rings collapsed at precision "
+                  f"{precision}, {report['dropped_parts']} polygons dropped, {report['restored']} kept unrounded")
+        variants = compressed_variants(content)
+        url = hashed_name(name, hashlib.sha256(content).hexdigest())
+        target = output_dir / url
+        if not target.exists():
+            write_atomic(target, content)
+            for suffix, compressed in variants.items():
+                write_atomic(target.with_name(target.name + suffix), compressed)
+            copied += 1
+        published[name] = url
+        sizes[name] = payload_sizes(len(original), content, variants)
+
+    manifest = {'version': MANIFEST_VERSION, 'files': published}
+    write_atomic(output_dir / MANIFEST_NAME, json.dumps(manifest, indent=2).encode('utf-8'))
+
+    removed = 0
+    if prune and previous:
+        current = set(published.values())
+        for url in set(previous.get('files', {}).values()) - current:
+            for suffix in ('', '.gz', '.br'):
+                (output_dir / f"{url}{suffix}").unlink(missing_ok=True)
+            removed += 1
+    print(f"Published {len(published)} files to {output_dir} ({copied} new, {removed} removed)")
+    return manifest, sizes
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Publish data files under content-hashed names with a manifest")
+    parser.add_argument('--regions-dir', default=REGION_FILES_DIR)
+    parser.add_argument('--output', default=PUBLISH_DIR, help=f"directory to publish into (default {PUBLISH_DIR})")
+    parser.add_argument('--keep', action='store_true', help="keep files the previous manifest named")
+    parser.add_argument('--precision', type=int, default=PRECISION,
+                        help=f"decimal places kept in GeoJSON coordinates (default {PRECISION})")
+    parser.add_argument('--budget', default=BUDGET_FILE, help=f"per-file size budget (default {BUDGET_FILE})")
+    parser.add_argument('--update-budget', action='store_true', help="record the published sizes as the new budget")
+    args = parser.parse_args()
+
+    print("=== Publishing Data Files ===")
+    manifest, sizes = publish(data_files(args.regions_dir), args.output, not args.keep, args.precision)
+    for name, url in manifest['files'].items():
+        print(f"  {name} -> {url}")
+
+    budget = load_budget(args.budget)
+    print()
+    for line in size_report(sizes, budget):
+        print(line)
+    if args.update_budget:
+        save_budget(sizes, args.budget)
+        print(f"\nBudget for {len(sizes)} files saved to {args.budget}")
+        raise SystemExit(0)
+    regressions = check_budget(sizes, budget) if budget else []
+    for regression in regressions:
+        print(f"OVER BUDGET {regression['file']} {regression['measure']}: "
+              f"{regression['budget']:,} -> {regression['size']:,} bytes ({regression['change']:+.1%})")
+    if budget is None:
+        print(f"\nNo budget at {args.budget}; run with --update-budget to record one")
+    raise SystemExit(1 if regressions else 0)
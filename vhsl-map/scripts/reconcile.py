@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from pathlib import Path
+
+import numpy as np
+
+from geojson_stream import write_atomic
+from nearest import haversine_km
+from schema import SchoolsFile, load
+from school_index import REGION_FILES_DIR, load_region_collections
+from search_index import normalize, token_grams
+
+GEOCODES_FILE = "data/va_schools_geocodes.json"
+RECONCILIATION_FILE = "data/reconciliation.json"
+# Words that say nothing about which school a name means
+NOISE_WORDS = {'high', 'school', 'hs', 'senior', 'sr', 'secondary', 'the'}
+ABBREVIATIONS = {'st': 'saint', 'mt': 'mount', 'ft': 'fort', 'n': 'north', 's': 'south', 'e': 'east', 'w': 'west'}
+# Grams shared by more records than this are too common to block on
+MAX_GRAM_POSTINGS = 500
+CANDIDATE_LIMIT = 20
+MIN_SHARED_GRAMS = 2
+CELL_DEGREES = 0.05
+# Weights of the name, proximity and district signals; missing signals are left out of the average
+WEIGHTS = {'name': 0.6, 'proximity': 0.3, 'district': 0.1}
+PROXIMITY_KM = 3.0
+QUALIFIER_CONFLICT = 0.5
+MATCH_SCORE = 0.8
+REVIEW_SCORE = 0.5
+MATCH_MARGIN = 0.1
+
+
+def split_name(name):
+    """Normalize a school name into (base, qualifier): "Central (Woodstock) High" -> ("central", "woodstock")"""
+    qualifiers = re.findall(r'\(([^)]*)\)', name)
+    base = re.sub(r'\([^)]*\)', ' ', name)
+
+    def clean(text):
+        words = [ABBREVIATIONS.get(word, word) for word in normalize(text).split()]
+        return ' '.join(word for word in words if word not in NOISE_WORDS) or normalize(text)
+
+    return clean(base), ' '.join(clean(q) for q in qualifiers if normalize(q))
+
+
+class NameRecord:
+    """One school from one source, normalized for matching"""
+
+    __slots__ = ('key', 'name', 'base', 'qualifier', 'base_grams', 'grams', 'lon', 'lat', 'district')
+
+    def __init__(self, name, lon=None, lat=None, district=None, key=None):
+        self.key = name if key is None else key
+        self.name = name
+        self.base, self.qualifier = split_name(name)
+        self.base_grams = set()
+        for token in self.base.split():
+            self.base_grams |= token_grams(token)
+        self.grams = set(self.base_grams)
+        for token in self.qualifier.split():
+            self.grams |= token_grams(token)
+        self.lon = lon
+        self.lat = lat
+        self.district = normalize(district) if district and district != 'Unknown' else None
+
+    @property
+    def full(self):
+        return f"{self.base} {self.qualifier}".strip()
+
+    @property
+    def located(self):
+        return self.lon is not None and self.lat is not None
+
+    def to_json(self):
+        return {'name': self.name, 'district': self.district,
+                'coordinates': [self.lon, self.lat] if self.located else None}
+
+
+def records_from_schools(schools_file):
+    """Records for the schools of a va_schools_geocodes.json SchoolsFile"""
+    return [NameRecord(school.name, school.coordinates.lng, school.coordinates.lat, school.district)
+            for school in schools_file.schools]
+
+
+def records_from_features(features):
+    records = []
+    for feature in features:
+        properties = feature.get('properties') or {}
+        if not properties.get('name'):
+            continue
+        coordinates = (feature.get('geometry') or {}).get('coordinates') or []
+        lon, lat = coordinates[:2] if len(coordinates) >= 2 else (None, None)
+        records.append(NameRecord(properties['name'], lon, lat, properties.get('district')))
+    return records
+
+
+def load_records(path):
+    """Read records from a schools_by_region directory, a GeoJSON file or va_schools_geocodes.json"""
+    path = Path(path)
+    if path.is_dir():
+        regions = load_region_collections(path)
+        return records_from_features(feature for data in regions.values() for feature in data.get('features', []))
+    if path.suffix == '.geojson':
+        return records_from_features(load(path).get('features', []))
+    return records_from_schools(load(path, SchoolsFile))
+
+
+def trigram_dice(left, right):
+    total = len(left.base_grams) + len(right.base_grams)
+    return 2 * len(left.base_grams & right.base_grams) / total if total else 0.0
+
+
+def name_similarity(left, right, dice=None):
+    """Trigram Dice coefficient averaged with difflib's ratio, over base names, with qualifiers checked
+
+    Names that agree on the base but carry different qualifiers ("Central
+    (Wise)" and "Central (Woodstock)") are different schools and are
+    penalized; a qualifier on one side only may name the other's district.
+    """
+    dice = trigram_dice(left, right) if dice is None else dice
+    score = (dice + SequenceMatcher(None, left.base, right.base).ratio()) / 2
+    if left.qualifier and right.qualifier:
+        if left.qualifier != right.qualifier:
+            score *= max(QUALIFIER_CONFLICT, SequenceMatcher(None, left.qualifier, right.qualifier).ratio())
+    elif left.qualifier or right.qualifier:
+        qualified, other = (left, right) if left.qualifier else (right, left)
+        if not (other.district and qualified.qualifier in other.district):
+            score *= 0.95
+    return score
+
+
+def _weighted(signals):
+    return sum(WEIGHTS[key] * value for key, value in signals.items()) / sum(WEIGHTS[key] for key in signals)
+
+
+def score_pair(left, right, distance=None, floor=0.0):
+    """Return (score, signals) for one candidate pair: a weighted average of the signals both sides have
+
+    distance (km) may be passed in when it was computed in bulk. Pairs that
+    could not reach floor even with a perfect difflib ratio return (0, None)
+    without paying for the ratio.
+    """
+    signals = {}
+    if distance is None and left.located and right.located:
+        distance = float(haversine_km(left.lon, left.lat, right.lon, right.lat))
+    if distance is not None:
+        signals['proximity'] = math.exp(-distance / PROXIMITY_KM)
+    if left.district and right.district:
+        signals['district'] = 1.0 if left.district == right.district else 0.0
+    dice = trigram_dice(left, right)
+    if floor and _weighted({**signals, 'name': (dice + 1) / 2}) < floor:
+        return 0.0, None
+    signals['name'] = name_similarity(left, right, dice)
+    score = _weighted(signals)
+    signals['distance_km'] = None if distance is None else round(distance, 3)
+    return score, signals
+
+
+class BlockingIndex:
+    """Inverted indexes over one side of a reconciliation, so each record meets only plausible candidates
+
+    Three blocking keys: name trigrams (grams more common than
+    MAX_GRAM_POSTINGS are skipped), a grid of CELL_DEGREES cells searched
+    with its eight neighbours, and the district. Candidates are ranked by
+    shared grams and capped at CANDIDATE_LIMIT, so work grows with the
+    number of records rather than with the product of both sides.
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self.lons = np.array([np.nan if record.lon is None else record.lon for record in records], dtype=np.float64)
+        self.lats = np.array([np.nan if record.lat is None else record.lat for record in records], dtype=np.float64)
+        self.grams = defaultdict(list)
+        self.cells = defaultdict(list)
+        self.districts = defaultdict(list)
+        for i, record in enumerate(records):
+            for gram in record.grams:
+                self.grams[gram].append(i)
+            if record.located:
+                self.cells[self.cell(record.lon, record.lat)].append(i)
+            if record.district:
+                self.districts[record.district].append(i)
+
+    @staticmethod
+    def cell(lon, lat):
+        return math.floor(lon / CELL_DEGREES), math.floor(lat / CELL_DEGREES)
+
+    def distances(self, record, candidates):
+        """Kilometres from record to each candidate in one vectorized haversine, None where unknown"""
+        if not record.located or not candidates:
+            return [None] * len(candidates)
+        km = haversine_km(record.lon, record.lat, self.lons[candidates], self.lats[candidates])
+        return [None if math.isnan(value) else value for value in km.tolist()]
+
+    def candidates(self, record, limit=CANDIDATE_LIMIT):
+        shared = Counter()
+        for gram in record.grams:
+            posting = self.grams.get(gram, ())
+            if len(posting) <= MAX_GRAM_POSTINGS:
+                shared.update(posting)
+        found = [i for i, count in shared.most_common(limit) if count >= MIN_SHARED_GRAMS]
+
+        nearby = []
+        if record.located:
+            x, y = self.cell(record.lon, record.lat)
+            nearby = [i for dx in (-1, 0, 1) for dy in (-1, 0, 1) for i in self.cells.get((x + dx, y + dy), ())]
+            nearby.sort(key=lambda i: shared[i], reverse=True)
+        if record.district:
+            nearby += [i for i in self.districts.get(record.district, ()) if shared[i] >= MIN_SHARED_GRAMS]
+        seen = set(found)
+        for i in nearby:
+            if len(seen) >= 2 * limit:
+                break
+            if i not in seen:
+                seen.add(i)
+                found.append(i)
+        return found
+
+
+def reconcile(left, right, match_score=MATCH_SCORE, review_score=REVIEW_SCORE, margin=MATCH_MARGIN):
+    """Match two lists of NameRecords one to one; returns matches, a review queue and the unmatched
+
+    Records whose normalized names are equal and unique on both sides are
+    joined by hash first. The rest meet candidates through a BlockingIndex
+    over the right side, and every scored pair above review_score is taken
+    best first, each record at most once. A pair is a match when it scores
+    match_score or more and beats both records' next best candidate by
+    margin; otherwise it goes to the review queue with its alternatives.
+    """
+    matches, review = [], []
+    left_names = Counter(record.full for record in left)
+    right_by_name = defaultdict(list)
+    for j, record in enumerate(right):
+        right_by_name[record.full].append(j)
+
+    exact = [(i, right_by_name[record.full][0]) for i, record in enumerate(left)
+             if left_names[record.full] == 1 and len(right_by_name.get(record.full, ())) == 1]
+    index = BlockingIndex(right)
+    left_lons = np.array([np.nan if record.lon is None else record.lon for record in left], dtype=np.float64)
+    left_lats = np.array([np.nan if record.lat is None else record.lat for record in left], dtype=np.float64)
+    rows = np.array(exact, dtype=np.intp).reshape(-1, 2)
+    distances = haversine_km(left_lons[rows[:, 0]], left_lats[rows[:, 0]], index.lons[rows[:, 1]], index.lats[rows[:, 1]])
+
+    used_left, used_right = set(), set()
+    for (i, j), distance in zip(exact, distances.tolist()):
+        score, signals = score_pair(left[i], right[j], None if math.isnan(distance) else distance)
+        if score >= match_score:
+            matches.append(_pair(left[i], right[j], score, signals, 'exact'))
+            used_left.add(i)
+            used_right.add(j)
+
+    pairs = []
+    options = defaultdict(list)
+    for i, record in enumerate(left):
+        if i in used_left:
+            continue
+        candidates = [j for j in index.candidates(record) if j not in used_right]
+        for j, distance in zip(candidates, index.distances(record, candidates)):
+            score, signals = score_pair(record, right[j], distance, review_score)
+            if score >= review_score:
+                pairs.append((score, i, j, signals))
+                options[('left', i)].append((score, j))
+                options[('right', j)].append((score, i))
+
+    def runner_up(side, key, other):
+        return max((score for score, k in options[(side, key)] if k != other), default=0.0)
+
+    for score, i, j, signals in sorted(pairs, key=lambda pair: -pair[0]):
+        if i in used_left or j in used_right:
+            continue
+        gap = score - max(runner_up('left', i, j), runner_up('right', j, i))
+        if score >= match_score and gap >= margin:
+            matches.append(_pair(left[i], right[j], score, signals, 'fuzzy'))
+            used_right.add(j)
+        else:
+            entry = _pair(left[i], right[j], score, signals, 'review')
+            entry['alternatives'] = [{'name': right[k].name, 'score': round(s, 3)}
+                                     for s, k in sorted(options[('left', i)], reverse=True) if k != j][:3]
+            review.append(entry)
+        used_left.add(i)
+
+    reviewed = {entry['right']['name'] for entry in review}
+    return {
+        'summary': {
+            'left': len(left),
+            'right': len(right),
+            'exact': sum(1 for match in matches if match['method'] == 'exact'),
+            'fuzzy': sum(1 for match in matches if match['method'] == 'fuzzy'),
+            'review': len(review),
+            'unmatched_left': len(left) - len(used_left),
+            'unmatched_right': sum(1 for j, record in enumerate(right)
+                                   if j not in used_right and record.name not in reviewed),
+        },
+        'matches': matches,
+        'review': review,
+        'unmatched_left': [record.to_json() for i, record in enumerate(left) if i not in used_left],
+        'unmatched_right': [record.to_json() for j, record in enumerate(right)
+                            if j not in used_right and record.name not in reviewed],
+    }
+
+
+def _pair(left, right, score, signals, method):
+    return {'left': left.to_json(), 'right': right.to_json(), 'score': round(score, 3), 'method': method,
+            'name_score': round(signals['name'], 3), 'distance_km': signals['distance_km']}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Reconcile school names between two data sources")
+    parser.add_argument('left', nargs='?', default=GEOCODES_FILE,
+                        help=f"va_schools_geocodes.json, a GeoJSON file or a region directory (default {GEOCODES_FILE})")
+    parser.add_argument('right', nargs='?', default=REGION_FILES_DIR, help=f"default {REGION_FILES_DIR}")
+    parser.add_argument('--match-score', type=float, default=MATCH_SCORE)
+    parser.add_argument('--review-score', type=float, default=REVIEW_SCORE)
+    parser.add_argument('--output', default=RECONCILIATION_FILE)
+    args = parser.parse_args()
+
+    result = reconcile(load_records(args.left), load_records(args.right), args.match_score, args.review_score)
+    summary = result['summary']
+    print("=== Name Reconciliation ===")
+    print(f"{args.left}: {summary['left']} schools, {args.right}: {summary['right']} schools")
+    print(f"Matched {summary['exact']} exactly and {summary['fuzzy']} fuzzily; {summary['review']} to review, "
+          f"{summary['unmatched_left']} + {summary['unmatched_right']} unmatched")
+    for match in result['matches']:
+        if match['method'] == 'fuzzy':
+            print(f"  match  {match['left']['name']} = {match['right']['name']} ({match['score']})")
+    for entry in result['review']:
+        print(f"  review {entry['left']['name']} ? {entry['right']['name']} ({entry['score']})")
+    write_atomic(args.output, json.dumps(result, indent=2).encode('utf-8'))
+    print(f"Reconciliation saved to {args.output}")
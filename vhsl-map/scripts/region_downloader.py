@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from associations import BASE_URL, VHSL
+from geojson_stream import write_atomic
+
+CACHE_DIR = "data/cache/regions"
+
+
+def region_names(association=VHSL):
+    """Return the region names of an association's classification scheme ("Region 1A" ... "Region 6D")"""
+    return association.region_names
+
+
+class RegionDownloader:
+    """Fetch region files concurrently over a pooled session with a local HTTP cache
+
+    Responses are stored in a content-addressed cache (objects named by their
+    SHA-256) and the ETag / Last-Modified validators for each URL are kept in
+    an index next to them. Later runs send conditional requests, so files that
+    have not changed upstream come back as 304s and are served from the cache.
+    """
+
+    def __init__(self, base_url=BASE_URL, cache_dir=CACHE_DIR, max_workers=8, timeout=30, session=None):
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.index_file = self.cache_dir / "index.json"
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = session or self._create_session(max_workers)
+        self._lock = threading.Lock()
+        self.index = self._load_index()
+
+    @staticmethod
+    def _create_session(max_workers):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=2)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _load_index(self):
+        try:
+            with open(self.index_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        with self._lock:
+            content = json.dumps(self.index, indent=2, sort_keys=True).encode('utf-8')
+        write_atomic(self.index_file, content)
+
+    def url_for(self, region):
+        return f"{self.base_url}{quote(region)}.geojson"
+
+    def _read_object(self, digest):
+        try:
+            with open(self.objects_dir / digest, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _store_object(self, content):
+        digest = hashlib.sha256(content).hexdigest()
+        object_path = self.objects_dir / digest
+        if not object_path.exists():
+            write_atomic(object_path, content)
+        return digest
+
+    def fetch(self, region):
+        """Fetch one region, returning a result dict with its status and content"""
+        url = self.url_for(region)
+        with self._lock:
+            cached = dict(self.index.get(url, {}))
+
+        cached_content = self._read_object(cached['sha256']) if cached.get('sha256') else None
+        headers = {}
+        if cached_content is not None:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        result = {'region': region, 'url': url}
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and cached_content is not None:
+                result.update(status='not_modified', content=cached_content, sha256=cached['sha256'])
+                return result
+            response.raise_for_status()
+        except Exception as e:
+            result.update(status='error', error=str(e), content=None)
+            return result
+
+        content = response.content
+        digest = self._store_object(content)
+        with self._lock:
+            self.index[url] = {
+                'sha256': digest,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+        status = 'unchanged' if digest == cached.get('sha256') else 'downloaded'
+        result.update(status=status, content=content, sha256=digest)
+        return result
+
+    def download_all(self, regions=None):
+        """Fetch every region on a bounded thread pool; results keep the order of regions"""
+        regions = list(regions) if regions is not None else region_names()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self.fetch, regions))
+        self._save_index()
+        return results
+
+
+def download_regions(destinations, regions=None, base_url=BASE_URL, cache_dir=CACHE_DIR, max_workers=8):
+    """Download regions and write each one to every path returned by destinations(region)
+
+    Returns the list of regions that are available locally, whether they were
+    downloaded or served from the cache.
+    """
+    downloader = RegionDownloader(base_url=base_url, cache_dir=cache_dir, max_workers=max_workers)
+    results = downloader.download_all(regions)
+
+    available = []
+    counts = {}
+    for result in results:
+        region = result['region']
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+        if result['status'] == 'error':
+            print(f"  Error downloading {region}: {result['error']}")
+            continue
+
+        for path in destinations(region):
+            path = Path(path)
+            if path.exists() and path.read_bytes() == result['content']:
+                continue
+            write_atomic(path, result['content'])
+        available.append(region)
+        print(f"  {region}: {result['status'].replace('_', ' ')}")
+
+    summary = ', '.join(f"{count} {status.replace('_', ' ')}" for status, count in sorted(counts.items()))
+    print(f"Fetched {len(available)} out of {len(results)} region files ({summary})")
+    return available
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Download VHSL region files with a local HTTP cache")
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--output-dir', default="data/geojson/schools_by_region")
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    download_regions(lambda region: [output_dir / f"{region}.geojson"],
+                     base_url=args.base_url, cache_dir=args.cache_dir, max_workers=args.workers)
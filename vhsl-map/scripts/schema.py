@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+
+import json
+
+try:
+    import orjson
+except ImportError:  # the standard library json module does everything, just slower
+    orjson = None
+
+from geojson_stream import write_atomic
+from profiling import profiler
+
+BACKEND = 'orjson' if orjson else 'json'
+MISSING = object()
+
+
+class SchemaError(ValueError):
+    """A document that does not match its schema; str() says where ("schools[3].coordinates.lat")"""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+        self.steps = []
+
+    def within(self, step):
+        """Add the key or list index the error happened under, innermost first"""
+        self.steps.append(step)
+        return self
+
+    @property
+    def path(self):
+        path = ''
+        for step in reversed(self.steps):
+            path += f"[{step}]" if isinstance(step, int) else f".{step}" if path else step
+        return path
+
+    def __str__(self):
+        return f"{self.path or 'document'}: {self.message}"
+
+
+# Field kinds are either a tuple of exact JSON types, checked inline, or a decoder
+# function taking the value and returning what to store. Error paths are only
+# built on the way out of a failure, so valid documents pay for type checks alone.
+STRING = (str,)
+NUMBER = (int, float)
+BOOLEAN = (bool,)
+_DESCRIPTIONS = {STRING: "a string", NUMBER: "a number", BOOLEAN: "true or false"}
+
+
+def _mismatch(kind, value):
+    return SchemaError(f"expected {_DESCRIPTIONS.get(kind, kind)}, got {type(value).__name__}")
+
+
+def _check(kind, value):
+    if kind.__class__ is tuple:
+        if type(value) not in kind:
+            raise _mismatch(kind, value)
+        return value
+    return kind(value)
+
+
+def _locate(kind, items):
+    """Re-check (step, value) pairs one at a time to find which one failed"""
+    for step, value in items:
+        try:
+            _check(kind, value)
+        except SchemaError as e:
+            raise e.within(step)
+
+
+def integer(value):
+    """An integer, also accepted as a string of digits ("3"); stored as given so files round-trip unchanged"""
+    if type(value) is int or (type(value) is str and value.isdigit()):
+        return value
+    raise SchemaError(f"expected an integer, got {type(value).__name__}")
+
+
+def position(value):
+    """A GeoJSON position: [longitude, latitude]"""
+    if type(value) is not list or len(value) < 2 or type(value[0]) not in NUMBER or type(value[1]) not in NUMBER:
+        raise SchemaError(f"expected [longitude, latitude], got {value!r:.40}")
+    return value
+
+
+def optional(kind):
+    """Accept null (and an empty list, which older files use for unknown coordinates) as None"""
+    def decode_optional(value):
+        return None if value is None or value == [] else _check(kind, value)
+    return decode_optional
+
+
+def list_of(kind):
+    def decode_list(value):
+        if type(value) is not list:
+            raise SchemaError(f"expected a list, got {type(value).__name__}")
+        try:
+            if kind.__class__ is tuple:
+                for item in value:
+                    if type(item) not in kind:
+                        raise _mismatch(kind, item)
+                return value
+            return [kind(item) for item in value]
+        except SchemaError:
+            _locate(kind, enumerate(value))
+    return decode_list
+
+
+def dict_of(kind):
+    """An object with arbitrary string keys, every value decoded the same way"""
+    def decode_dict(value):
+        if type(value) is not dict:
+            raise SchemaError(f"expected an object, got {type(value).__name__}")
+        try:
+            if kind.__class__ is tuple:
+                for item in value.values():
+                    if type(item) not in kind:
+                        raise _mismatch(kind, item)
+                return value
+            return {key: kind(item) for key, item in value.items()}
+        except SchemaError:
+            _locate(kind, value.items())
+    return decode_dict
+
+
+class Record:
+    """Base class for typed JSON objects
+
+    Subclasses list their FIELDS as (key, attribute, kind, default); a
+    default of MISSING makes the key required, a callable default is called
+    for each record. Keys the schema does not know about are kept in extra
+    and written back out after the schema's own keys, so a round trip never
+    drops data.
+    """
+
+    FIELDS = ()
+
+    def __init__(self, **values):
+        for key, attribute, _, default in self.FIELDS:
+            if attribute in values:
+                value = values.pop(attribute)
+            elif default is MISSING:
+                raise TypeError(f"{type(self).__name__} needs {attribute}")
+            else:
+                value = default() if callable(default) else default
+            setattr(self, attribute, value)
+        self.extra = values
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.KEYS = frozenset(key for key, _, _, _ in cls.FIELDS)
+
+    @classmethod
+    def decode(cls, value):
+        if type(value) is not dict:
+            raise SchemaError(f"expected a {cls.__name__} object, got {type(value).__name__}")
+        fields = {}
+        found = 0
+        missing = None
+        try:
+            for key, attribute, kind, default in cls.FIELDS:
+                item = value.get(key, MISSING)
+                if item is MISSING:
+                    if default is MISSING:
+                        missing = key
+                        break
+                    item = default() if callable(default) else default
+                else:
+                    found += 1
+                    if kind.__class__ is tuple:
+                        if type(item) not in kind:
+                            raise _mismatch(kind, item)
+                    else:
+                        item = kind(item)
+                fields[attribute] = item
+        except SchemaError as e:
+            raise e.within(key)
+        if missing is not None:
+            raise SchemaError(f"missing required key '{missing}'")
+        fields['extra'] = {} if found == len(value) else {k: v for k, v in value.items() if k not in cls.KEYS}
+        record = cls.__new__(cls)
+        record.__dict__ = fields
+        return record
+
+    def encode(self):
+        data = {key: _encode(getattr(self, attribute)) for key, attribute, _, _ in self.FIELDS}
+        data.update(self.extra)
+        return data
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.encode() == other.encode()
+
+    def __repr__(self):
+        fields = ', '.join(f"{attribute}={getattr(self, attribute)!r}" for _, attribute, _, _ in self.FIELDS[:3])
+        return f"{type(self).__name__}({fields})"
+
+
+def _encode(value):
+    if isinstance(value, Record):
+        return value.encode()
+    if type(value) is list:
+        return [_encode(item) for item in value]
+    if type(value) is dict:
+        return {key: _encode(item) for key, item in value.items()}
+    return value
+
+
+class LngLat(Record):
+    """Coordinates as stored in va_schools_geocodes.json: {"lng": ..., "lat": ...}"""
+    FIELDS = (
+        ('lng', 'lng', NUMBER, MISSING),
+        ('lat', 'lat', NUMBER, MISSING),
+    )
+
+
+class School(Record):
+    """One school in va_schools_geocodes.json"""
+    FIELDS = (
+        ('name', 'name', STRING, MISSING),
+        ('coordinates', 'coordinates', LngLat.decode, MISSING),
+        ('address', 'address', STRING, ''),
+        ('class', 'class_', STRING, MISSING),
+        ('region', 'region', STRING, MISSING),
+        ('district', 'district', STRING, ''),
+        ('synthetic', 'synthetic', BOOLEAN, False),
+    )
+
+
+class Region(Record):
+    """A region listed under its class in vhsl_classes_regions.json"""
+    FIELDS = (
+        ('id', 'id', STRING, MISSING),
+        ('name', 'name', STRING, MISSING),
+    )
+
+
+class SchoolClass(Record):
+    """A class and its regions in vhsl_classes_regions.json"""
+    FIELDS = (
+        ('id', 'id', STRING, MISSING),
+        ('name', 'name', STRING, MISSING),
+        ('regions', 'regions', list_of(Region.decode), list),
+    )
+
+
+class District(Record):
+    """A district and the names of its schools in vhsl_districts.json"""
+    FIELDS = (
+        ('id', 'id', STRING, MISSING),
+        ('name', 'name', STRING, MISSING),
+        ('schools', 'schools', list_of(STRING), list),
+    )
+
+
+class LookupEntry(Record):
+    """A school_lookup.json entry; size is the class number (3 or "3"), class is "Class N\""""
+    FIELDS = (
+        ('name', 'name', STRING, MISSING),
+        ('size', 'size', integer, MISSING),
+        ('class', 'class_', STRING, MISSING),
+        ('region', 'region', STRING, MISSING),
+        ('district', 'district', STRING, ''),
+        ('coordinates', 'coordinates', optional(position), None),
+    )
+
+    def encode(self):
+        data = super().encode()
+        if data['coordinates'] is None:
+            del data['coordinates']
+        return data
+
+
+class MappingEntry(Record):
+    """A school's entry in school_mapping.json; class is the bare class number"""
+    FIELDS = (
+        ('class', 'class_', STRING, MISSING),
+        ('region', 'region', STRING, MISSING),
+        ('district', 'district', STRING, 'Unknown'),
+        ('coordinates', 'coordinates', optional(position), None),
+    )
+
+    def encode(self):
+        data = super().encode()
+        data['coordinates'] = data['coordinates'] or []
+        return data
+
+
+class SchoolsFile(Record):
+    """va_schools_geocodes.json"""
+    FIELDS = (
+        ('schools', 'schools', list_of(School.decode), MISSING),
+    )
+
+
+class ClassesFile(Record):
+    """vhsl_classes_regions.json"""
+    FIELDS = (
+        ('classes', 'classes', list_of(SchoolClass.decode), MISSING),
+    )
+
+
+class DistrictsFile(Record):
+    """vhsl_districts.json"""
+    FIELDS = (
+        ('districts', 'districts', list_of(District.decode), MISSING),
+    )
+
+
+class SchoolMapping(Record):
+    """school_mapping.json: schools by name plus the (possibly empty) class, region and district maps"""
+    FIELDS = (
+        ('school_mapping', 'schools', dict_of(MappingEntry.decode), MISSING),
+        ('class_mapping', 'classes', dict_of(list_of(STRING)), dict),
+        ('region_mapping', 'regions', dict_of(list_of(STRING)), dict),
+        ('district_mapping', 'districts', dict_of(list_of(STRING)), dict),
+    )
+
+
+class CompiledSchools(Record):
+    """compiled_schools.json: every school name, grouped by class, region and district"""
+    FIELDS = (
+        ('all_schools', 'all_schools', list_of(STRING), MISSING),
+        ('by_class', 'by_class', dict_of(list_of(STRING)), dict),
+        ('by_region', 'by_region', dict_of(list_of(STRING)), dict),
+        ('by_district', 'by_district', dict_of(list_of(STRING)), dict),
+    )
+
+
+class SchoolLookup:
+    """school_lookup.json: {school name: LookupEntry}"""
+    decode = staticmethod(dict_of(LookupEntry.decode))
+
+
+def loads(content, schema=None):
+    """Parse JSON bytes or text, then decode it through schema (a Record class or decoder) if given"""
+    data = orjson.loads(content) if orjson else json.loads(content)
+    if schema is None:
+        return data
+    return getattr(schema, 'decode', schema)(data)
+
+
+def dumps(document, indent=2):
+    """Serialize records (or plain JSON data) to UTF-8 bytes; orjson handles indent 2 or None, json the rest"""
+    data = _encode(document)
+    if orjson and indent in (None, 2):
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    separators = (',', ':') if indent is None else None  # match orjson's compact output byte for byte
+    return json.dumps(data, indent=indent, separators=separators, ensure_ascii=False).encode('utf-8')
+
+
+def load(path, schema=None):
+    with open(path, 'rb') as f:
+        content = f.read()
+    profiler.record(bytes_read=len(content), files_read=1)
+    return loads(content, schema)
+
+
+def dump(path, document, indent=2):
+    write_atomic(path, dumps(document, indent))
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    FILES = {
+        'data/va_schools_geocodes.json': SchoolsFile,
+        'data/vhsl_classes_regions.json': ClassesFile,
+        'data/vhsl_districts.json': DistrictsFile,
+        'data/school_mapping.json': SchoolMapping,
+        'data/compiled_schools.json': CompiledSchools,
+        'data/geojson/school_lookup.json': SchoolLookup,
+    }
+
+    parser = argparse.ArgumentParser(description="Decode the school data files through their schemas")
+    parser.add_argument('--repeat', type=int, default=20, help="decode each file this many times for timing")
+    args = parser.parse_args()
+
+    print(f"=== Schema Check ({BACKEND} backend) ===")
+    failed = 0
+    for path, schema in FILES.items():
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                document = loads(content, schema)
+            elapsed = (time.perf_counter() - start) / args.repeat
+        except (OSError, ValueError) as e:
+            failed += 1
+            print(f"FAIL {path}: {e}")
+            continue
+        round_trip = loads(dumps(document), schema) == document if isinstance(document, Record) else True
+        print(f"ok   {path}: {len(content) / 1024:.1f} KB in {elapsed * 1000:.2f} ms"
+              f"{'' if round_trip else ' (round trip differs)'}")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+
+import json
+from collections import defaultdict
+from pathlib import Path
+
+from profiling import profiler
+
+REGION_FILES_DIR = "data/geojson/schools_by_region"
+ALL_SCHOOLS_FILE = "dist/data/geojson/all_schools.geojson"
+
+
+def region_class(region):
+    """Return the class number embedded in a region name ("Region 3B" -> "3")"""
+    if not region or ' ' not in region:
+        return ''
+    code = region.split(' ')[1]
+    return code[0] if code and code[0].isdigit() else ''
+
+
+def load_region_collections(directory=REGION_FILES_DIR):
+    """Load every "Region NX.geojson" file in directory, keyed by region name in sorted order"""
+    regions = {}
+    for file_path in sorted(Path(directory).glob("Region *.geojson")):
+        try:
+            with open(file_path, 'r') as f:
+                regions[file_path.stem] = json.load(f)
+            profiler.record(bytes_read=file_path.stat().st_size, files_read=1)
+        except Exception as e:
+            print(f"Error processing {file_path}: {str(e)}")
+    return regions
+
+
+class SchoolIndex:
+    """Schools loaded once and indexed by name, class, region and district
+
+    Each school is stored as a lookup entry (the same shape as the entries in
+    school_lookup.json) alongside the GeoJSON feature it was read from, so
+    scripts can read indexed values and still write the features back out.
+    The first feature seen for a name wins, matching how the combined
+    all_schools.geojson has always been deduplicated. With last_wins the
+    final listing replaces earlier ones instead, as the class and region
+    fix-up has always resolved schools listed in several region files.
+    Repeated names are recorded in duplicates either way.
+    """
+
+    def __init__(self):
+        self.schools = {}
+        self.features = {}
+        self.by_class = defaultdict(list)
+        self.by_region = defaultdict(list)
+        self.by_district = defaultdict(list)
+        self.duplicates = []
+
+    def __len__(self):
+        return len(self.schools)
+
+    def __contains__(self, name):
+        return name in self.schools
+
+    def __iter__(self):
+        return iter(self.schools.values())
+
+    @classmethod
+    def from_geojson(cls, path=ALL_SCHOOLS_FILE):
+        """Build an index from a combined FeatureCollection such as all_schools.geojson"""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls.from_feature_collection(data)
+
+    @classmethod
+    def from_feature_collection(cls, data):
+        """Build an index over an already loaded FeatureCollection, sharing its feature dicts"""
+        index = cls()
+        for feature in data.get('features', []):
+            index.add_feature(feature)
+        return index
+
+    @classmethod
+    def from_region_files(cls, directory=REGION_FILES_DIR, last_wins=False):
+        """Build an index from the per-region files, taking class and region from each filename"""
+        return cls.from_region_collections(load_region_collections(directory), last_wins)
+
+    @classmethod
+    def from_region_collections(cls, regions, last_wins=False):
+        """Build an index from already loaded region FeatureCollections keyed by region name"""
+        index = cls()
+        for region_name, data in regions.items():
+            for feature in data.get('features', []):
+                index.add_feature(feature, class_num=region_class(region_name), region=region_name,
+                                  last_wins=last_wins)
+        return index
+
+    def add_feature(self, feature, class_num=None, region=None, last_wins=False):
+        """Index a feature; class and region default to the feature's own properties"""
+        properties = feature.get('properties') or {}
+        name = properties.get('name')
+        if not name:
+            return None
+        if name in self.schools:
+            self.duplicates.append(name)
+            if not last_wins:
+                return self.schools[name]
+            self._unlink(self.schools[name])
+
+        if class_num is None:
+            size = properties.get('size')
+            class_num = str(size) if size not in (None, '') else ''
+        if region is None:
+            region = properties.get('region', '')
+
+        school = {
+            'name': name,
+            'size': class_num,
+            'class': f"Class {class_num}" if class_num else '',
+            'region': region,
+            'district': properties.get('district', ''),
+            'coordinates': (feature.get('geometry') or {}).get('coordinates', []),
+        }
+        self.schools[name] = school
+        self.features[name] = feature
+        self._link(school)
+        return school
+
+    def get(self, name):
+        return self.schools.get(name)
+
+    def feature(self, name):
+        return self.features.get(name)
+
+    def in_class(self, class_num):
+        return [self.schools[name] for name in self.by_class.get(str(class_num), [])]
+
+    def in_region(self, region):
+        return [self.schools[name] for name in self.by_region.get(region, [])]
+
+    def in_district(self, district):
+        return [self.schools[name] for name in self.by_district.get(district, [])]
+
+    def assign(self, name, class_num=None, region=None, district=None):
+        """Move a school to a new class, region or district, keeping indexes and its feature in sync"""
+        school = self.schools[name]
+        self._unlink(school)
+
+        properties = self.features[name].setdefault('properties', {})
+        if class_num is not None:
+            school['size'] = str(class_num)
+            school['class'] = f"Class {class_num}"
+            properties['size'] = school['size']
+            properties['class'] = school['class']
+        if region is not None:
+            school['region'] = region
+            properties['region'] = region
+        if district is not None:
+            school['district'] = district
+            properties['district'] = district
+
+        self._link(school)
+        return school
+
+    def lookup(self):
+        """Return a school_lookup.json style mapping of name -> entry"""
+        return {
+            name: {key: school[key] for key in ('name', 'size', 'class', 'region', 'district')}
+            for name, school in self.schools.items()
+        }
+
+    def feature_collection(self):
+        return {"type": "FeatureCollection", "features": list(self.features.values())}
+
+    def _link(self, school):
+        name = school['name']
+        if school['size']:
+            self.by_class[school['size']].append(name)
+        if school['region']:
+            self.by_region[school['region']].append(name)
+        if school['district']:
+            self.by_district[school['district']].append(name)
+
+    def _unlink(self, school):
+        name = school['name']
+        for bucket, key in ((self.by_class, school['size']),
+                            (self.by_region, school['region']),
+                            (self.by_district, school['district'])):
+            names = bucket.get(key)
+            if names and name in names:
+                names.remove(name)
+                if not names:
+                    del bucket[key]
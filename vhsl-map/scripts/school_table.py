@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+
+import sys
+
+import numpy as np
+
+from school_index import REGION_FILES_DIR, load_region_collections, region_class
+
+
+class Dictionary:
+    """Distinct strings of one column, each stored once and referred to by a small integer code"""
+
+    def __init__(self, values=()):
+        self.values = []
+        self.codes = {}
+        for value in values:
+            self.encode(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return code
+
+    def code(self, value):
+        """Return the code of value, or -1 when the column never holds it"""
+        return self.codes.get(value, -1)
+
+    @property
+    def nbytes(self):
+        return sum(sys.getsizeof(value) for value in self.values) + sys.getsizeof(self.codes)
+
+
+class SchoolRow:
+    """A lightweight view of one row of a SchoolTable"""
+
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    @property
+    def name(self):
+        return self.table.name(self.row)
+
+    @property
+    def class_num(self):
+        return self.table.classes.values[self.table.class_codes[self.row]]
+
+    @property
+    def region(self):
+        return self.table.regions.values[self.table.region_codes[self.row]]
+
+    @property
+    def district(self):
+        return self.table.districts.values[self.table.district_codes[self.row]]
+
+    @property
+    def coordinates(self):
+        lon, lat = float(self.table.lons[self.row]), float(self.table.lats[self.row])
+        return [] if np.isnan(lon) else [lon, lat]
+
+    def lookup_entry(self):
+        """The school as a school_lookup.json entry"""
+        class_num = self.class_num
+        return {
+            'name': self.name,
+            'size': class_num,
+            'class': f"Class {class_num}" if class_num else '',
+            'region': self.region,
+            'district': self.district,
+        }
+
+    def __repr__(self):
+        return f"SchoolRow({self.name!r}, {self.region!r})"
+
+
+class SchoolTable:
+    """Schools stored column by column instead of as one dict per school
+
+    Coordinates are two float64 arrays; class, region and district are uint16
+    codes into per-column dictionaries, so "Region 3B" or a district name is
+    held once however many schools share it. Names live in one UTF-8 buffer
+    with an offset array, plus a name-sorted row order for binary-search
+    lookups, so the table holds no per-school Python objects at all. A school
+    costs a few dozen bytes instead of the better part of a kilobyte as a
+    lookup dict with its feature. The first row seen for a name wins, as in
+    SchoolIndex.
+    """
+
+    def __init__(self, names, class_nums, regions, districts, lons, lats):
+        self.classes = Dictionary()
+        self.regions = Dictionary()
+        self.districts = Dictionary()
+        self.class_codes = np.array([self.classes.encode(value) for value in class_nums], dtype=np.uint16)
+        self.region_codes = np.array([self.regions.encode(value) for value in regions], dtype=np.uint16)
+        self.district_codes = np.array([self.districts.encode(value) for value in districts], dtype=np.uint16)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.lats = np.asarray(lats, dtype=np.float64)
+
+        encoded = [name.encode('utf-8') for name in names]
+        self.offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+        np.cumsum([len(name) for name in encoded], out=self.offsets[1:])
+        self.name_buffer = b''.join(encoded)
+        self.name_order = np.array(sorted(range(len(encoded)), key=encoded.__getitem__), dtype=np.uint32)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a table from (name, class_num, region, district, lon, lat) tuples, first name wins"""
+        seen = set()
+        columns = [[] for _ in range(6)]
+        for row in rows:
+            if row[0] and row[0] not in seen:
+                seen.add(row[0])
+                for column, value in zip(columns, row):
+                    column.append(value)
+        return cls(*columns)
+
+    @classmethod
+    def from_region_collections(cls, regions):
+        """Build a table from region FeatureCollections keyed by region name, like SchoolIndex"""
+        def rows():
+            for region_name, data in regions.items():
+                class_num = region_class(region_name)
+                for feature in data.get('features', []):
+                    properties = feature.get('properties') or {}
+                    coordinates = (feature.get('geometry') or {}).get('coordinates') or []
+                    lon, lat = coordinates[:2] if len(coordinates) >= 2 else (np.nan, np.nan)
+                    yield (properties.get('name'), class_num, region_name, properties.get('district', ''), lon, lat)
+        return cls.from_rows(rows())
+
+    @classmethod
+    def from_region_files(cls, directory=REGION_FILES_DIR):
+        return cls.from_region_collections(load_region_collections(directory))
+
+    @classmethod
+    def from_mapping(cls, school_mapping):
+        """Build a table from a loaded school_mapping.json"""
+        def rows():
+            for name, info in school_mapping['school_mapping'].items():
+                coordinates = info.get('coordinates') or []
+                lon, lat = coordinates[:2] if len(coordinates) >= 2 else (np.nan, np.nan)
+                district = info.get('district', '')
+                yield (name, info['class'], info['region'], '' if district == 'Unknown' else district, lon, lat)
+        return cls.from_rows(rows())
+
+    def __len__(self):
+        return len(self.lons)
+
+    def __iter__(self):
+        return (SchoolRow(self, row) for row in range(len(self)))
+
+    def __contains__(self, name):
+        return self.find(name) >= 0
+
+    def __getitem__(self, name):
+        row = self.find(name)
+        if row < 0:
+            raise KeyError(name)
+        return SchoolRow(self, row)
+
+    def name(self, row):
+        return self.name_buffer[self.offsets[row]:self.offsets[row + 1]].decode('utf-8')
+
+    def names(self, rows=None):
+        rows = range(len(self)) if rows is None else rows
+        return [self.name(row) for row in rows]
+
+    def find(self, name):
+        """Return the row of a school by name, or -1, by binary search over the sorted names"""
+        key = name.encode('utf-8')
+        low, high = 0, len(self.name_order)
+        while low < high:
+            middle = (low + high) // 2
+            row = self.name_order[middle]
+            if self.name_buffer[self.offsets[row]:self.offsets[row + 1]] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.name_order):
+            row = int(self.name_order[low])
+            if self.name_buffer[self.offsets[row]:self.offsets[row + 1]] == key:
+                return row
+        return -1
+
+    def rows_where(self, class_num=None, region=None, district=None):
+        """Return the rows matching every given column value as an index array"""
+        mask = np.ones(len(self), dtype=bool)
+        for dictionary, codes, value in ((self.classes, self.class_codes, class_num),
+                                         (self.regions, self.region_codes, region),
+                                         (self.districts, self.district_codes, district)):
+            if value is not None:
+                mask &= codes == dictionary.code(str(value) if dictionary is self.classes else value)
+        return np.flatnonzero(mask)
+
+    def groups(self, column):
+        """Group school names by 'class', 'region' or 'district' as {value: [names]} in row order"""
+        dictionary, codes = {
+            'class': (self.classes, self.class_codes),
+            'region': (self.regions, self.region_codes),
+            'district': (self.districts, self.district_codes),
+        }[column]
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(dictionary) + 1))
+        return {dictionary.values[code]: self.names(order[bounds[code]:bounds[code + 1]])
+                for code in range(len(dictionary)) if bounds[code] < bounds[code + 1]}
+
+    def lookup(self):
+        """Return a school_lookup.json style mapping of name -> entry"""
+        return {row.name: row.lookup_entry() for row in self}
+
+    def mapping(self):
+        """Return the data of school_mapping.json"""
+        return {
+            "school_mapping": {
+                row.name: {
+                    "class": row.class_num,
+                    "region": row.region,
+                    "district": row.district or 'Unknown',
+                    "coordinates": row.coordinates,
+                }
+                for row in self
+            },
+            "class_mapping": {},
+            "region_mapping": {},
+            "district_mapping": {}
+        }
+
+    @property
+    def nbytes(self):
+        """Bytes held by the table: column arrays, name buffer and dictionaries"""
+        arrays = (self.class_codes, self.region_codes, self.district_codes, self.lons, self.lats,
+                  self.offsets, self.name_order)
+        return (sum(array.nbytes for array in arrays) + len(self.name_buffer)
+                + self.classes.nbytes + self.regions.nbytes + self.districts.nbytes)
+
+
+if __name__ == "__main__":
+    import argparse
+    import tracemalloc
+
+    from school_index import SchoolIndex
+
+    parser = argparse.ArgumentParser(description="Compare the memory used by SchoolIndex and SchoolTable")
+    parser.add_argument('--regions-dir', default=REGION_FILES_DIR)
+    args = parser.parse_args()
+
+    regions = load_region_collections(args.regions_dir)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    index = SchoolIndex.from_region_collections(regions)
+    lookup = index.lookup()
+    dict_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    table = SchoolTable.from_region_collections(regions)
+    count = len(table)
+    print(f"=== School Memory ({count} schools) ===")
+    print(f"SchoolIndex + lookup: {dict_bytes / count:8.0f} bytes/school (not counting the shared features)")
+    print(f"SchoolTable:          {table.nbytes / count:8.0f} bytes/school")
+    print(f"{len(table.classes)} classes, {len(table.regions)} regions, {len(table.districts)} districts")
+    print(f"Lookup round trip: {'ok' if table.lookup() == lookup else 'MISMATCH'}")
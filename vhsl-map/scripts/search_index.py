@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+import json
+import re
+import unicodedata
+from collections import defaultdict
+
+from build_bundle import LOOKUP_FILE
+from geojson_stream import write_atomic
+
+SEARCH_INDEX_FILE = "data/geojson/search_index.json"
+VERSION = 1
+N = 3
+KINDS = ['school', 'district', 'region', 'class']
+
+# Match quality, best first; fuzzy matches add their edit distance
+PREFIX, SUBSTRING, FUZZY = 0, 1, 2
+
+
+def normalize(text):
+    """Lowercase, strip accents and reduce text to space-separated alphanumeric words"""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return ' '.join(re.findall(r'[a-z0-9]+', text))
+
+
+def token_grams(token, n=N):
+    """Return the n-grams of a token padded with a leading space, so word starts get their own grams"""
+    padded = ' ' + token
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+def max_edits(word):
+    """Edits tolerated for a query word: none for short words, then one, then two"""
+    if len(word) < 4:
+        return 0
+    return 1 if len(word) < 8 else 2
+
+
+def prefix_distance(word, token, limit):
+    """Return the edit distance between word and the closest prefix of token, or None past limit"""
+    previous = list(range(len(token) + 1))
+    for i, char in enumerate(word, start=1):
+        current = [i]
+        for j, other in enumerate(token, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        if min(current) > limit:
+            return None
+        previous = current
+    distance = min(previous)
+    return distance if distance <= limit else None
+
+
+def _delta_encode(ids):
+    out, last = [], 0
+    for value in ids:
+        out.append(value - last)
+        last = value
+    return out
+
+
+def _delta_decode(deltas):
+    out, last = [], 0
+    for value in deltas:
+        last += value
+        out.append(last)
+    return out
+
+
+class SearchIndex:
+    """Typo-tolerant search over school, district, region and class names
+
+    Entry names are split into normalized word tokens. An n-gram index over
+    the token vocabulary finds the tokens containing each query word (and
+    candidate tokens for fuzzy matching via the q-gram count filter), and a
+    posting list per token maps tokens back to entries. Every query word must
+    match some token of an entry; entries rank by match quality, then name.
+    """
+
+    def __init__(self, entries, tokens, postings, grams, n=N):
+        self.entries = entries
+        self.tokens = tokens
+        self.postings = postings
+        self.grams = grams
+        self.n = n
+
+    @classmethod
+    def build(cls, entries, n=N):
+        """Index (kind, name) pairs"""
+        entries = sorted(set(entries), key=lambda entry: (KINDS.index(entry[0]), entry[1]))
+        token_entries = defaultdict(set)
+        for entry_id, (_, name) in enumerate(entries):
+            for token in normalize(name).split():
+                token_entries[token].add(entry_id)
+
+        tokens = sorted(token_entries)
+        grams = defaultdict(list)
+        for token_id, token in enumerate(tokens):
+            for gram in token_grams(token, n):
+                grams[gram].append(token_id)
+        postings = [sorted(token_entries[token]) for token in tokens]
+        return cls(entries, tokens, postings, dict(sorted(grams.items())), n)
+
+    @classmethod
+    def from_lookup(cls, lookup):
+        """Index every school in a school lookup along with its district, region and class"""
+        entries = []
+        for name, school in lookup.items():
+            entries.append(('school', name))
+            for kind in ('district', 'region', 'class'):
+                if school.get(kind):
+                    entries.append((kind, school[kind]))
+        return cls.build(entries)
+
+    def to_json(self):
+        """Serialize to the compact form the client loads; id lists are delta encoded"""
+        return {
+            'version': VERSION,
+            'n': self.n,
+            'kinds': KINDS,
+            'entries': [[KINDS.index(kind), name] for kind, name in self.entries],
+            'tokens': self.tokens,
+            'postings': [_delta_encode(ids) for ids in self.postings],
+            'grams': {gram: _delta_encode(ids) for gram, ids in self.grams.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        if data.get('version') != VERSION:
+            raise ValueError(f"Unsupported search index version: {data.get('version')}")
+        kinds = data['kinds']
+        return cls([(kinds[kind], name) for kind, name in data['entries']], data['tokens'],
+                   [_delta_decode(ids) for ids in data['postings']],
+                   {gram: _delta_decode(ids) for gram, ids in data['grams'].items()}, data['n'])
+
+    def save(self, path=SEARCH_INDEX_FILE):
+        content = json.dumps(self.to_json(), separators=(',', ':')).encode('utf-8')
+        write_atomic(path, content)
+        return len(content)
+
+    @classmethod
+    def load(cls, path=SEARCH_INDEX_FILE):
+        with open(path, 'r') as f:
+            return cls.from_json(json.load(f))
+
+    def _substring_tokens(self, word):
+        """Return the ids of tokens containing word"""
+        if len(word) >= self.n:
+            candidates = None
+            for i in range(len(word) - self.n + 1):
+                ids = self.grams.get(word[i:i + self.n])
+                if not ids:
+                    return set()
+                candidates = set(ids) if candidates is None else candidates & set(ids)
+        else:
+            # Too short for a full gram: take every token of every gram containing it
+            candidates = {token_id for gram, ids in self.grams.items() if word in gram for token_id in ids}
+        return {token_id for token_id in candidates if word in self.tokens[token_id]}
+
+    def _fuzzy_tokens(self, word):
+        """Return {token id: edit distance} for tokens with a prefix within max_edits(word) of word"""
+        limit = max_edits(word)
+        query_grams = token_grams(word, self.n)
+        if not limit:
+            return {}
+        threshold = len(query_grams) - self.n * limit
+        if threshold < 1:
+            # Too few grams to filter on: check every token, the bounded distance exits early
+            candidates = range(len(self.tokens))
+        else:
+            shared = defaultdict(int)
+            for gram in query_grams:
+                for token_id in self.grams.get(gram, ()):
+                    shared[token_id] += 1
+            candidates = [token_id for token_id, count in shared.items() if count >= threshold]
+        matches = {}
+        for token_id in candidates:
+            distance = prefix_distance(word, self.tokens[token_id], limit)
+            if distance is not None:
+                matches[token_id] = distance
+        return matches
+
+    def word_scores(self, word, fuzzy=True):
+        """Return {entry id: best match score} for one normalized query word"""
+        token_scores = {}
+        for token_id in self._substring_tokens(word):
+            token_scores[token_id] = PREFIX if self.tokens[token_id].startswith(word) else SUBSTRING
+        if fuzzy:
+            for token_id, distance in self._fuzzy_tokens(word).items():
+                token_scores.setdefault(token_id, FUZZY + distance)
+
+        scores = {}
+        for token_id, score in token_scores.items():
+            for entry_id in self.postings[token_id]:
+                if score < scores.get(entry_id, score + 1):
+                    scores[entry_id] = score
+        return scores
+
+    def search(self, query, limit=10, kinds=None, fuzzy=True):
+        """Return up to limit matches as dicts with kind, name and score (lower is better)"""
+        words = normalize(query).split()
+        if not words:
+            return []
+
+        totals = None
+        for word in words:
+            scores = self.word_scores(word, fuzzy)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {entry_id: totals[entry_id] + score for entry_id, score in scores.items()
+                          if entry_id in totals}
+            if not totals:
+                return []
+
+        # Names that start with the whole query rank first among equal scores
+        phrase = ' '.join(words)
+        results = []
+        for entry_id, score in totals.items():
+            kind, name = self.entries[entry_id]
+            if kinds is None or kind in kinds:
+                results.append({'kind': kind, 'name': name, 'score': score})
+        results.sort(key=lambda result: (result['score'], not normalize(result['name']).startswith(phrase),
+                                         result['name']))
+        return results[:limit] if limit else results
+
+
+def build_search_index(lookup_file=LOOKUP_FILE, output_file=SEARCH_INDEX_FILE):
+    """Build the search index from the school lookup and save it for the client"""
+    with open(lookup_file, 'r') as f:
+        lookup = json.load(f)
+    index = SearchIndex.from_lookup(lookup)
+    size = index.save(output_file)
+    print(f"Indexed {len(index.entries)} names ({len(index.tokens)} tokens, {len(index.grams)} grams) "
+          f"into {output_file}: {size / 1024:.1f} KB")
+    return index
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or query the school search index")
+    parser.add_argument('query', nargs='*', help="search the saved index instead of building it")
+    parser.add_argument('--lookup', default=LOOKUP_FILE)
+    parser.add_argument('--index', default=SEARCH_INDEX_FILE)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--exact', action='store_true', help="disable typo-tolerant matching")
+    args = parser.parse_args()
+
+    if args.query:
+        for result in SearchIndex.load(args.index).search(' '.join(args.query), args.limit, fuzzy=not args.exact):
+            print(f"{result['score']}  {result['kind']:<8}  {result['name']}")
+    else:
+        print("=== Building Search Index ===")
+        build_search_index(args.lookup, args.index)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from geojson_stream import write_atomic
+from optimize_payloads import PRECISION, empty_report, round_geometry
+from spatial import load_polygon_directory, ring_area
+from topology import Topology
+
+OUTPUT_DIR = "dist/data/boundaries"
+LAYERS = {
+    'regions': ("../geojson/vhsl_regions", "Region *.geojson"),
+    'states': ("../geojson/states", "*.geojson"),
+}
+# (name, min zoom, max zoom, tolerance in degrees); tolerance 0 keeps full detail
+LEVELS = [
+    ('z0-5', 0, 5, 0.02),
+    ('z6-7', 6, 7, 0.005),
+    ('z8-9', 8, 9, 0.001),
+    ('z10', 10, 22, 0.0),
+]
+
+
+def douglas_peucker(points, tolerance):
+    """Return a boolean mask of the vertices Douglas-Peucker keeps for one open polyline
+
+    The recursion runs on an explicit stack; each step measures the distance
+    of a whole span of vertices to its chord in one NumPy operation.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    count = len(points)
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    if count < 3 or tolerance <= 0:
+        keep[:] = True
+        return keep
+
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        span = points[first + 1:last]
+        chord = end - start
+        length = np.hypot(chord[0], chord[1])
+        if length == 0:
+            distances = np.hypot(span[:, 0] - start[0], span[:, 1] - start[1])
+        else:
+            distances = np.abs(chord[0] * (span[:, 1] - start[1]) - chord[1] * (span[:, 0] - start[0])) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def simplify_arc(arc, tolerance):
+    """Simplify one arc, keeping its end points; closed arcs keep at least a triangle"""
+    points = np.asarray(arc, dtype=np.float64)
+    if tolerance <= 0 or len(points) < 3:
+        return [tuple(p) for p in points]
+    if tuple(points[0]) == tuple(points[-1]):
+        # Split a closed arc at its farthest vertex so both halves have a chord
+        far = int(np.argmax(np.hypot(points[:, 0] - points[0, 0], points[:, 1] - points[0, 1])))
+        keep = np.concatenate([douglas_peucker(points[:far + 1], tolerance)[:-1],
+                               douglas_peucker(points[far:], tolerance)])
+    else:
+        keep = douglas_peucker(points, tolerance)
+    return [tuple(p) for p in points[keep]]
+
+
+def _valid_ring(ring):
+    return len(set(map(tuple, ring))) >= 3 and ring_area(ring) != 0
+
+
+def simplify_layer(geometries, tolerance):
+    """Simplify every geometry of a layer so that shared borders stay shared
+
+    Borders are simplified once per arc, so neighbours never open gaps or
+    overlaps between them. Rings that collapse below a triangle are dropped
+    (with their holes when the outer ring goes); a geometry that would lose
+    every part keeps its largest part at full detail. Returns the simplified
+    geometries and the number of rings dropped.
+    """
+    topology = Topology(geometries)
+    arcs = [simplify_arc(arc, tolerance) for arc in topology.arcs]
+
+    simplified = {}
+    dropped = 0
+    for name in topology.names:
+        original = topology.geometry(name)['coordinates']
+        parts = []
+        for part in topology.geometry(name, arcs)['coordinates']:
+            if not part or not _valid_ring(part[0]):
+                dropped += len(part)
+                continue
+            holes = [ring for ring in part[1:] if _valid_ring(ring)]
+            dropped += len(part) - 1 - len(holes)
+            parts.append([part[0]] + holes)
+        if not parts and original:
+            parts = [max(original, key=lambda part: abs(ring_area(part[0])))]
+        simplified[name] = {"type": "MultiPolygon", "coordinates": parts}
+    return simplified, dropped
+
+
+def _count_vertices(geometry):
+    return sum(len(ring) for part in geometry['coordinates'] for ring in part)
+
+
+def build_boundaries(output_dir=OUTPUT_DIR, layers=None, levels=LEVELS, precision=PRECISION):
+    """Write every layer at every simplification level plus a manifest mapping zoom ranges to files
+
+    Coordinates are rounded to precision decimal places on the way out;
+    rings that rounding collapses are repaired and counted with the dropped ones.
+    """
+    output_dir = Path(output_dir)
+    layers = layers or LAYERS
+    manifest = {"levels": [{"name": name, "min_zoom": min_zoom, "max_zoom": max_zoom, "tolerance": tolerance}
+                           for name, min_zoom, max_zoom, tolerance in levels],
+                "layers": {}}
+
+    for layer, (directory, pattern) in layers.items():
+        geometries = load_polygon_directory(directory, pattern)
+        full_vertices = sum(_count_vertices(g) for g in geometries.values())
+        print(f"{layer}: {len(geometries)} geometries, {full_vertices} vertices")
+        manifest["layers"][layer] = {}
+
+        for name, min_zoom, max_zoom, tolerance in levels:
+            simplified, dropped = simplify_layer(geometries, tolerance)
+            report = empty_report()
+            simplified = {geometry_name: round_geometry(geometry, precision, report)
+                          for geometry_name, geometry in simplified.items()}
+            dropped += report['collapsed_rings']
+            total_bytes = 0
+            files = {}
+            for geometry_name, geometry in simplified.items():
+                relative = f"{layer}/{name}/{geometry_name}.geojson"
+                content = json.dumps(geometry, separators=(',', ':')).encode('utf-8')
+                write_atomic(output_dir / relative, content)
+                files[geometry_name] = relative
+                total_bytes += len(content)
+            manifest["layers"][layer][name] = files
+
+            vertices = sum(_count_vertices(g) for g in simplified.values())
+            print(f"  {name} (zoom {min_zoom}-{max_zoom}, tolerance {tolerance}): "
+                  f"{vertices} vertices, {total_bytes / 1024:.0f} KB, {dropped} rings dropped")
+
+    write_atomic(output_dir / "manifest.json", json.dumps(manifest, indent=2).encode('utf-8'))
+    print(f"Manifest saved to {output_dir / 'manifest.json'}")
+    return manifest
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build multi-resolution region and state boundaries")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    parser.add_argument('--layer', action='append', choices=sorted(LAYERS), help="layers to build (default: all)")
+    parser.add_argument('--precision', type=int, default=PRECISION,
+                        help=f"decimal places kept in coordinates (default {PRECISION})")
+    args = parser.parse_args()
+
+    print("=== Building Simplified Boundaries ===")
+    build_boundaries(args.output_dir, {name: LAYERS[name] for name in args.layer} if args.layer else None,
+                     precision=args.precision)
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import sys
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from associations import DEFAULT_ASSOCIATION, load_associations
+from geojson_stream import write_atomic
+from nearest import haversine_km
+from pipeline import derive_outputs, serialize_output
+from schema import load
+from school_index import load_region_collections, region_class
+
+PATCH_FILE = "data/snapshot_patch.json"
+PATCH_VERSION = 1
+FIELDS = ('class', 'region', 'district', 'coordinates')
+HASH_MODULUS = 1 << 64
+
+
+def _school(class_num, region, district, coordinates):
+    coordinates = coordinates or []
+    return {
+        'class': str(class_num or ''),
+        'region': region or '',
+        'district': district or '',
+        'coordinates': list(coordinates),
+    }
+
+
+def snapshot_from_regions(regions):
+    """{name: school} from region FeatureCollections keyed by region name; the first listing wins"""
+    schools = {}
+    for region_name, data in regions.items():
+        class_num = region_class(region_name)
+        for feature in data.get('features', []):
+            properties = feature.get('properties') or {}
+            name = properties.get('name')
+            if name and name not in schools:
+                coordinates = (feature.get('geometry') or {}).get('coordinates')
+                schools[name] = _school(class_num, region_name, properties.get('district'), coordinates)
+    return schools
+
+
+def snapshot_from_features(features):
+    """{name: school} from all_schools.geojson features, whose region may be the bare "Region B" plus a size"""
+    schools = {}
+    for feature in features:
+        properties = feature.get('properties') or {}
+        name = properties.get('name')
+        if not name or name in schools:
+            continue
+        region = properties.get('region') or ''
+        size = str(properties.get('size') or '')
+        if not region_class(region) and size and ' ' in region:
+            region = f"Region {size}{region.split(' ')[1]}"
+        coordinates = (feature.get('geometry') or {}).get('coordinates')
+        schools[name] = _school(region_class(region) or size, region, properties.get('district'), coordinates)
+    return schools
+
+
+def snapshot_from_mapping(mapping):
+    """{name: school} from the data of school_mapping.json"""
+    return {name: _school(info.get('class'), info.get('region'),
+                          '' if info.get('district') == 'Unknown' else info.get('district'), info.get('coordinates'))
+            for name, info in mapping['school_mapping'].items()}
+
+
+def load_snapshot(path):
+    """Read a snapshot from a schools_by_region directory, a GeoJSON file or school_mapping.json
+
+    Schools keep the order the region files list them in, which is also
+    the order of the derived files, so every source gives the same order.
+    """
+    path = Path(path)
+    if path.is_dir():
+        return snapshot_from_regions(load_region_collections(path))
+    data = load(path)
+    if 'school_mapping' in data:
+        return snapshot_from_mapping(data)
+    return snapshot_from_features(data.get('features', []))
+
+
+def school_hash(name, school):
+    """A 64-bit hash of a school's name and every diffed field, coordinates at full precision"""
+    key = '\x1f'.join((name, school['class'], school['region'], school['district'],
+                       ','.join(repr(float(v)) for v in school['coordinates'])))
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def hash_snapshot(schools):
+    """Return ({name: hash}, fingerprint); the fingerprint is the hashes summed, so order does not matter"""
+    hashes = {name: school_hash(name, school) for name, school in schools.items()}
+    return hashes, f"{sum(hashes.values()) % HASH_MODULUS:016x}"
+
+
+def diff_snapshots(old, new, old_hashes=None, new_hashes=None):
+    """Return a patch turning snapshot old into new, in one pass over each
+
+    Schools whose hashes agree are skipped without looking at their
+    fields, so the cost is one hash per school plus field comparisons for
+    the ones that changed. Hashes computed earlier (when diffing a series
+    of snapshots) can be passed in as (hashes, fingerprint) to skip
+    rehashing. Ops are ["add", name, school], ["remove", name] and
+    ["set", name, {changed fields}]. When the new order is not simply the
+    old one with removals dropped and additions appended (schools moved
+    between region files), the patch also carries the full name order.
+    """
+    old_hashes, base = old_hashes or hash_snapshot(old)
+    new_hashes, target = new_hashes or hash_snapshot(new)
+    ops = []
+    for name, digest in new_hashes.items():
+        before = old_hashes.get(name)
+        if before is None:
+            ops.append(['add', name, new[name]])
+        elif before != digest:
+            changes = {field: new[name][field] for field in FIELDS if new[name][field] != old[name][field]}
+            ops.append(['set', name, changes])
+    for name in old_hashes:
+        if name not in new_hashes:
+            ops.append(['remove', name])
+    patch = {'version': PATCH_VERSION, 'base': base, 'target': target, 'ops': ops}
+    order = list(new_hashes)
+    if order != _patched_order(old_hashes, ops):
+        patch['order'] = order
+    return patch
+
+
+def _patched_order(names, ops):
+    """The name order applying ops gives when the patch carries no order of its own"""
+    removed = {op[1] for op in ops if op[0] == 'remove'}
+    return [name for name in names if name not in removed] + [op[1] for op in ops if op[0] == 'add']
+
+
+def summarize(old, patch):
+    """Aggregate a patch into counts of added, removed and changed schools and the moves between groups"""
+    moves = {field: Counter() for field in ('class', 'region', 'district')}
+    fields = Counter()
+    flows = {}
+    moved = []
+    counts = Counter(op[0] for op in patch['ops'])
+    for op in patch['ops']:
+        if op[0] != 'set':
+            continue
+        name, changes = op[1], op[2]
+        fields.update(changes.keys())
+        for field in moves:
+            if field in changes:
+                moves[field][f"{old[name][field] or '(none)'} -> {changes[field] or '(none)'}"] += 1
+        if 'region' in changes:
+            flows.setdefault(old[name]['region'], Counter())['out'] += 1
+            flows.setdefault(changes['region'], Counter())['in'] += 1
+        if 'coordinates' in changes and old[name]['coordinates'] and changes['coordinates']:
+            moved.append(old[name]['coordinates'][:2] + changes['coordinates'][:2])
+
+    distances = haversine_km(*np.array(moved, dtype=np.float64).T) if moved else np.zeros(0)
+    return {
+        'before': len(old),
+        'after': len(old) + counts['add'] - counts['remove'],
+        'added': counts['add'],
+        'removed': counts['remove'],
+        'changed': counts['set'],
+        'fields': dict(fields),
+        'class_moves': dict(moves['class'].most_common()),
+        'region_moves': dict(moves['region'].most_common()),
+        'district_moves': dict(moves['district'].most_common()),
+        'region_flows': {region: dict(flow) for region, flow in sorted(flows.items())},
+        'relocated': {
+            'schools': len(moved),
+            'median_km': round(float(np.median(distances)), 3) if moved else 0.0,
+            'max_km': round(float(distances.max()), 3) if moved else 0.0,
+        },
+    }
+
+
+def apply_patch(schools, patch):
+    """Apply a patch to a snapshot in place, refusing one made against a different base"""
+    _, fingerprint = hash_snapshot(schools)
+    if fingerprint != patch['base']:
+        raise ValueError(f"Patch base {patch['base']} does not match the snapshot ({fingerprint})")
+    for op in patch['ops']:
+        if op[0] == 'add':
+            schools[op[1]] = dict(op[2])
+        elif op[0] == 'remove':
+            del schools[op[1]]
+        else:
+            schools[op[1]].update(op[2])
+    if 'order' in patch:
+        ordered = {name: schools[name] for name in patch['order']}
+        schools.clear()
+        schools.update(ordered)
+    return schools
+
+
+def _bucket_move(bucket, key, name, new_key):
+    if key is not None and name in bucket.get(key, ()):
+        bucket[key].remove(name)
+        if not bucket[key]:
+            del bucket[key]
+    if new_key is not None:
+        bucket[new_key] = sorted(set(bucket.get(new_key, [])) | {name})
+
+
+def apply_to_outputs(outputs, patch):
+    """Apply a patch to the derived outputs incremental_build keeps, touching only the schools it names
+
+    outputs holds the loaded school_lookup, school_mapping, compiled_schools
+    and all_schools documents, and the patch must have been made against
+    the snapshot they describe (checked through school_mapping). Entries
+    are written in the shapes and the order the pipeline gives them, so
+    the result matches a rebuild from the new region files; the patched
+    school_mapping is checked against the patch's target fingerprint.
+    """
+    mapping = outputs['school_mapping']['school_mapping']
+    _, fingerprint = hash_snapshot(snapshot_from_mapping(outputs['school_mapping']))
+    if fingerprint != patch['base']:
+        raise ValueError(f"Patch base {patch['base']} does not match the outputs ({fingerprint})")
+    lookup = outputs['school_lookup']
+    compiled = outputs['compiled_schools']
+    features = {feature['properties']['name']: feature for feature in outputs['all_schools']['features']}
+    all_names = set(compiled['all_schools'])
+
+    for op in patch['ops']:
+        name = op[1]
+        before = mapping.get(name)
+        if op[0] == 'remove':
+            after = None
+        elif op[0] == 'add':
+            after = {'class': op[2]['class'], 'region': op[2]['region'],
+                     'district': op[2]['district'] or 'Unknown', 'coordinates': op[2]['coordinates']}
+        else:
+            changes = dict(op[2])
+            if 'district' in changes:
+                changes['district'] = changes['district'] or 'Unknown'
+            after = {**before, **changes}
+        for bucket, field in (('by_class', 'class'), ('by_region', 'region'), ('by_district', 'district')):
+            old_key = before[field] if before else None
+            new_key = after[field] if after else None
+            if old_key != new_key:
+                _bucket_move(compiled[bucket], old_key, name, new_key)
+
+        if after is None:
+            lookup.pop(name, None)
+            mapping.pop(name, None)
+            features.pop(name, None)
+            all_names.discard(name)
+            continue
+        district = '' if after['district'] == 'Unknown' else after['district']
+        mapping[name] = after
+        lookup[name] = {'name': name, 'size': after['class'], 'class': f"Class {after['class']}",
+                        'region': after['region'], 'district': district}
+        if name not in features:
+            # The properties the pipeline gives a region file feature (verify_outputs ignores key order)
+            properties = {'name': name, 'size': after['class'], 'region': after['region']}
+            if district:
+                properties['district'] = district
+            features[name] = {'id': None, 'type': 'Feature', 'geometry': None, 'properties': properties}
+        feature = features[name]
+        feature['properties'].update({'size': after['class'], 'region': after['region'],
+                                      'class': f"Class {after['class']}"})
+        if district or 'district' in feature['properties']:
+            feature['properties']['district'] = district
+        feature['geometry'] = {'type': 'Point', 'coordinates': after['coordinates']} if after['coordinates'] else None
+        all_names.add(name)
+
+    compiled['all_schools'] = sorted(all_names)
+    for bucket in ('by_class', 'by_region', 'by_district'):
+        compiled[bucket] = dict(sorted(compiled[bucket].items()))
+    order = patch.get('order') or list(mapping)
+    outputs['school_lookup'] = {name: lookup[name] for name in order}
+    outputs['school_mapping']['school_mapping'] = {name: mapping[name] for name in order}
+    outputs['all_schools']['features'] = [features[name] for name in order]
+    for feature_id, feature in enumerate(outputs['all_schools']['features'], start=1):
+        feature['id'] = feature_id
+
+    _, fingerprint = hash_snapshot(snapshot_from_mapping(outputs['school_mapping']))
+    if fingerprint != patch['target']:
+        raise ValueError(f"Patched outputs ({fingerprint}) do not match the patch target {patch['target']}")
+    return outputs
+
+
+def verify_outputs(outputs, input_dir, association):
+    """List the outputs that differ from a full rebuild of the association's region files in input_dir
+
+    The parsed documents are compared rather than their bytes: a feature the
+    patch adds cannot know the key order its source file lists it in, and
+    key order carries no meaning in JSON.
+    """
+    names = set(association.region_names)
+    regions = {name: data for name, data in load_region_collections(input_dir).items() if name in names}
+    rebuilt = derive_outputs(regions, association)
+    return [key for key in rebuilt if json.loads(serialize_output(key, rebuilt[key])) != outputs[key]]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Diff school snapshots and write a patch for derived files")
+    parser.add_argument('snapshots', nargs='+',
+                        help="two or more schools_by_region directories, all_schools.geojson or school_mapping.json files, oldest first")
+    parser.add_argument('--patch', default=PATCH_FILE, help=f"where to save the last patch (default {PATCH_FILE})")
+    parser.add_argument('--apply', action='store_true', help="apply the last patch to the derived outputs (the next incremental_build run then rebuilds in full)")
+    parser.add_argument('--verify', action='store_true',
+                        help="with --apply, check the patched outputs against a full rebuild of the last snapshot directory")
+    parser.add_argument('--limit', type=int, default=10, help="moves listed per summary")
+    parser.add_argument('--association', default=DEFAULT_ASSOCIATION, help="association whose outputs --apply patches")
+    args = parser.parse_args()
+    if len(args.snapshots) < 2:
+        parser.error("need at least two snapshots")
+
+    print("=== Snapshot Diff ===")
+    previous = load_snapshot(args.snapshots[0])
+    previous_hashes = hash_snapshot(previous)
+    for path in args.snapshots[1:]:
+        current = load_snapshot(path)
+        current_hashes = hash_snapshot(current)
+        patch = diff_snapshots(previous, current, previous_hashes, current_hashes)
+        summary = summarize(previous, patch)
+        print(f"\n{path}: {summary['before']} -> {summary['after']} schools, +{summary['added']} "
+              f"-{summary['removed']} ~{summary['changed']} ({patch['base']} -> {patch['target']})")
+        for field in ('class_moves', 'region_moves', 'district_moves'):
+            for move, count in list(summary[field].items())[:args.limit]:
+                print(f"  {field.split('_')[0]:<8} {move}: {count}")
+        if summary['relocated']['schools']:
+            print(f"  relocated {summary['relocated']['schools']} schools, median "
+                  f"{summary['relocated']['median_km']} km, max {summary['relocated']['max_km']} km")
+        previous, previous_hashes = current, current_hashes
+
+    write_atomic(args.patch, json.dumps({**patch, 'summary': summary}, separators=(',', ':')).encode('utf-8'))
+    print(f"\nPatch of {len(patch['ops'])} ops saved to {args.patch}")
+
+    if args.apply:
+        association = load_associations()[args.association]
+        output_paths = association.output_paths()
+        outputs = {}
+        for key, path in output_paths.items():
+            with open(path, 'r') as f:
+                outputs[key] = json.load(f)
+        apply_to_outputs(outputs, patch)
+        if args.verify and Path(args.snapshots[-1]).is_dir():
+            mismatched = verify_outputs(outputs, args.snapshots[-1], association)
+            if mismatched:
+                print(f"Patched outputs differ from a full rebuild: {', '.join(mismatched)}; nothing written")
+                sys.exit(1)
+            print("Patched outputs match a full rebuild")
+        for key, path in output_paths.items():
+            write_atomic(path, serialize_output(key, outputs[key]))
+        print(f"Applied to {', '.join(str(path) for path in output_paths.values())}")
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+
+import json
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+REGION_POLYGONS_DIR = "../geojson/vhsl_regions"
+NODE_CAPACITY = 16
+MAX_CELLS = 1 << 20  # points x edges evaluated per ray-casting chunk
+
+
+def polygon_parts(geometry):
+    """Return the polygons of a Polygon or MultiPolygon, each a list of coordinate rings"""
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    raise ValueError(f"Unsupported geometry type: {geometry['type']}")
+
+
+def polygon_rings(geometry):
+    """Yield every ring of a Polygon or MultiPolygon as an (n, 2) float array"""
+    for polygon in polygon_parts(geometry):
+        for ring in polygon:
+            if len(ring) >= 3:
+                yield np.asarray(ring, dtype=np.float64)[:, :2]
+
+
+def ring_area(ring):
+    """Signed area of a closed ring by the shoelace formula; positive when counter-clockwise"""
+    points = np.asarray(ring, dtype=np.float64)
+    x, y = points[:, 0], points[:, 1]
+    return 0.5 * float(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]))
+
+
+def load_polygon_layer(path, name_property='name'):
+    """Load named polygons from a GeoJSON file
+
+    A bare geometry (like the files in geojson/vhsl_regions) is named after
+    the file; a FeatureCollection contributes one polygon per feature, named
+    by name_property.
+    """
+    path = Path(path)
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if data.get('type') == 'FeatureCollection':
+        return {feature['properties'][name_property]: feature['geometry']
+                for feature in data['features'] if feature.get('geometry')}
+    if data.get('type') == 'Feature':
+        return {data.get('properties', {}).get(name_property, path.stem): data['geometry']}
+    return {path.stem: data}
+
+
+def load_polygon_directory(directory=REGION_POLYGONS_DIR, pattern="Region *.geojson"):
+    polygons = {}
+    for file_path in sorted(Path(directory).glob(pattern)):
+        polygons.update(load_polygon_layer(file_path))
+    return polygons
+
+
+class STRtree:
+    """Sort-Tile-Recursive packed R-tree over axis-aligned boxes
+
+    Boxes are (minx, miny, maxx, maxy) rows. Queries take arrays of points and
+    walk the tree level by level with vectorized box tests, returning the
+    (point, box) pairs whose box contains the point.
+    """
+
+    def __init__(self, boxes, node_capacity=NODE_CAPACITY):
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.node_capacity = node_capacity
+        self.levels = []
+
+        # Each level is (node boxes, child start offsets); level 0 points at the input boxes
+        items = np.arange(len(self.boxes))
+        boxes = self.boxes
+        while True:
+            order = self._str_order(boxes)
+            groups = [order[i:i + node_capacity] for i in range(0, len(order), node_capacity)]
+            node_boxes = np.array([[boxes[g, 0].min(), boxes[g, 1].min(), boxes[g, 2].max(), boxes[g, 3].max()]
+                                   for g in groups]) if groups else np.empty((0, 4))
+            self.levels.append((node_boxes, [items[g] for g in groups]))
+            if len(groups) <= 1:
+                break
+            boxes = node_boxes
+            items = np.arange(len(groups))
+
+    def _str_order(self, boxes):
+        """Order boxes into vertical slices by center x, then by center y within each slice"""
+        count = len(boxes)
+        if count == 0:
+            return np.empty(0, dtype=np.intp)
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        leaves = -(-count // self.node_capacity)
+        slices = int(np.ceil(np.sqrt(leaves)))
+        slice_size = slices * self.node_capacity
+        by_x = np.argsort(centers[:, 0], kind='stable')
+        order = []
+        for start in range(0, count, slice_size):
+            chunk = by_x[start:start + slice_size]
+            order.append(chunk[np.argsort(centers[chunk, 1], kind='stable')])
+        return np.concatenate(order)
+
+    def query_points(self, xs, ys):
+        """Return (point indices, box indices) for every box containing each point"""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        point_hits, box_hits = [], []
+        if not len(self.boxes):
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+        # Start at the root: every point is a candidate for every root child
+        top = len(self.levels) - 1
+        frontier = [(top, child, np.arange(len(xs))) for child in self.levels[top][1][0]]
+        while frontier:
+            level, node, points = frontier.pop()
+            box = self.levels[level - 1][0][node] if level else self.boxes[node]
+            inside = points[(xs[points] >= box[0]) & (xs[points] <= box[2]) &
+                            (ys[points] >= box[1]) & (ys[points] <= box[3])]
+            if not len(inside):
+                continue
+            if level == 0:
+                point_hits.append(inside)
+                box_hits.append(np.full(len(inside), node, dtype=np.intp))
+            else:
+                for child in self.levels[level - 1][1][node]:
+                    frontier.append((level - 1, child, inside))
+
+        if not point_hits:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        return np.concatenate(point_hits), np.concatenate(box_hits)
+
+
+def ray_crossings(xs, ys, ring):
+    """Count, for each point, how many ring edges a ray cast towards +x crosses"""
+    x1, y1 = ring[:-1, 0], ring[:-1, 1]
+    x2, y2 = ring[1:, 0], ring[1:, 1]
+    if not np.array_equal(ring[0], ring[-1]):
+        x1, y1 = np.append(x1, ring[-1, 0]), np.append(y1, ring[-1, 1])
+        x2, y2 = np.append(x2, ring[0, 0]), np.append(y2, ring[0, 1])
+
+    counts = np.zeros(len(xs), dtype=np.int64)
+    step = max(1, MAX_CELLS // max(1, len(x1)))
+    for start in range(0, len(xs), step):
+        px = xs[start:start + step, None]
+        py = ys[start:start + step, None]
+        spans = (y1 > py) != (y2 > py)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+        counts[start:start + step] = np.count_nonzero(spans & (px < x_cross), axis=1)
+    return counts
+
+
+class PolygonIndex:
+    """Batch point-in-polygon over named Polygon/MultiPolygon geometries
+
+    Every ring is indexed by its bounding box in an STR-tree. A query finds
+    candidate (point, ring) pairs through the tree, ray-casts each ring
+    against its candidate points in one vectorized pass, and applies the
+    even-odd rule per polygon, so holes and multi-part polygons need no
+    special casing.
+    """
+
+    def __init__(self, polygons):
+        self.names = list(polygons)
+        self.rings = []
+        self.ring_owner = []
+        for owner, name in enumerate(self.names):
+            for ring in polygon_rings(polygons[name]):
+                self.rings.append(ring)
+                self.ring_owner.append(owner)
+        self.ring_owner = np.asarray(self.ring_owner, dtype=np.intp)
+        boxes = [(r[:, 0].min(), r[:, 1].min(), r[:, 0].max(), r[:, 1].max()) for r in self.rings]
+        self.tree = STRtree(boxes)
+
+    @classmethod
+    def from_directory(cls, directory=REGION_POLYGONS_DIR, pattern="Region *.geojson"):
+        return cls(load_polygon_directory(directory, pattern))
+
+    def contains(self, xs, ys):
+        """Return a boolean (points x polygons) matrix of containment"""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        parity = np.zeros((len(xs), len(self.names)), dtype=np.int64)
+        point_idx, ring_idx = self.tree.query_points(xs, ys)
+        if len(ring_idx):
+            order = np.argsort(ring_idx, kind='stable')
+            point_idx, ring_idx = point_idx[order], ring_idx[order]
+            splits = np.flatnonzero(np.diff(ring_idx)) + 1
+            for points, rings in zip(np.split(point_idx, splits), np.split(ring_idx, splits)):
+                ring = rings[0]
+                crossings = ray_crossings(xs[points], ys[points], self.rings[ring])
+                parity[points, self.ring_owner[ring]] += crossings
+        return (parity % 2) == 1
+
+    def locate(self, xs, ys, candidates=None):
+        """Return, for each point, the names of the polygons containing it
+
+        candidates optionally restricts each point to a collection of names
+        (for example the four regions of a school's class).
+        """
+        inside = self.contains(xs, ys)
+        results = []
+        for row, point in enumerate(inside):
+            names = [self.names[i] for i in np.flatnonzero(point)]
+            if candidates is not None and candidates[row] is not None:
+                allowed = candidates[row]
+                names = [name for name in names if name in allowed]
+            results.append(names)
+        return results
+
+
+def class_regions(names):
+    """Group region polygon names by class ("Region 3B" -> "3"); letter-only regions go under ''"""
+    groups = defaultdict(set)
+    for name in names:
+        code = name.split(' ')[1] if ' ' in name else ''
+        groups[code[0] if code[:1].isdigit() else ''].add(name)
+    return groups
+
+
+def verify_school_regions(index, region_polygons, counties=None):
+    """Check every school against the region polygons (and county polygons) in one batch pass
+
+    Returns a list of result dicts with the region the school is listed in,
+    the regions of its class whose polygon contains it, and its county.
+    """
+    schools = list(index)
+    located = [s for s in schools if len(s['coordinates']) >= 2]
+    xs = np.array([s['coordinates'][0] for s in located])
+    ys = np.array([s['coordinates'][1] for s in located])
+
+    groups = class_regions(region_polygons.names)
+    found = region_polygons.locate(xs, ys, [groups.get(s['size']) for s in located])
+    county_names = counties.locate(xs, ys) if counties is not None else [[] for _ in located]
+
+    results = []
+    for school, regions, school_counties in zip(located, found, county_names):
+        results.append({
+            'name': school['name'],
+            'listed_region': school['region'],
+            'polygon_regions': regions,
+            'county': school_counties[0] if school_counties else None,
+            'ok': school['region'] in regions,
+        })
+    for school in schools:
+        if len(school['coordinates']) < 2:
+            results.append({'name': school['name'], 'listed_region': school['region'],
+                            'polygon_regions': [], 'county': None, 'ok': False})
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from school_index import REGION_FILES_DIR, SchoolIndex
+
+    parser = argparse.ArgumentParser(description="Verify school regions (and counties) against polygon boundaries")
+    parser.add_argument('--regions-dir', default=REGION_FILES_DIR, help="per-region school GeoJSON files")
+    parser.add_argument('--polygons-dir', default=REGION_POLYGONS_DIR, help="region boundary GeoJSON files")
+    parser.add_argument('--counties', help="county FeatureCollection to assign each school a county")
+    parser.add_argument('--county-property', default='name')
+    parser.add_argument('--output', help="write the per-school results to this JSON file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = SchoolIndex.from_region_files(args.regions_dir)
+    regions = PolygonIndex.from_directory(args.polygons_dir)
+    counties = PolygonIndex(load_polygon_layer(args.counties, args.county_property)) if args.counties else None
+    results = verify_school_regions(index, regions, counties)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    mismatches = [r for r in results if not r['ok']]
+    print(f"Checked {len(results)} schools against {len(regions.names)} region polygons in {elapsed:.1f} ms")
+    for result in mismatches[:20]:
+        found = ', '.join(result['polygon_regions']) or 'no region polygon'
+        print(f"- {result['name']}: listed in {result['listed_region']}, located in {found}")
+    if len(mismatches) > 20:
+        print(f"... and {len(mismatches) - 20} more")
+    if not mismatches:
+        print("✅ Every school lies inside its region polygon")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+import json
+from collections import defaultdict
+
+from spatial import polygon_parts
+
+TOPOLOGY_FILE = "dist/data/boundaries/regions.topojson"
+QUANTIZATION = 100000
+
+
+def _open_ring(ring):
+    """Return a ring's distinct vertices as tuples, without the closing repeat"""
+    points = [tuple(point[:2]) for point in ring]
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    return points
+
+
+def find_junctions(rings):
+    """Return the vertices where shared boundaries start or end
+
+    A vertex is a junction when it is reached from different neighbours in
+    different places, i.e. where two rings stop following the same path.
+    """
+    neighbours = {}
+    junctions = set()
+    for points in rings:
+        count = len(points)
+        for i, point in enumerate(points):
+            pair = frozenset((points[i - 1], points[(i + 1) % count]))
+            seen = neighbours.get(point)
+            if seen is None:
+                neighbours[point] = pair
+            elif seen != pair:
+                junctions.add(point)
+    return junctions
+
+
+class Topology:
+    """Polygons decomposed into shared arcs, TopoJSON style
+
+    Every border between two polygons is stored once as an arc. Polygons are
+    lists of parts, parts are lists of rings, and rings are lists of arc
+    references where ~i means arc i traversed backwards. Arcs are lists of
+    (x, y) tuples that include both end points.
+    """
+
+    def __init__(self, geometries):
+        self.names = list(geometries)
+        self.arcs = []
+        self.objects = {}
+        self._arc_keys = {}
+
+        parts_by_name = {name: [[_open_ring(ring) for ring in polygon] for polygon in polygon_parts(geometries[name])]
+                         for name in self.names}
+        junctions = find_junctions(points for parts in parts_by_name.values()
+                                   for polygon in parts for points in polygon if len(points) >= 3)
+
+        for name, parts in parts_by_name.items():
+            self.objects[name] = [[self._ring_arcs(points, junctions) for points in polygon if len(points) >= 3]
+                                  for polygon in parts]
+
+    def _add_arc(self, points):
+        key = tuple(points)
+        if key in self._arc_keys:
+            return self._arc_keys[key]
+        reverse_key = key[::-1]
+        if reverse_key in self._arc_keys:
+            return ~self._arc_keys[reverse_key]
+        self.arcs.append(list(points))
+        self._arc_keys[key] = len(self.arcs) - 1
+        return len(self.arcs) - 1
+
+    def _ring_arcs(self, points, junctions):
+        cuts = [i for i, point in enumerate(points) if point in junctions]
+        if not cuts:
+            # A ring with no junctions is one closed arc; start it at its smallest
+            # vertex so the same ring shared by two polygons becomes one arc
+            start = points.index(min(points))
+            rotated = points[start:] + points[:start]
+            return [self._add_arc(rotated + [rotated[0]])]
+
+        rotated = points[cuts[0]:] + points[:cuts[0]]
+        offsets = [i - cuts[0] for i in cuts] + [len(points)]
+        rotated.append(rotated[0])
+        return [self._add_arc(rotated[offsets[k]:offsets[k + 1] + 1]) for k in range(len(cuts))]
+
+    def ring_points(self, ring, arcs=None):
+        """Stitch a ring's arc references back into a closed list of points"""
+        arcs = arcs if arcs is not None else self.arcs
+        points = []
+        for ref in ring:
+            arc = arcs[ref] if ref >= 0 else arcs[~ref][::-1]
+            points.extend(arc if not points else arc[1:])
+        return points
+
+    def geometry(self, name, arcs=None):
+        """Rebuild a MultiPolygon geometry from its arcs (optionally a simplified copy of them)"""
+        polygons = []
+        for polygon in self.objects[name]:
+            rings = [[list(point) for point in self.ring_points(ring, arcs)] for ring in polygon]
+            polygons.append(rings)
+        return {"type": "MultiPolygon", "coordinates": polygons}
+
+    def arc_owners(self):
+        """Map every arc index to the names of the geometries whose rings use it"""
+        owners = defaultdict(set)
+        for name, polygons in self.objects.items():
+            for polygon in polygons:
+                for ring in polygon:
+                    for ref in ring:
+                        owners[ref if ref >= 0 else ~ref].add(name)
+        return owners
+
+    def neighbours(self):
+        """Return {name: set of names} for geometries that share at least one arc"""
+        adjacent = {name: set() for name in self.names}
+        for names in self.arc_owners().values():
+            for name in names:
+                adjacent[name] |= names - {name}
+        return adjacent
+
+    def to_topojson(self, objects=None, quantization=QUANTIZATION):
+        """Encode as a TopoJSON Topology with quantized, delta-encoded arcs
+
+        objects maps TopoJSON object names to the geometry names they hold
+        (default: one "regions" object with every geometry). Coordinates are
+        snapped to a quantization x quantization grid over the bounding box;
+        each arc stores its first position and then deltas, dropping points
+        that snap onto their predecessor.
+        """
+        objects = objects or {'regions': self.names}
+        xs = [x for arc in self.arcs for x, _ in arc]
+        ys = [y for arc in self.arcs for _, y in arc]
+        x0, y0, x1, y1 = min(xs), min(ys), max(xs), max(ys)
+        kx = (x1 - x0) / (quantization - 1) or 1
+        ky = (y1 - y0) / (quantization - 1) or 1
+
+        arcs = []
+        for arc in self.arcs:
+            points = [(round((x - x0) / kx), round((y - y0) / ky)) for x, y in arc]
+            deltas = [list(points[0])]
+            last = points[0]
+            for point in points[1:]:
+                if point != last:
+                    deltas.append([point[0] - last[0], point[1] - last[1]])
+                    last = point
+            if len(deltas) == 1:
+                deltas.append([0, 0])
+            arcs.append(deltas)
+
+        return {
+            "type": "Topology",
+            "bbox": [x0, y0, x1, y1],
+            "transform": {"scale": [kx, ky], "translate": [x0, y0]},
+            "objects": {
+                object_name: {
+                    "type": "GeometryCollection",
+                    "geometries": [{"type": "MultiPolygon", "id": name, "arcs": self.objects[name]}
+                                   for name in names],
+                }
+                for object_name, names in objects.items()
+            },
+            "arcs": arcs,
+        }
+
+
+def decode_arcs(topology):
+    """Undo the delta encoding and quantization of a TopoJSON topology's arcs"""
+    transform = topology.get('transform')
+    arcs = []
+    for arc in topology['arcs']:
+        if transform is None:
+            arcs.append([tuple(point[:2]) for point in arc])
+            continue
+        (kx, ky), (dx, dy) = transform['scale'], transform['translate']
+        x = y = 0
+        points = []
+        for delta in arc:
+            x += delta[0]
+            y += delta[1]
+            points.append((x * kx + dx, y * ky + dy))
+        arcs.append(points)
+    return arcs
+
+
+def decode_topojson(topology, object_name=None):
+    """Rebuild {id: MultiPolygon geometry} for one object of a TopoJSON topology (default: the first)"""
+    object_name = object_name or next(iter(topology['objects']))
+    arcs = decode_arcs(topology)
+    stitch = Topology({}).ring_points
+
+    geometries = {}
+    for geometry in topology['objects'][object_name]['geometries']:
+        polygons = geometry['arcs'] if geometry['type'] == 'MultiPolygon' else [geometry['arcs']]
+        geometries[geometry['id']] = {
+            "type": "MultiPolygon",
+            "coordinates": [[[list(point) for point in stitch(ring, arcs)] for ring in polygon]
+                            for polygon in polygons],
+        }
+    return geometries
+
+
+def write_topology(layers, output_file=TOPOLOGY_FILE, quantization=QUANTIZATION):
+    """Build one topology over several polygon layers ({object name: {name: geometry}}) and save it"""
+    from geojson_stream import write_atomic
+
+    geometries = {}
+    for layer in layers.values():
+        geometries.update(layer)
+    topology = Topology(geometries)
+    data = topology.to_topojson({name: list(layer) for name, layer in layers.items()}, quantization)
+    content = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    write_atomic(output_file, content)
+    return topology, len(content)
+
+
+if __name__ == "__main__":
+    import argparse
+    from pathlib import Path
+
+    from simplify_boundaries import LAYERS
+    from spatial import load_polygon_directory
+
+    parser = argparse.ArgumentParser(description="Encode region (and state) boundaries as one TopoJSON file")
+    parser.add_argument('--output', default=TOPOLOGY_FILE)
+    parser.add_argument('--layer', action='append', choices=sorted(LAYERS), help="layers to include (default: regions)")
+    parser.add_argument('--quantization', type=int, default=QUANTIZATION)
+    args = parser.parse_args()
+
+    print("=== Building Boundary Topology ===")
+    layers = {}
+    source_bytes = 0
+    for name in args.layer or ['regions']:
+        directory, pattern = LAYERS[name]
+        layers[name] = load_polygon_directory(directory, pattern)
+        source_bytes += sum(path.stat().st_size for path in Path(directory).glob(pattern))
+
+    topology, size = write_topology(layers, args.output, args.quantization)
+    print(f"{len(topology.names)} geometries, {len(topology.arcs)} arcs")
+    print(f"Wrote {args.output}: {size / 1024:.0f} KB (source files {source_bytes / 1024:.0f} KB)")
@@ -1,37 +1,44 @@
 #!/usr/bin/env python3
 
-import json
 import os
 import glob
 from collections import defaultdict
 
-def load_json_file(file_path):
+from schema import (ClassesFile, District, DistrictsFile, LngLat, MappingEntry, Region, School, SchoolClass,
+                    SchoolMapping, SchoolsFile, SchemaError, dump, load)
+
+def load_json_file(file_path, schema=None):
+    """Load a JSON file, decoding and validating it through schema when one is given"""
     try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
-    except Exception as e:
+        return load(file_path, schema)
+    except (OSError, ValueError) as e:
         print(f"Error loading {file_path}: {str(e)}")
         return None
 
 def save_json_file(file_path, data):
+    """Save records (or plain JSON data) through the schema serializer"""
     try:
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        dump(file_path, data)
         print(f"Successfully saved {file_path}")
         return True
     except Exception as e:
         print(f"Error saving {file_path}: {str(e)}")
         return False
 
-def main():
-    print("Starting application data update...")
-    
-    # Load the school mapping data created by the comparison script
-    school_mapping = load_json_file('data/school_mapping.json')
-    if not school_mapping or 'school_mapping' not in school_mapping:
-        print("Failed to load school mapping data")
-        return
-    
+def decode_school_mapping(data):
+    """Decode school_mapping.json data, skipping (with a warning) schools whose entry does not match the schema"""
+    if type(data) is not dict or type(data.get('school_mapping')) is not dict:
+        return SchoolMapping.decode(data)  # raises the schema error for the document itself
+    school_mapping = SchoolMapping.decode({**data, 'school_mapping': {}})
+    for school_name, entry in data['school_mapping'].items():
+        try:
+            school_mapping.schools[school_name] = MappingEntry.decode(entry)
+        except SchemaError as e:
+            print(f"Warning: Skipping {school_name}: {e}")
+    return school_mapping
+
+def build_application_data(school_mapping, state_name="Virginia"):
+    """Build the schools, classes/regions and districts application data from a decoded SchoolMapping"""
     # Extract school information from GeoJSON files
     schools_by_class = defaultdict(list)
     schools_by_region = defaultdict(list)
@@ -39,30 +46,26 @@ def main():
     all_schools = []
     
     # Process all schools from the mapping
-    for school_name, info in school_mapping['school_mapping'].items():
-        class_num = info['class']
-        region_name = info['region']
-        district = info['district']
-        coordinates = info['coordinates']
+    for school_name, info in school_mapping.schools.items():
+        class_num = info.class_
+        region_name = info.region
+        district = info.district
         
         # Skip if coordinates are missing
-        if not coordinates or len(coordinates) < 2:
+        if info.coordinates is None:
             print(f"Warning: Missing coordinates for {school_name}")
             continue
         
         # Create school entry
-        school_entry = {
-            "name": school_name,
-            "coordinates": {
-                "lng": coordinates[0],
-                "lat": coordinates[1]
-            },
-            "address": f"{school_name}, Virginia",
-            "class": class_num,
-            "region": region_name,
-            "district": district,
-            "synthetic": False
-        }
+        school_entry = School(
+            name=school_name,
+            coordinates=LngLat(lng=info.coordinates[0], lat=info.coordinates[1]),
+            address=f"{school_name}, {state_name}",
+            class_=class_num,
+            region=region_name,
+            district=district,
+            synthetic=False
+        )
         
         all_schools.append(school_entry)
         schools_by_class[class_num].append(school_name)
@@ -70,59 +73,60 @@ def main():
         schools_by_district[district].append(school_name)
     
     # Create updated va_schools_geocodes.json
-    va_schools_data = {
-        "schools": all_schools
-    }
-    save_json_file('data/va_schools_geocodes_updated.json', va_schools_data)
+    va_schools_data = SchoolsFile(schools=all_schools)
     
     # Create updated vhsl_classes_regions.json
-    classes_regions_data = {
-        "classes": []
-    }
+    classes_regions_data = ClassesFile(classes=[])
     
     for class_num in sorted(schools_by_class.keys()):
-        class_entry = {
-            "id": f"class{class_num}",
-            "name": f"Class {class_num}",
-            "regions": []
-        }
+        class_entry = SchoolClass(id=f"class{class_num}", name=f"Class {class_num}")
         
         # Add regions for this class
         for region_name in sorted(schools_by_region.keys()):
             if region_name.startswith(f"Region {class_num}"):
                 region_letter = region_name.split(' ')[1][1]
-                region_entry = {
-                    "id": f"region{class_num}{region_letter}",
-                    "name": region_name
-                }
-                class_entry["regions"].append(region_entry)
+                region_entry = Region(id=f"region{class_num}{region_letter}", name=region_name)
+                class_entry.regions.append(region_entry)
         
-        classes_regions_data["classes"].append(class_entry)
+        classes_regions_data.classes.append(class_entry)
     
-    save_json_file('data/vhsl_classes_regions_updated.json', classes_regions_data)
     
     # Create updated vhsl_districts.json
-    districts_data = {
-        "districts": []
-    }
+    districts_data = DistrictsFile(districts=[])
     
     for district_name in sorted(schools_by_district.keys()):
         if district_name == "Unknown":
             continue
             
-        district_entry = {
-            "id": district_name.lower().replace(' ', '_'),
-            "name": district_name,
-            "schools": schools_by_district[district_name]
-        }
-        districts_data["districts"].append(district_entry)
+        district_entry = District(
+            id=district_name.lower().replace(' ', '_'),
+            name=district_name,
+            schools=schools_by_district[district_name]
+        )
+        districts_data.districts.append(district_entry)
     
+    return va_schools_data, classes_regions_data, districts_data
+
+def main():
+    print("Starting application data update...")
+    
+    # Load the school mapping data created by the comparison script
+    school_mapping = load_json_file('data/school_mapping.json', decode_school_mapping)
+    if not school_mapping:
+        print("Failed to load school mapping data")
+        return
+    
+    va_schools_data, classes_regions_data, districts_data = build_application_data(school_mapping)
+    all_schools = va_schools_data.schools
+    
+    save_json_file('data/va_schools_geocodes_updated.json', va_schools_data)
+    save_json_file('data/vhsl_classes_regions_updated.json', classes_regions_data)
     save_json_file('data/vhsl_districts_updated.json', districts_data)
     
     print("\n=== UPDATE SUMMARY ===")
     print(f"Total schools processed: {len(all_schools)}")
-    print(f"Classes: {len(classes_regions_data['classes'])}")
-    print(f"Districts: {len(districts_data['districts'])}")
+    print(f"Classes: {len(classes_regions_data.classes)}")
+    print(f"Districts: {len(districts_data.districts)}")
     
     print("\nUpdated data files created:")
     print("- data/va_schools_geocodes_updated.json")
@@ -1,37 +1,16 @@
 #!/usr/bin/env python3
 
-import json
-import os
-from collections import defaultdict
+from associations import VHSL
+from school_index import SchoolIndex
 
-def validate_district_region_class():
+def validate_district_region_class(association=VHSL):
     """Validate schools across districts, regions, and classes"""
     
-    # Load the combined GeoJSON file
-    with open('dist/data/geojson/all_schools.geojson', 'r') as f:
-        all_schools_data = json.load(f)
-    
-    # Initialize counters
-    schools_by_class = defaultdict(list)
-    schools_by_region = defaultdict(list)
-    schools_by_district = defaultdict(list)
-    
-    # Collect schools by classification
-    for feature in all_schools_data['features']:
-        props = feature['properties']
-        school_name = props.get('name', 'Unknown')
-        class_num = props.get('size')
-        region = props.get('region')
-        district = props.get('district')
-        
-        if class_num:
-            schools_by_class[class_num].append(school_name)
-        
-        if region:
-            schools_by_region[region].append(school_name)
-        
-        if district:
-            schools_by_district[district].append(school_name)
+    # Load the combined GeoJSON file into an indexed view
+    index = SchoolIndex.from_geojson(association.output_root / "dist" / "data" / "geojson" / "all_schools.geojson")
+    schools_by_class = index.by_class
+    schools_by_region = index.by_region
+    schools_by_district = index.by_district
     
     # Print summary
     print("=== Validation by Classification ===")
@@ -63,15 +42,14 @@ def validate_district_region_class():
         expected_class = region.split(' ')[1][0]
         
         for school_name in schools:
-            # Find the school in the features
-            school_feature = next((f for f in all_schools_data['features'] 
-                                if f['properties'].get('name') == school_name), None)
+            # Find the school in the index
+            school = index.get(school_name)
             
-            if not school_feature:
+            if not school:
                 class_region_issues.append(f"School {school_name} not found in features")
                 continue
                 
-            school_class = school_feature['properties'].get('size')
+            school_class = school['size']
             
             if str(school_class) != str(expected_class):
                 class_region_issues.append(
@@ -90,8 +68,8 @@ def validate_district_region_class():
     # Validate statewide coverage
     print("\n=== Validating Statewide Coverage ===")
     
-    # Check if all expected regions are present (Classes 1-6, Regions A-D)
-    expected_regions = [f"Region {c}{r}" for c in range(1, 7) for r in ['A', 'B', 'C', 'D']]
+    # Check if all expected regions are present (every class and region letter of the association)
+    expected_regions = association.region_names
     missing_regions = [r for r in expected_regions if r not in schools_by_region]
     
     if missing_regions:
@@ -103,7 +81,7 @@ def validate_district_region_class():
     
     # Return validation results
     return {
-        "total_schools": len(all_schools_data['features']),
+        "total_schools": len(index) + len(index.duplicates),
         "classes": len(schools_by_class),
         "regions": len(schools_by_region),
         "districts": len(schools_by_district),
@@ -2,12 +2,13 @@
 
 import json
 import os
-from pathlib import Path
 
-def validate_dataset():
+from associations import VHSL
+
+def validate_dataset(association=VHSL):
     """Validate the complete dataset to ensure all schools are properly included"""
     
-    dist_geojson_dir = Path("/home/ubuntu/vhsl-map-project/dist/data/geojson")
+    dist_geojson_dir = association.output_root / "dist" / "data" / "geojson"
     
     # Check for all region files
     region_files = list(dist_geojson_dir.glob("Region_*.geojson"))
@@ -69,14 +70,14 @@ def validate_dataset():
         print(f"{region}: {len(schools_by_region[region])} schools")
     
     # Verify all classes are represented
-    expected_classes = ['1', '2', '3', '4', '5', '6']
+    expected_classes = [str(c) for c in range(1, association.classes + 1)]
     missing_classes = [c for c in expected_classes if c not in schools_by_class]
     
     if missing_classes:
         print(f"\nWarning: Missing schools for classes: {', '.join(missing_classes)}")
         return False
     else:
-        print("\nAll classes (1-6) are represented in the dataset")
+        print(f"\nAll classes (1-{association.classes}) are represented in the dataset")
         return True
 
 if __name__ == "__main__":
@@ -5,47 +5,55 @@ import os
 import glob
 from collections import defaultdict
 
-def main():
-    # Initialize data structures
+from school_index import load_region_collections
+
+def collect_schools(regions):
+    """Collect school names overall and by class, region and district, keeping repeats"""
     all_schools = []
     schools_by_class = defaultdict(list)
     schools_by_region = defaultdict(list)
     schools_by_district = defaultdict(list)
     
-    # Process all GeoJSON files
-    geojson_files = glob.glob('data/geojson/schools_by_region/*.geojson')
-    print(f"Found {len(geojson_files)} GeoJSON files")
-    
-    for file in geojson_files:
-        filename = os.path.basename(file)
-        region_name = filename.replace('.geojson', '')
+    for region_name, data in regions.items():
+        filename = f"{region_name}.geojson"
         class_num = region_name.split(' ')[1][0]  # Extract class number (1-6)
-        region_letter = region_name.split(' ')[1][1]  # Extract region letter (A-D)
         
         print(f"Processing {filename}...")
         
-        try:
-            with open(file) as f:
-                data = json.load(f)
-                
-                if 'features' not in data:
-                    print(f"WARNING: No features found in {filename}")
-                    continue
+        if 'features' not in data:
+            print(f"WARNING: No features found in {filename}")
+            continue
+        
+        for feature in data['features']:
+            if 'properties' in feature and 'name' in feature['properties']:
+                school_name = feature['properties']['name']
+                district = feature['properties'].get('district', 'Unknown')
                 
-                for feature in data['features']:
-                    if 'properties' in feature and 'name' in feature['properties']:
-                        school_name = feature['properties']['name']
-                        district = feature['properties'].get('district', 'Unknown')
-                        
-                        # Add to collections
-                        all_schools.append(school_name)
-                        schools_by_class[class_num].append(school_name)
-                        schools_by_region[region_name].append(school_name)
-                        schools_by_district[district].append(school_name)
-                    else:
-                        print(f"WARNING: Missing properties or name in a feature in {filename}")
-        except Exception as e:
-            print(f"ERROR processing {filename}: {str(e)}")
+                # Add to collections
+                all_schools.append(school_name)
+                schools_by_class[class_num].append(school_name)
+                schools_by_region[region_name].append(school_name)
+                schools_by_district[district].append(school_name)
+            else:
+                print(f"WARNING: Missing properties or name in a feature in {filename}")
+    
+    return all_schools, schools_by_class, schools_by_region, schools_by_district
+
+def compile_schools(all_schools, schools_by_class, schools_by_region, schools_by_district):
+    """Build the compiled_schools.json data from collected school names, every list and key sorted"""
+    return {
+        "all_schools": sorted(set(all_schools)),
+        "by_class": {k: sorted(set(v)) for k, v in sorted(schools_by_class.items())},
+        "by_region": {k: sorted(set(v)) for k, v in sorted(schools_by_region.items())},
+        "by_district": {k: sorted(set(v)) for k, v in sorted(schools_by_district.items())}
+    }
+
+def main():
+    # Process all GeoJSON files
+    regions = load_region_collections('data/geojson/schools_by_region')
+    print(f"Found {len(regions)} GeoJSON files")
+    
+    all_schools, schools_by_class, schools_by_region, schools_by_district = collect_schools(regions)
     
     # Print summary
     print("\n=== SUMMARY ===")
@@ -68,12 +76,7 @@ def main():
         print(f"{district}: {len(schools)} schools ({len(set(schools))} unique)")
     
     # Save the compiled data for further use
-    compiled_data = {
-        "all_schools": list(set(all_schools)),
-        "by_class": {k: list(set(v)) for k, v in schools_by_class.items()},
-        "by_region": {k: list(set(v)) for k, v in schools_by_region.items()},
-        "by_district": {k: list(set(v)) for k, v in schools_by_district.items()}
-    }
+    compiled_data = compile_schools(all_schools, schools_by_class, schools_by_region, schools_by_district)
     
     with open('data/compiled_schools.json', 'w') as f:
         json.dump(compiled_data, f, indent=2)
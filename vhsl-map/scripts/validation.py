@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+
+import json
+import math
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from associations import DEFAULT_ASSOCIATION, VHSL, load_associations
+from school_index import SchoolIndex, region_class
+
+# all_schools and school_lookup come from the association's output paths
+INPUTS = {
+    'schools': "data/va_schools_geocodes.json",
+    'classes_regions': "data/vhsl_classes_regions.json",
+    'districts': "data/vhsl_districts.json",
+}
+# Top-level key each input must contain (None: a JSON object of any shape)
+REQUIRED_KEYS = {
+    'all_schools': 'features',
+    'school_lookup': None,
+    'schools': 'schools',
+    'classes_regions': 'classes',
+    'districts': 'districts',
+    'region': 'features',
+}
+# Checked while parsing, before the rules engine runs
+FILE_RULES = ('parse', 'structure')
+REPORT_FILE = "data/validation_report.json"
+
+EXIT_OK, EXIT_FAILED, EXIT_UNREADABLE = 0, 1, 2
+
+
+def _load_input(job):
+    """Parse one input file and check its top-level shape (runs in a worker process)"""
+    key, kind, path = job
+    start = time.perf_counter()
+    issues = []
+    data = None
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        issues.append(('parse', 'error', f"{path} does not exist"))
+    except (OSError, ValueError) as e:
+        issues.append(('parse', 'error', f"{path} is not valid JSON: {e}"))
+
+    required = REQUIRED_KEYS[kind]
+    if data is not None:
+        if not isinstance(data, dict):
+            issues.append(('structure', 'error', f"{path} should hold a JSON object"))
+            data = None
+        elif required and not isinstance(data.get(required), list):
+            issues.append(('structure', 'error', f"{path} has no '{required}' list"))
+            data = None
+    return key, kind, str(path), data, issues, time.perf_counter() - start
+
+
+class Dataset:
+    """Every validation input of one association, loaded once, plus what the single pass over the schools learns"""
+
+    def __init__(self, association=VHSL):
+        self.association = association
+        self.class_count = association.classes
+        self.region_letters = association.region_letters
+        self.files = {}
+        self.data = {}
+        self.regions = {}
+        self.index = SchoolIndex()
+        self.source_names = defaultdict(set)
+        self.district_members = {}
+
+    @property
+    def expected_classes(self):
+        return [str(c) for c in range(1, self.class_count + 1)]
+
+    @property
+    def expected_regions(self):
+        return [f"Region {c}{letter}" for c in self.expected_classes for letter in self.region_letters]
+
+    def load(self, inputs=None, workers=None):
+        """Parse every input file, serially unless more than one worker is asked for; returns the file-level issues
+
+        The files are small enough that starting worker processes costs more
+        than parsing them, so the pool only pays off for very large inputs.
+        """
+        if inputs is None:
+            output_paths = self.association.output_paths()
+            inputs = {'all_schools': output_paths['all_schools'], 'school_lookup': output_paths['school_lookup'], **INPUTS}
+        regions_dir = self.association.regions_dir
+        jobs = [(key, key, path) for key, path in inputs.items()]
+        jobs += [(f"region:{path.stem}", 'region', path) for path in sorted(Path(regions_dir).glob("Region *.geojson"))]
+
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                loaded = list(executor.map(_load_input, jobs))
+        else:
+            loaded = [_load_input(job) for job in jobs]
+
+        issues = []
+        for key, kind, path, data, file_issues, seconds in loaded:
+            self.files[key] = {'path': path, 'ok': not file_issues, 'seconds': round(seconds, 4)}
+            issues += [{'rule': rule, 'severity': severity, 'message': message, 'file': path}
+                       for rule, severity, message in file_issues]
+            if kind == 'region':
+                if data is not None:
+                    self.regions[key.split(':', 1)[1]] = data
+            else:
+                self.data[key] = data
+
+        self.district_members = {district.get('name'): set(district.get('schools', []))
+                                 for district in (self.data.get('districts') or {}).get('districts', [])}
+        return issues
+
+    def features(self):
+        """Yield (source, region file name or None, feature) for every school feature"""
+        for feature in (self.data.get('all_schools') or {}).get('features', []):
+            yield 'all_schools', None, feature
+        for region, data in self.regions.items():
+            for feature in data.get('features', []):
+                yield 'region', region, feature
+
+
+class Validator:
+    """Rules evaluated in one pass over every school feature and record
+
+    Feature rules see each GeoJSON feature once (from all_schools.geojson and
+    the per-region files), school rules see each application school record
+    once, and dataset rules run last against the index and sets built during
+    that pass. Rules are generators yielding messages.
+    """
+
+    def __init__(self):
+        self.feature_rules = []
+        self.school_rules = []
+        self.dataset_rules = []
+
+    def _register(self, rules, name, severity):
+        def register(func):
+            rules.append((name, severity, func))
+            return func
+        return register
+
+    def feature_rule(self, name, severity='error'):
+        return self._register(self.feature_rules, name, severity)
+
+    def school_rule(self, name, severity='error'):
+        return self._register(self.school_rules, name, severity)
+
+    def dataset_rule(self, name, severity='error'):
+        return self._register(self.dataset_rules, name, severity)
+
+    @property
+    def rules(self):
+        return self.feature_rules + self.school_rules + self.dataset_rules
+
+    def run(self, dataset):
+        issues = []
+
+        def record(rules, *args, school=None, file=None):
+            for name, severity, func in rules:
+                for message in func(*args):
+                    issue = {'rule': name, 'severity': severity, 'message': message}
+                    if school:
+                        issue['school'] = school
+                    if file:
+                        issue['file'] = file
+                    issues.append(issue)
+
+        for source, region, feature in dataset.features():
+            name = (feature.get('properties') or {}).get('name')
+            if name:
+                dataset.source_names[source if region is None else 'regions'].add(name)
+                if source == 'all_schools':
+                    dataset.index.add_feature(feature)
+            record(self.feature_rules, feature, region, dataset, school=name,
+                   file=dataset.files[source if region is None else f"region:{region}"]['path'])
+
+        for school in (dataset.data.get('schools') or {}).get('schools', []):
+            record(self.school_rules, school, dataset, school=school.get('name'),
+                   file=dataset.files['schools']['path'])
+
+        record(self.dataset_rules, dataset)
+        return issues
+
+
+validator = Validator()
+
+
+@validator.feature_rule('feature-properties')
+def feature_properties(feature, region, dataset):
+    properties = feature.get('properties') or {}
+    if not properties.get('name'):
+        yield "Feature has no name"
+        return
+    for key in ('size', 'region', 'district'):
+        if properties.get(key) in (None, ''):
+            yield f"Missing {key}"
+
+
+@validator.feature_rule('feature-geometry')
+def feature_geometry(feature, region, dataset):
+    geometry = feature.get('geometry') or {}
+    coordinates = geometry.get('coordinates') or []
+    if geometry.get('type') != 'Point' or len(coordinates) < 2:
+        yield "Geometry is not a Point with coordinates"
+    elif not all(isinstance(v, (int, float)) and math.isfinite(v) for v in coordinates[:2]):
+        yield f"Coordinates are not finite numbers: {coordinates}"
+    elif not (-180 <= coordinates[0] <= 180 and -90 <= coordinates[1] <= 90):
+        yield f"Coordinates out of range: {coordinates}"
+
+
+@validator.feature_rule('class-region')
+def class_region(feature, region, dataset):
+    properties = feature.get('properties') or {}
+    size = str(properties.get('size') or '')
+    if region is not None:
+        # Schools in a per-region file belong to that file's class
+        if size and size != region_class(region):
+            yield f"Class {size} school listed in {region}"
+        return
+    value = properties.get('region') or ''
+    code = value.split(' ', 1)[1] if ' ' in value else ''
+    if not code:
+        return
+    if region_class(value):
+        if size and region_class(value) != size:
+            yield f"Class {size} school assigned to {value}"
+        if value not in dataset.expected_regions:
+            yield f"Unknown region {value}"
+    elif code not in dataset.region_letters:
+        yield f"Unknown region {value}"
+
+
+@validator.school_rule('school-fields')
+def school_fields(school, dataset):
+    for key in ('class', 'region', 'district'):
+        if not school.get(key):
+            yield f"Missing {key}"
+
+
+@validator.school_rule('district-membership', severity='warning')
+def district_membership(school, dataset):
+    members = dataset.district_members
+    district = school.get('district')
+    if district and district in members and school.get('name') not in members[district]:
+        yield f"Not listed among the {district} district's schools"
+    elif district and members and district not in members:
+        yield f"District {district} is not defined in the districts file"
+
+
+@validator.dataset_rule('duplicate-school', severity='warning')
+def duplicate_school(dataset):
+    for name in sorted(set(dataset.index.duplicates)):
+        yield f"{name} appears more than once in all_schools.geojson"
+
+
+@validator.dataset_rule('class-coverage')
+def class_coverage(dataset):
+    if dataset.data.get('all_schools') is None:
+        return
+    for class_num in dataset.expected_classes:
+        if not dataset.index.by_class.get(class_num):
+            yield f"No schools in Class {class_num}"
+
+
+@validator.dataset_rule('region-coverage')
+def region_coverage(dataset):
+    for region in dataset.expected_regions:
+        if region not in dataset.regions:
+            yield f"Missing region file for {region}"
+        elif not dataset.regions[region].get('features'):
+            yield f"{region} has no schools"
+
+
+@validator.dataset_rule('lookup-sync')
+def lookup_sync(dataset):
+    lookup = dataset.data.get('school_lookup')
+    if lookup is None or dataset.data.get('all_schools') is None:
+        return
+    geojson_names = dataset.source_names['all_schools']
+    for name in sorted(set(lookup) - geojson_names):
+        yield f"{name} is in school_lookup.json but not in all_schools.geojson"
+    for name in sorted(geojson_names - set(lookup)):
+        yield f"{name} is in all_schools.geojson but not in school_lookup.json"
+
+
+@validator.dataset_rule('school-count')
+def school_count(dataset):
+    if dataset.data.get('all_schools') is None or not dataset.regions:
+        return
+    expected = len(dataset.source_names['regions'])
+    found = len(dataset.source_names['all_schools'])
+    if found != expected:
+        yield f"all_schools.geojson has {found} schools but the region files list {expected}"
+
+
+@validator.dataset_rule('classes-defined')
+def classes_defined(dataset):
+    data = dataset.data.get('classes_regions')
+    if data is None:
+        return
+    defined = {c.get('name', '').replace('Class ', ''): c for c in data.get('classes', [])}
+    for class_num in dataset.expected_classes:
+        if class_num not in defined:
+            yield f"Class {class_num} is not defined"
+            continue
+        regions = {r.get('name') for r in defined[class_num].get('regions', [])}
+        for letter in dataset.region_letters:
+            if f"Region {class_num}{letter}" not in regions:
+                yield f"Region {class_num}{letter} is not defined under Class {class_num}"
+
+
+def validate(association=VHSL, inputs=None, workers=None):
+    """Load every input of an association once, run every rule and return the JSON-ready report"""
+    start = time.perf_counter()
+    dataset = Dataset(association)
+    issues = dataset.load(inputs, workers)
+    loaded = time.perf_counter()
+    issues += validator.run(dataset)
+    finished = time.perf_counter()
+
+    errors = sum(1 for issue in issues if issue['severity'] == 'error')
+    by_rule = defaultdict(int)
+    for issue in issues:
+        by_rule[issue['rule']] += 1
+    return {
+        'summary': {
+            'errors': errors,
+            'warnings': len(issues) - errors,
+            'schools': len(dataset.index),
+            'files': len(dataset.files),
+            'unreadable_files': sum(1 for f in dataset.files.values() if not f['ok']),
+            'rules': len(FILE_RULES) + len(validator.rules),
+            'load_seconds': round(loaded - start, 4),
+            'check_seconds': round(finished - loaded, 4),
+        },
+        'issues_by_rule': dict(sorted(by_rule.items())),
+        'schools_by_class': {c: len(names) for c, names in sorted(dataset.index.by_class.items())},
+        'files': dataset.files,
+        'issues': issues,
+    }
+
+
+def exit_code(report, strict=False):
+    """0 when clean, 1 when rules failed (warnings too if strict), 2 when inputs could not be read"""
+    summary = report['summary']
+    if summary['unreadable_files']:
+        return EXIT_UNREADABLE
+    if summary['errors'] or (strict and summary['warnings']):
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Validate every school data file in one pass")
+    parser.add_argument('--association', default=DEFAULT_ASSOCIATION, help="association key from data/associations.json")
+    parser.add_argument('--output', default=REPORT_FILE, help=f"JSON report path (default {REPORT_FILE})")
+    parser.add_argument('--workers', type=int, help="processes used to parse files (default: parse serially)")
+    parser.add_argument('--strict', action='store_true', help="fail on warnings as well as errors")
+    parser.add_argument('--quiet', action='store_true', help="only print the summary")
+    args = parser.parse_args()
+
+    report = validate(load_associations()[args.association], workers=args.workers)
+    summary = report['summary']
+
+    print("=== Validation Report ===")
+    print(f"{summary['files']} files, {summary['schools']} schools, {summary['rules']} rules "
+          f"(load {summary['load_seconds']}s, checks {summary['check_seconds']}s)")
+    for rule, count in report['issues_by_rule'].items():
+        print(f"  {rule}: {count}")
+    if not args.quiet:
+        for issue in report['issues'][:20]:
+            where = f"{issue['school']}: " if issue.get('school') else ''
+            print(f"- [{issue['severity']}] {issue['rule']}: {where}{issue['message']}")
+        if len(report['issues']) > 20:
+            print(f"... and {len(report['issues']) - 20} more (see {args.output})")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"{summary['errors']} errors, {summary['warnings']} warnings; report saved to {args.output}")
+    raise SystemExit(exit_code(report, args.strict))
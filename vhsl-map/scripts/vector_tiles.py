@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+
+import json
+import math
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from geojson_stream import write_atomic
+from school_index import REGION_FILES_DIR, SchoolIndex
+from simplify_boundaries import LAYERS, simplify_layer
+from spatial import load_polygon_directory
+
+OUTPUT_DIR = "dist/data/tiles"
+EXTENT = 4096
+BUFFER = 64
+# Zoom range built for each layer
+ZOOMS = {
+    'schools': (4, 12),
+    'regions': (4, 10),
+    'states': (0, 6),
+}
+
+MOVE_TO, LINE_TO, CLOSE_PATH = 1, 2, 7
+POINT, POLYGON = 1, 3
+
+
+# --- Protocol buffer encoding (Mapbox Vector Tile 2.1) ---
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 31)
+
+
+def _field(number, wire_type):
+    return _varint((number << 3) | wire_type)
+
+
+def _bytes_field(number, payload):
+    return _field(number, 2) + _varint(len(payload)) + payload
+
+
+def _uint_field(number, value):
+    return _field(number, 0) + _varint(value)
+
+
+def _packed_field(number, values):
+    return _bytes_field(number, b''.join(_varint(v) for v in values))
+
+
+def _encode_value(value):
+    if isinstance(value, bool):
+        return _uint_field(7, int(value))
+    if isinstance(value, int):
+        return _field(6, 0) + _varint((value << 1) ^ (value >> 63))
+    if isinstance(value, float):
+        return _field(3, 1) + np.float64(value).tobytes()
+    return _bytes_field(1, str(value).encode('utf-8'))
+
+
+def encode_geometry(geom_type, parts):
+    """Encode point or ring parts (lists of integer (x, y)) as MVT geometry commands"""
+    commands = []
+    cursor_x = cursor_y = 0
+    if geom_type == POINT:
+        commands.append(MOVE_TO | (len(parts) << 3))
+        for x, y in parts:
+            commands += [_zigzag(x - cursor_x), _zigzag(y - cursor_y)]
+            cursor_x, cursor_y = x, y
+        return commands
+
+    for ring in parts:
+        x, y = ring[0]
+        commands += [MOVE_TO | (1 << 3), _zigzag(x - cursor_x), _zigzag(y - cursor_y)]
+        cursor_x, cursor_y = x, y
+        commands.append(LINE_TO | ((len(ring) - 1) << 3))
+        for x, y in ring[1:]:
+            commands += [_zigzag(x - cursor_x), _zigzag(y - cursor_y)]
+            cursor_x, cursor_y = x, y
+        commands.append(CLOSE_PATH | (1 << 3))
+    return commands
+
+
+def encode_layer(name, features, extent=EXTENT):
+    """Encode one layer; features are (id, geometry type, parts, properties) tuples"""
+    keys, values = {}, {}
+    encoded_features = []
+    for feature_id, geom_type, parts, properties in features:
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value).__name__, value), len(values)))
+        body = _uint_field(1, feature_id) + _packed_field(2, tags) + _uint_field(3, geom_type)
+        body += _packed_field(4, encode_geometry(geom_type, parts))
+        encoded_features.append(_bytes_field(2, body))
+
+    layer = _uint_field(15, 2) + _bytes_field(1, name.encode('utf-8')) + b''.join(encoded_features)
+    layer += b''.join(_bytes_field(3, key.encode('utf-8')) for key in keys)
+    layer += b''.join(_bytes_field(4, _encode_value(value)) for _, value in values)
+    layer += _uint_field(5, extent)
+    return layer
+
+
+def encode_tile(layers):
+    """Encode a tile from a mapping of layer name -> features"""
+    return b''.join(_bytes_field(3, encode_layer(name, features)) for name, features in layers.items() if features)
+
+
+# --- Projection and clipping ---
+
+def project(coordinates):
+    """Project lon/lat pairs to Web Mercator world coordinates in [0, 1] with y pointing down"""
+    points = np.asarray(coordinates, dtype=np.float64)
+    lat = np.clip(points[:, 1], -85.0511, 85.0511)
+    x = (points[:, 0] + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(np.radians(lat)) + 1.0 / np.cos(np.radians(lat))) / math.pi) / 2.0
+    return np.column_stack([x, y])
+
+
+def clip_ring(ring, low, high):
+    """Clip a closed ring to the square [low, high] with Sutherland-Hodgman"""
+    points = ring[:-1] if len(ring) > 1 and np.array_equal(ring[0], ring[-1]) else ring
+    for axis, bound, keep_above in ((0, low, True), (0, high, False), (1, low, True), (1, high, False)):
+        if not len(points):
+            break
+        inside = points[:, axis] >= bound if keep_above else points[:, axis] <= bound
+        previous = np.roll(points, 1, axis=0)
+        previous_inside = np.roll(inside, 1)
+        output = []
+        for point, prev, is_in, prev_in in zip(points, previous, inside, previous_inside):
+            if is_in != prev_in:
+                t = (bound - prev[axis]) / (point[axis] - prev[axis])
+                output.append(prev + t * (point - prev))
+            if is_in:
+                output.append(point)
+        points = np.array(output).reshape(-1, 2)
+    return points
+
+
+def _signed_area(ring):
+    x, y = ring[:, 0], ring[:, 1]
+    return float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)) / 2
+
+
+def tile_rings(polygon_parts, z, tile_x, tile_y, extent=EXTENT, buffer=BUFFER):
+    """Clip projected polygon parts to a tile and return integer rings wound per the MVT spec"""
+    scale = extent * (1 << z)
+    rings = []
+    for part in polygon_parts:
+        for ring_index, ring in enumerate(part):
+            local = ring * scale - np.array([tile_x * extent, tile_y * extent])
+            clipped = np.rint(clip_ring(local, -buffer, extent + buffer)).astype(np.int64)
+            if len(clipped) < 3:
+                if ring_index == 0:
+                    break
+                continue
+            # Drop repeated vertices created by rounding
+            keep = np.any(clipped != np.roll(clipped, 1, axis=0), axis=1)
+            clipped = clipped[keep]
+            area = _signed_area(clipped) if len(clipped) >= 3 else 0
+            if area == 0:
+                if ring_index == 0:
+                    break
+                continue
+            # Exterior rings have positive area in tile coordinates, holes negative
+            if (ring_index == 0) != (area > 0):
+                clipped = clipped[::-1]
+            rings.append([tuple(map(int, point)) for point in clipped])
+    return rings
+
+
+def _tile_range(bounds, z):
+    count = 1 << z
+    min_x, min_y, max_x, max_y = bounds
+    return (range(max(0, int(min_x * count)), min(count - 1, int(max_x * count)) + 1),
+            range(max(0, int(min_y * count)), min(count - 1, int(max_y * count)) + 1))
+
+
+# --- Tile building ---
+
+def build_tiles(output_dir=OUTPUT_DIR, zooms=None, regions_dir=REGION_FILES_DIR):
+    """Cut schools, region polygons and state outlines into z/x/y tiles"""
+    output_dir = Path(output_dir)
+    zooms = zooms or ZOOMS
+    tiles = defaultdict(lambda: defaultdict(list))
+
+    index = SchoolIndex.from_region_files(regions_dir)
+    schools = [s for s in index if len(s['coordinates']) >= 2]
+    school_points = project([s['coordinates'][:2] for s in schools]) if schools else np.empty((0, 2))
+    min_zoom, max_zoom = zooms['schools']
+    for z in range(min_zoom, max_zoom + 1):
+        scale = EXTENT * (1 << z)
+        for feature_id, (school, (x, y)) in enumerate(zip(schools, school_points), start=1):
+            tile_x, tile_y = int(x * (1 << z)), int(y * (1 << z))
+            point = (int(round(x * scale - tile_x * EXTENT)), int(round(y * scale - tile_y * EXTENT)))
+            properties = {key: school[key] for key in ('name', 'class', 'region', 'district')}
+            tiles[z, tile_x, tile_y]['schools'].append((feature_id, POINT, [point], properties))
+
+    for layer in ('regions', 'states'):
+        if layer not in zooms:
+            continue
+        directory, pattern = LAYERS[layer]
+        geometries = load_polygon_directory(directory, pattern)
+        min_zoom, max_zoom = zooms[layer]
+        for z in range(min_zoom, max_zoom + 1):
+            # Simplify to roughly one screen pixel at this zoom, keeping shared borders shared
+            simplified, _ = simplify_layer(geometries, 360.0 / (256 * (1 << z)))
+            for feature_id, (name, geometry) in enumerate(simplified.items(), start=1):
+                parts = [[project(ring) for ring in part] for part in geometry['coordinates']]
+                if not parts:
+                    continue
+                points = np.concatenate([part[0] for part in parts])
+                bounds = (*points.min(axis=0), *points.max(axis=0))
+                x_range, y_range = _tile_range(bounds, z)
+                for tile_x in x_range:
+                    for tile_y in y_range:
+                        rings = tile_rings(parts, z, tile_x, tile_y)
+                        if rings:
+                            tiles[z, tile_x, tile_y][layer].append((feature_id, POLYGON, rings, {'name': name}))
+
+    total_bytes = 0
+    for (z, tile_x, tile_y), layers in tiles.items():
+        content = encode_tile(layers)
+        write_atomic(output_dir / str(z) / str(tile_x) / f"{tile_y}.pbf", content)
+        total_bytes += len(content)
+
+    all_zooms = [z for low, high in zooms.values() for z in (low, high)]
+    tilejson = {
+        "tilejson": "3.0.0",
+        "tiles": ["{z}/{x}/{y}.pbf"],
+        "minzoom": min(all_zooms),
+        "maxzoom": max(all_zooms),
+        "vector_layers": [{"id": layer, "minzoom": low, "maxzoom": high,
+                           "fields": {"name": "String"} if layer != 'schools' else
+                           {"name": "String", "class": "String", "region": "String", "district": "String"}}
+                          for layer, (low, high) in zooms.items()],
+    }
+    write_atomic(output_dir / "tiles.json", json.dumps(tilejson, indent=2).encode('utf-8'))
+
+    print(f"Wrote {len(tiles)} tiles ({total_bytes / 1024:.0f} KB) to {output_dir}")
+    return len(tiles)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build Mapbox Vector Tiles for schools, regions and states")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    parser.add_argument('--max-zoom', type=int, help="cap the maximum zoom of every layer")
+    args = parser.parse_args()
+
+    zooms = dict(ZOOMS)
+    if args.max_zoom is not None:
+        zooms = {layer: (low, min(high, args.max_zoom)) for layer, (low, high) in zooms.items()
+                 if low <= args.max_zoom}
+
+    print("=== Building Vector Tiles ===")
+    build_tiles(args.output_dir, zooms)
@@ -3,6 +3,8 @@
 import json
 import os
 
+from school_index import SchoolIndex
+
 def verify_schools_integration():
     """Verify the integration of all schools in the combined dataset"""
     
@@ -95,7 +97,11 @@ if __name__ == "__main__":
     results = verify_schools_integration()
     
     print("\n=== Integration Summary ===")
-    if (results["total_schools"] == 319 and 
+    # The expected total comes from the per-region source files rather than a fixed count
+    expected_schools = len(SchoolIndex.from_region_files())
+    if results["total_schools"] != expected_schools:
+        print(f"Expected {expected_schools} schools from the region files, found {results['total_schools']}")
+    if (results["total_schools"] == expected_schools and 
         results["missing_properties"] == 0 and 
         results["missing_in_geojson"] == 0 and 
         results["missing_in_lookup"] == 0):
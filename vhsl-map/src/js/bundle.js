@@ -0,0 +1,87 @@
+// Decoder for the binary school bundle written by scripts/build_bundle.py
+//
+// Layout (little-endian): a 32-byte header (magic "VHSB", version, school
+// count, class/region/district dictionary sizes, string table bytes, reserved)
+// followed by the columns float32 lon, float32 lat, uint16 class id, uint16
+// region id, uint16 district id, uint8 size, uint8 flags, and a UTF-8 string
+// table with school names and the three dictionaries, one per line.
+
+const MAGIC = 'VHSB';
+const VERSION = 1;
+const HEADER_BYTES = 32;
+const IN_LOOKUP = 1;
+
+// Decode a bundle ArrayBuffer into typed-array columns and string dictionaries
+export function decodeSchoolBundle(buffer) {
+  const header = new DataView(buffer, 0, HEADER_BYTES);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== MAGIC || header.getUint32(4, true) !== VERSION) {
+    throw new Error(`Not a version ${VERSION} school bundle`);
+  }
+
+  const count = header.getUint32(8, true);
+  const classCount = header.getUint32(12, true);
+  const regionCount = header.getUint32(16, true);
+  const stringBytes = header.getUint32(24, true);
+
+  // Typed arrays are views on the buffer; the layout keeps every column aligned
+  let offset = HEADER_BYTES;
+  const column = (ArrayType) => {
+    const view = new ArrayType(buffer, offset, count);
+    offset += view.byteLength;
+    return view;
+  };
+
+  const bundle = {
+    count,
+    lon: column(Float32Array),
+    lat: column(Float32Array),
+    classIds: column(Uint16Array),
+    regionIds: column(Uint16Array),
+    districtIds: column(Uint16Array),
+    size: column(Uint8Array),
+    flags: column(Uint8Array),
+  };
+
+  const strings = new TextDecoder()
+    .decode(new Uint8Array(buffer, offset, stringBytes))
+    .split('\n');
+  bundle.names = strings.slice(0, count);
+  bundle.classes = strings.slice(count, count + classCount);
+  bundle.regions = strings.slice(count + classCount, count + classCount + regionCount);
+  bundle.districts = strings.slice(count + classCount + regionCount);
+  return bundle;
+}
+
+// Build the schools FeatureCollection and school lookup the app works with
+export function bundleToSchoolData(bundle) {
+  const features = [];
+  const lookup = {};
+
+  for (let i = 0; i < bundle.count; i++) {
+    const name = bundle.names[i];
+    const coordinates = Number.isNaN(bundle.lon[i]) ? [] : [bundle.lon[i], bundle.lat[i]];
+    const properties = {
+      name,
+      size: bundle.size[i] || undefined,
+      region: bundle.regions[bundle.regionIds[i]] || undefined,
+      district: bundle.districts[bundle.districtIds[i]] || undefined,
+    };
+    if (bundle.classIds[i]) {
+      properties.class = bundle.classes[bundle.classIds[i]];
+    }
+
+    features.push({
+      id: i + 1,
+      type: 'Feature',
+      geometry: coordinates.length ? { type: 'Point', coordinates } : null,
+      properties,
+    });
+
+    if (bundle.flags[i] & IN_LOOKUP) {
+      lookup[name] = { ...properties, coordinates };
+    }
+  }
+
+  return { schoolsGeoJSON: { type: 'FeatureCollection', features }, schoolLookup: lookup };
+}
@@ -5,6 +5,9 @@ import View from 'ol/View';
 import TileLayer from 'ol/layer/Tile';
 import VectorLayer from 'ol/layer/Vector';
 import VectorSource from 'ol/source/Vector';
+import VectorTileLayer from 'ol/layer/VectorTile';
+import VectorTileSource from 'ol/source/VectorTile';
+import MVT from 'ol/format/MVT';
 import OSM from 'ol/source/OSM';
 import {fromLonLat} from 'ol/proj';
 import Feature from 'ol/Feature';
@@ -13,6 +16,8 @@ import {Circle as CircleStyle, Fill, Stroke, Style, Text} from 'ol/style';
 import {defaults as defaultControls} from 'ol/control';
 import Overlay from 'ol/Overlay';
 import GeoJSON from 'ol/format/GeoJSON';
+import {decodeSchoolBundle, bundleToSchoolData} from './bundle.js';
+import {SearchIndex} from './search.js';
 
 // Global variables
 let map;
@@ -32,6 +37,19 @@ let visibleSchoolsCount = 0;
 let allRegions = new Set();
 let allDistricts = new Set();
 let allClasses = new Set();
+let searchIndex = null;
+let dataManifest = null;
+let boundaryLayer = null;
+
+// Different colors for different classes
+const classColors = {
+  1: '#ffff33', // Class 1
+  2: '#ff7f00', // Class 2
+  3: '#984ea3', // Class 3
+  4: '#4daf4a', // Class 4
+  5: '#377eb8', // Class 5
+  6: '#e41a1c'  // Class 6
+};
 
 // Initialize the application when DOM is loaded
 document.addEventListener('DOMContentLoaded', async () => {
@@ -39,35 +57,25 @@ document.addEventListener('DOMContentLoaded', async () => {
   showLoadingIndicator();
   
   try {
-    // Load GeoJSON data directly from GitHub to avoid bundling large files
-    const rawBase =
+    // Without a published manifest, load GeoJSON data directly from GitHub to avoid bundling large files
+    // (VITE_DATA_BASE points this at scripts/data_server.py in development or self-hosted deployments)
+    const rawBase = import.meta.env.VITE_DATA_BASE ||
       'https://raw.githubusercontent.com/wallyatkins/vhsl/refs/heads/main/';
 
-    const regionBase = `${rawBase}geojson/vhsl_regions/schools_by_region/`;
+    // The manifest is the only file fetched fresh; the content-hashed files it names never change
+    dataManifest = await fetchManifest(`${import.meta.env.BASE_URL}data/manifest.json`);
 
-    // Generate URLs for all region files (Classes 1-6, Regions A-D)
-    const regionUrls = [];
-    for (let cls = 1; cls <= 6; cls++) {
-      for (const letter of ['A', 'B', 'C', 'D']) {
-        const file = `Region ${cls}${letter}.geojson`;
-        regionUrls.push(regionBase + encodeURIComponent(file));
-      }
-    }
+    const bundleUrl = dataUrl('schools.bin', `${rawBase}vhsl-map/data/geojson/schools.bin`);
 
-    const lookupUrl = `${rawBase}vhsl-map/data/geojson/school_lookup.json`;
-
-    const [regionsData, lookupData] = await Promise.all([
-      Promise.all(regionUrls.map((url) => fetchData(url))),
-      fetchData(lookupUrl),
-    ]);
-
-    // Combine all region features into a single FeatureCollection
-    const schoolsGeoJSON = { type: 'FeatureCollection', features: [] };
-    regionsData.forEach((data) => {
-      if (data?.features) {
-        schoolsGeoJSON.features.push(...data.features);
-      }
-    });
+    // Prefer the prejoined binary bundle: one request and no JSON parsing
+    let schoolsGeoJSON;
+    let lookupData;
+    const bundle = await fetchBundle(bundleUrl);
+    if (bundle) {
+      ({ schoolsGeoJSON, schoolLookup: lookupData } = bundleToSchoolData(bundle));
+    } else {
+      ({ schoolsGeoJSON, lookupData } = await fetchRegionData(rawBase));
+    }
     
     if (!schoolsGeoJSON || !lookupData) {
       throw new Error('Failed to load required GeoJSON data');
@@ -76,12 +84,17 @@ document.addEventListener('DOMContentLoaded', async () => {
     // Store school lookup globally for faster access
     schoolLookup = lookupData;
     
-    // Enrich schools GeoJSON with class data from lookup
-    enrichSchoolsData(schoolsGeoJSON, schoolLookup);
+    // Enrich schools GeoJSON with class data from lookup (the bundle is already joined)
+    if (!bundle) {
+      enrichSchoolsData(schoolsGeoJSON, schoolLookup);
+    }
     
     // Initialize map
     initMap(schoolsGeoJSON);
     
+    // Region and state outlines are vector tiles, so only the tiles in view are fetched
+    loadBoundaryTiles(`${import.meta.env.BASE_URL}data/tiles/tiles.json`);
+    
     // Initialize UI components
     initUI();
     
@@ -106,6 +119,9 @@ document.addEventListener('DOMContentLoaded', async () => {
     // Initialize global search
     initGlobalSearch();
     
+    // Load the prebuilt search index in the background; substring search works until it arrives
+    loadSearchIndex(dataUrl('search_index.json', `${rawBase}vhsl-map/data/geojson/search_index.json`));
+    
     // Hide loading indicator
     hideLoadingIndicator();
     
@@ -210,6 +226,10 @@ function performSearch(searchTerm) {
     classes: []
   };
   
+  if (searchIndex) {
+    return rankedSearch(searchTerm, results);
+  }
+  
   // Search schools
   Object.values(schoolLookup).forEach(school => {
     if (school.name.toLowerCase().includes(searchTerm)) {
@@ -254,6 +274,41 @@ function performSearch(searchTerm) {
   return results;
 }
 
+// Load the typo-tolerant search index built by scripts/search_index.py
+async function loadSearchIndex(url) {
+  const data = await fetchData(url);
+  if (!data) {
+    return;
+  }
+  try {
+    searchIndex = new SearchIndex(data);
+  } catch (error) {
+    console.error('Error loading search index:', error);
+  }
+}
+
+// Search through the prebuilt index; results keep the index ranking instead of alphabetical order
+function rankedSearch(searchTerm, results) {
+  const limits = { schools: 10, regions: 5, districts: 5, classes: 6 };
+  const buckets = { school: 'schools', region: 'regions', district: 'districts', class: 'classes' };
+  
+  searchIndex.search(searchTerm, { limit: 0 }).forEach(({ kind, name }) => {
+    const bucket = buckets[kind];
+    if (results[bucket].length >= limits[bucket]) {
+      return;
+    }
+    if (kind === 'school') {
+      if (schoolLookup[name]) {
+        results.schools.push(schoolLookup[name]);
+      }
+    } else {
+      results[bucket].push(name);
+    }
+  });
+  
+  return results;
+}
+
 // Display search results
 function displaySearchResults(results, searchTerm) {
   const searchResults = document.getElementById('search-results');
@@ -702,12 +757,45 @@ function hideLoadingIndicator() {
   }
 }
 
+// Fetch the manifest of published data files (scripts/publish.py); returns null when none is published
+async function fetchManifest(url) {
+  try {
+    const response = await fetch(url, { cache: 'no-cache' });
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const manifest = await response.json();
+    // Hashed names in the manifest are relative to the manifest itself
+    const files = {};
+    for (const [name, path] of Object.entries(manifest.files || {})) {
+      files[name] = new URL(path, response.url).href;
+    }
+    return { files, hashed: new Set(Object.values(files)) };
+  } catch (error) {
+    console.warn(`Data manifest unavailable (${url}), loading data from GitHub:`, error);
+    return null;
+  }
+}
+
+// Resolve a logical data file name through the manifest, or fall back to its unhashed URL
+function dataUrl(name, fallbackUrl) {
+  return dataManifest?.files[name] || fallbackUrl;
+}
+
+// Fetch a data file: hashed files come from the browser cache whenever it has them,
+// unhashed ones get a cache buster in development
+function fetchDataFile(url) {
+  if (dataManifest?.hashed.has(url)) {
+    return fetch(url, { cache: 'force-cache' });
+  }
+  const cacheBuster = process.env.NODE_ENV === 'development' ? `?_=${Date.now()}` : '';
+  return fetch(url + cacheBuster);
+}
+
 // Fetch data from JSON files with caching
 async function fetchData(url) {
   try {
-    // Add cache busting for development only
-    const cacheBuster = process.env.NODE_ENV === 'development' ? `?_=${Date.now()}` : '';
-    const response = await fetch(url + cacheBuster);
+    const response = await fetchDataFile(url);
     if (!response.ok) {
       throw new Error(`HTTP error! status: ${response.status}`);
     }
@@ -718,6 +806,51 @@ async function fetchData(url) {
   }
 }
 
+// Load the per-region GeoJSON files and the school lookup (fallback when no bundle is published)
+async function fetchRegionData(rawBase) {
+  const regionBase = `${rawBase}geojson/vhsl_regions/schools_by_region/`;
+
+  // Generate URLs for all region files (Classes 1-6, Regions A-D)
+  const regionUrls = [];
+  for (let cls = 1; cls <= 6; cls++) {
+    for (const letter of ['A', 'B', 'C', 'D']) {
+      const file = `Region ${cls}${letter}.geojson`;
+      regionUrls.push(dataUrl(`regions/${file}`, regionBase + encodeURIComponent(file)));
+    }
+  }
+
+  const lookupUrl = dataUrl('school_lookup.json', `${rawBase}vhsl-map/data/geojson/school_lookup.json`);
+
+  const [regionsData, lookupData] = await Promise.all([
+    Promise.all(regionUrls.map((url) => fetchData(url))),
+    fetchData(lookupUrl),
+  ]);
+
+  // Combine all region features into a single FeatureCollection
+  const schoolsGeoJSON = { type: 'FeatureCollection', features: [] };
+  regionsData.forEach((data) => {
+    if (data?.features) {
+      schoolsGeoJSON.features.push(...data.features);
+    }
+  });
+
+  return { schoolsGeoJSON, lookupData };
+}
+
+// Fetch and decode the binary school bundle; returns null when it is unavailable
+async function fetchBundle(url) {
+  try {
+    const response = await fetchDataFile(url);
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return decodeSchoolBundle(await response.arrayBuffer());
+  } catch (error) {
+    console.warn(`School bundle unavailable (${url}), falling back to GeoJSON:`, error);
+    return null;
+  }
+}
+
 // Initialize the OpenLayers map with GeoJSON data - optimized version
 function initMap(schoolsGeoJSON) {
   // Create vector source for school markers from GeoJSON
@@ -799,7 +932,7 @@ function initMap(schoolsGeoJSON) {
   map.on('click', function(evt) {
     const feature = map.forEachFeatureAtPixel(evt.pixel, function(feature) {
       return feature;
-    });
+    }, schoolHitOptions);
     
     if (feature && feature.get('name')) {
       showSchoolInfo(feature);
@@ -809,6 +942,57 @@ function initMap(schoolsGeoJSON) {
   });
 }
 
+// Only school markers react to hover and click; boundary tiles are background
+const schoolHitOptions = { layerFilter: (layer) => layer === schoolsLayer };
+
+// Add region and state outlines from the vector tiles built by scripts/vector_tiles.py, when they are published
+async function loadBoundaryTiles(url) {
+  try {
+    const response = await fetch(url, { cache: 'no-cache' });
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const tileJSON = await response.json();
+    // School markers stay on the full vector layer, which filtering, search and the list need
+    const layers = tileJSON.vector_layers.filter((layer) => layer.id !== 'schools');
+    boundaryLayer = new VectorTileLayer({
+      source: new VectorTileSource({
+        format: new MVT({ layers: layers.map((layer) => layer.id) }),
+        // Tile URLs in the TileJSON are relative to it
+        url: decodeURI(new URL(tileJSON.tiles[0], response.url).href),
+        maxZoom: Math.max(...layers.map((layer) => layer.maxzoom))
+      }),
+      style: boundaryStyle,
+      zIndex: 5
+    });
+    map.addLayer(boundaryLayer);
+  } catch (error) {
+    console.warn(`Vector tiles unavailable (${url}), showing schools without boundaries:`, error);
+  }
+}
+
+// Outline regions in their class color and states in grey, with styles cached per class;
+// regions the class or region filters exclude are hidden
+const boundaryStyleCache = {};
+function boundaryStyle(feature) {
+  const name = feature.get('name') || '';
+  const match = feature.get('layer') === 'regions' && /^Region (\d)/.exec(name);
+  if (match && ((activeFilters.classes.length > 0 && !activeFilters.classes.includes(`Class ${match[1]}`)) ||
+      (activeFilters.regions.length > 0 && !activeFilters.regions.includes(name)))) {
+    return null;
+  }
+  const key = match ? match[1] : 'state';
+  if (!boundaryStyleCache[key]) {
+    boundaryStyleCache[key] = new Style({
+      stroke: new Stroke({
+        color: match ? (classColors[key] || '#999999') : '#666666',
+        width: match ? 1.5 : 2
+      })
+    });
+  }
+  return boundaryStyleCache[key];
+}
+
 // Initialize UI components - optimized version
 function initUI() {
   const zoomIn = document.getElementById('zoom-in');
@@ -1083,16 +1267,6 @@ function showSchoolInfo(feature) {
 
 // Create style for school markers - optimized with style caching
 function createSchoolStyle(feature, highlight = false) {
-  // Different colors for different classes
-  const classColors = {
-    1: '#ffff33', // Class 1
-    2: '#ff7f00', // Class 2
-    3: '#984ea3', // Class 3
-    4: '#4daf4a', // Class 4
-    5: '#377eb8', // Class 5
-    6: '#e41a1c'  // Class 6
-  };
-  
   const size = parseInt(feature.get('size')) || 0;
   const color = classColors[size] || '#999999';
   
@@ -1132,14 +1306,14 @@ function addHoverInteraction() {
     }
     
     const pixel = map.getEventPixel(evt.originalEvent);
-    const hit = map.hasFeatureAtPixel(pixel);
+    const hit = map.hasFeatureAtPixel(pixel, schoolHitOptions);
     
     map.getTargetElement().style.cursor = hit ? 'pointer' : '';
     
     // Handle hover styling
     const feature = map.forEachFeatureAtPixel(pixel, function(feature) {
       return feature;
-    });
+    }, schoolHitOptions);
     
     if (feature !== hoveredFeature) {
       if (hoveredFeature) {
@@ -1259,6 +1433,7 @@ function resetFilters() {
   
   // Force redraw
   schoolsLayer.changed();
+  boundaryLayer?.changed();
   
   // Update filter status
   updateFilterStatus();
@@ -1281,6 +1456,7 @@ function updateMapView(view) {
   
   // Force redraw
   schoolsLayer.changed();
+  boundaryLayer?.changed();
   
   // Hide info panel
   document.getElementById('info-panel').classList.add('hidden');
@@ -1365,6 +1541,7 @@ function filterSchools() {
   
   // Force redraw
   schoolsLayer.changed();
+  boundaryLayer?.changed();
   
   // Update school list - use cached elements for better performance
   schoolListElements.forEach(item => {
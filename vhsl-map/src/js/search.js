@@ -0,0 +1,171 @@
+// Client side of the search index built by scripts/search_index.py
+//
+// The index maps n-grams to word tokens and tokens to entries (school,
+// district, region and class names). Query words match tokens by substring,
+// or within a small edit distance of a token prefix, and every query word
+// must match for an entry to be returned. Keep in step with the Python query
+// code so both rank results the same way.
+
+const VERSION = 1;
+const PREFIX = 0;
+const SUBSTRING = 1;
+const FUZZY = 2;
+
+// Lowercase, strip accents and reduce text to space-separated alphanumeric words
+export function normalize(text) {
+  const words = String(text)
+    .normalize('NFKD')
+    .replace(/[\u0300-\u036f]/g, '')
+    .toLowerCase()
+    .match(/[a-z0-9]+/g);
+  return words ? words.join(' ') : '';
+}
+
+function tokenGrams(token, n) {
+  const padded = ` ${token}`;
+  const grams = new Set();
+  for (let i = 0; i < Math.max(1, padded.length - n + 1); i++) {
+    grams.add(padded.slice(i, i + n));
+  }
+  return grams;
+}
+
+function maxEdits(word) {
+  if (word.length < 4) return 0;
+  return word.length < 8 ? 1 : 2;
+}
+
+// Edit distance between word and the closest prefix of token, or null past limit
+function prefixDistance(word, token, limit) {
+  let previous = Array.from({ length: token.length + 1 }, (_, j) => j);
+  for (let i = 1; i <= word.length; i++) {
+    const current = [i];
+    for (let j = 1; j <= token.length; j++) {
+      current.push(Math.min(
+        previous[j] + 1,
+        current[j - 1] + 1,
+        previous[j - 1] + (word[i - 1] !== token[j - 1] ? 1 : 0),
+      ));
+    }
+    if (Math.min(...current) > limit) return null;
+    previous = current;
+  }
+  const distance = Math.min(...previous);
+  return distance <= limit ? distance : null;
+}
+
+function deltaDecode(deltas) {
+  const ids = new Array(deltas.length);
+  let last = 0;
+  for (let i = 0; i < deltas.length; i++) {
+    last += deltas[i];
+    ids[i] = last;
+  }
+  return ids;
+}
+
+export class SearchIndex {
+  constructor(data) {
+    if (data?.version !== VERSION) {
+      throw new Error(`Unsupported search index version: ${data?.version}`);
+    }
+    this.n = data.n;
+    this.entries = data.entries.map(([kind, name]) => ({ kind: data.kinds[kind], name }));
+    this.tokens = data.tokens;
+    this.postings = data.postings.map(deltaDecode);
+    this.grams = new Map(Object.entries(data.grams).map(([gram, ids]) => [gram, deltaDecode(ids)]));
+  }
+
+  substringTokens(word) {
+    let candidates = null;
+    if (word.length >= this.n) {
+      for (let i = 0; i + this.n <= word.length; i++) {
+        const ids = this.grams.get(word.slice(i, i + this.n));
+        if (!ids) return [];
+        candidates = candidates ? candidates.filter((id) => ids.includes(id)) : ids;
+      }
+    } else {
+      // Too short for a full gram: take every token of every gram containing it
+      const ids = new Set();
+      this.grams.forEach((tokenIds, gram) => {
+        if (gram.includes(word)) tokenIds.forEach((id) => ids.add(id));
+      });
+      candidates = Array.from(ids);
+    }
+    return candidates.filter((id) => this.tokens[id].includes(word));
+  }
+
+  fuzzyTokens(word) {
+    const matches = new Map();
+    const limit = maxEdits(word);
+    if (!limit) return matches;
+
+    const queryGrams = tokenGrams(word, this.n);
+    const threshold = queryGrams.size - this.n * limit;
+    let candidates;
+    if (threshold < 1) {
+      candidates = this.tokens.map((_, id) => id);
+    } else {
+      const shared = new Map();
+      queryGrams.forEach((gram) => {
+        (this.grams.get(gram) || []).forEach((id) => shared.set(id, (shared.get(id) || 0) + 1));
+      });
+      candidates = Array.from(shared).filter(([, count]) => count >= threshold).map(([id]) => id);
+    }
+
+    candidates.forEach((id) => {
+      const distance = prefixDistance(word, this.tokens[id], limit);
+      if (distance !== null) matches.set(id, distance);
+    });
+    return matches;
+  }
+
+  wordScores(word, fuzzy) {
+    const tokenScores = new Map();
+    this.substringTokens(word).forEach((id) => {
+      tokenScores.set(id, this.tokens[id].startsWith(word) ? PREFIX : SUBSTRING);
+    });
+    if (fuzzy) {
+      this.fuzzyTokens(word).forEach((distance, id) => {
+        if (!tokenScores.has(id)) tokenScores.set(id, FUZZY + distance);
+      });
+    }
+
+    const scores = new Map();
+    tokenScores.forEach((score, id) => {
+      this.postings[id].forEach((entryId) => {
+        if (!scores.has(entryId) || score < scores.get(entryId)) scores.set(entryId, score);
+      });
+    });
+    return scores;
+  }
+
+  // Return matches as {kind, name, score}, best first (lower score is better)
+  search(query, { limit = 10, fuzzy = true } = {}) {
+    const words = normalize(query).split(' ').filter(Boolean);
+    if (!words.length) return [];
+
+    let totals = null;
+    for (const word of words) {
+      const scores = this.wordScores(word, fuzzy);
+      if (totals === null) {
+        totals = scores;
+      } else {
+        const combined = new Map();
+        scores.forEach((score, id) => {
+          if (totals.has(id)) combined.set(id, totals.get(id) + score);
+        });
+        totals = combined;
+      }
+      if (!totals.size) return [];
+    }
+
+    // Names that start with the whole query rank first among equal scores
+    const phrase = words.join(' ');
+    const results = Array.from(totals, ([id, score]) => ({ ...this.entries[id], score }));
+    results.sort((a, b) => a.score - b.score ||
+      Number(!normalize(a.name).startsWith(phrase)) - Number(!normalize(b.name).startsWith(phrase)) ||
+      (a.name < b.name ? -1 : a.name > b.name ? 1 : 0));
+    return limit ? results.slice(0, limit) : results;
+  }
+}